@@ -0,0 +1,197 @@
+"""Admission control for LLM calls: shared RPM / TPM budgets, priority queueing and Retry-After.
+
+Every call_llm / stream_llm request reserves one request and its estimated
+tokens before it goes to the provider. Requests that don't fit the budgets
+wait in a priority queue (interactive before background, FIFO within a
+priority) until the buckets refill, bounded by the request deadline. A 429's
+Retry-After pauses admission for every caller instead of each retrying on its
+own, and a full queue is rejected up front with a Retry-After of its own.
+"""
+import os, json, time, heapq, asyncio, itertools, threading, contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+from telemetry import LLM_QUEUE_SECONDS, annotate
+from resilience import DeadlineExceeded, remaining
+
+LLM_RPM = float(os.getenv("LLM_RPM", "500"))          # 0 disables the request budget
+LLM_TPM = float(os.getenv("LLM_TPM", "200000"))       # 0 disables the token budget
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "256"))
+# Completion tokens reserved per call until the provider reports actual usage
+LLM_COMPLETION_ESTIMATE = int(os.getenv("LLM_COMPLETION_ESTIMATE", "400"))
+
+INTERACTIVE, BACKGROUND = 0, 1
+_PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+class AdmissionRejected(RuntimeError):
+    """The LLM queue is full; try again after retry_after seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("nfl_agent_llm_priority", default=INTERACTIVE)
+
+@contextmanager
+def priority(level: int):
+    """Queue the LLM calls made inside at level (batch jobs use BACKGROUND)"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        try:
+            _priority.reset(token)
+        except ValueError:
+            pass
+
+def estimate_tokens(messages: List[Dict[str, Any]], tools: Any = None) -> int:
+    """Rough prompt size (~4 characters a token) plus the completion allowance"""
+    chars = len(json.dumps(messages, default=str)) + (len(json.dumps(tools)) if tools else 0)
+    return chars // 4 + LLM_COMPLETION_ESTIMATE
+
+class TokenBucket:
+    """per_minute units refilled continuously, holding at most one minute's worth.
+
+    take() may drive the level negative: a reservation that turned out too small
+    is paid back before anything else is admitted.
+    """
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.level = per_minute
+        self.clock = clock
+        self._at = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self._at) * self.rate)
+        self._at = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until amount is available (amounts over capacity wait for a full bucket)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+    def give(self, amount: float):
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+class Scheduler:
+    """Admits LLM requests within RPM / TPM budgets, queueing the rest by priority"""
+
+    def __init__(self, rpm: float = LLM_RPM, tpm: float = LLM_TPM, max_queue: int = LLM_MAX_QUEUE,
+                 clock: Callable[[], float] = time.monotonic):
+        self.requests = TokenBucket(rpm, clock) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm, clock) if tpm > 0 else None
+        self.max_queue = max_queue
+        self.clock = clock
+        self._queue: List[list] = []  # heap of [priority, seq, tokens, future]
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lock = threading.Lock()
+        self._stats = {"admitted": 0, "queued": 0, "rejected": 0, "expired": 0, "rate_limited": 0}
+
+    def _wait(self, tokens: int) -> float:
+        wait = self._paused_until - self.clock()
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_for(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_for(tokens))
+        return max(0.0, wait)
+
+    def _grant(self, tokens: int):
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+        self._stats["admitted"] += 1
+
+    async def acquire(self, tokens: int, level: Optional[int] = None):
+        """Wait until one request of tokens fits the budgets.
+
+        Raises AdmissionRejected when the queue is full and DeadlineExceeded
+        when the request deadline passes while queued.
+        """
+        level = _priority.get() if level is None else level
+        start = self.clock()
+        with self._lock:
+            if not self._queue and self._wait(tokens) == 0:
+                self._grant(tokens)
+                future = None
+            elif len(self._queue) >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise AdmissionRejected("LLM queue is full", max(1.0, self._wait(tokens)))
+            else:
+                timeout = remaining()
+                future = asyncio.get_running_loop().create_future()
+                entry = [level, next(self._seq), tokens, future]
+                heapq.heappush(self._queue, entry)
+                self._stats["queued"] += 1
+        if future is not None:
+            self._pump()
+            try:
+                await asyncio.wait_for(future, timeout)
+            except BaseException as e:
+                with self._lock:
+                    if entry in self._queue:
+                        self._queue.remove(entry)
+                        heapq.heapify(self._queue)
+                        self._stats["expired"] += 1
+                self._pump()
+                if isinstance(e, asyncio.TimeoutError):
+                    raise DeadlineExceeded("request deadline exceeded while queued for the LLM") from None
+                raise
+        waited = self.clock() - start
+        LLM_QUEUE_SECONDS.observe(waited, priority=_PRIORITY_NAMES.get(level, str(level)))
+        annotate(llm_queue_ms=round(waited * 1000, 1))
+
+    def _pump(self):
+        """Admit queued requests in priority order while the budgets allow, else re-check later"""
+        with self._lock:
+            wait = None
+            while self._queue:
+                _, _, tokens, future = self._queue[0]
+                if future.done():
+                    heapq.heappop(self._queue)
+                    continue
+                wait = self._wait(tokens)
+                if wait > 0:
+                    break
+                heapq.heappop(self._queue)
+                self._grant(tokens)
+                future.set_result(None)
+                wait = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if wait is not None:
+                self._timer = self._queue[0][3].get_loop().call_later(wait, self._pump)
+
+    def settle(self, reserved: int, used: Optional[int]):
+        """Replace a request's token reservation with what the provider reported it used"""
+        if used is None or self.tokens is None:
+            return
+        with self._lock:
+            if used < reserved:
+                self.tokens.give(reserved - used)
+            else:
+                self.tokens.take(used - reserved)
+        self._pump()
+
+    def rate_limited(self, retry_after: float):
+        """The provider returned 429: admit nothing for retry_after seconds"""
+        with self._lock:
+            self._stats["rate_limited"] += 1
+            self._paused_until = max(self._paused_until, self.clock() + retry_after)
+        self._pump()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {**self._stats, "waiting": len(self._queue),
+                    "paused_seconds": max(0.0, self._paused_until - self.clock())}
@@ -0,0 +1,107 @@
+import os, re, json, asyncio
+from typing import Any, Dict, List, Optional
+import tools
+from cache import AnswerCache
+from teams import team_words
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE", "1").lower() in ("1", "true", "yes")
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "600"))
+ANSWER_CACHE_BYTES = int(os.getenv("ANSWER_CACHE_BYTES", str(2 * 1024 * 1024)))
+
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "who", "whos", "what", "whats", "which",
+    "for", "of", "at", "in", "on", "to", "do", "does", "me", "tell", "please",
+    "s", "their", "this", "week", "1", "i", "you", "can", "about",
+}
+_TEAM_WORDS = team_words()
+_SUFFIXES = ("ing", "ers", "er", "s")
+
+_answers = AnswerCache(max_bytes=ANSWER_CACHE_BYTES, ttl=ANSWER_CACHE_TTL)
+# Drop every answer built from a URL as soon as that URL's data changes
+tools.on_data_change(_answers.invalidate)
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[: -len(suffix)]
+    return word
+
+def normalize_question(question: str) -> str:
+    """Lowercase, punctuation-free form used to recognise an exact repeat"""
+    return " ".join(re.findall(r"[a-z0-9@]+", question.lower()))
+
+def intent_tokens(question: str) -> str:
+    """Order-free, stemmed content words with team names removed.
+
+    Team identity comes from the resolved tool arguments instead, so
+    "Broncos starting LT?" and "who starts at LT for DEN" share a key.
+    """
+    words = normalize_question(question).split()
+    kept = {_stem(w) for w in words if w not in _STOPWORDS and w not in _TEAM_WORDS}
+    return " ".join(sorted(kept))
+
+def _calls_key(calls: List[Dict[str, Any]]) -> str:
+    normalized = [{k: str(v).lower() for k, v in sorted(tools.canonical_arguments(call).items())} for call in calls]
+    return json.dumps(sorted(normalized, key=lambda c: json.dumps(c)), separators=(",", ":"))
+
+def _versions(urls: List[str]) -> Optional[List[str]]:
+    versions = [tools.data_version(url) for url in urls]
+    return None if None in versions else versions
+
+def _valid(entry) -> bool:
+    """Serve an answer only while every source is still cached and unchanged.
+
+    A source past its TTL but inside the max-stale window still serves the
+    answer, the same way fetches serve stale data, and starts its refetch.
+    """
+    if entry is None or _versions(entry["sources"]) != entry["versions"]:
+        return False
+    states = {url: tools.freshness(url) for url in entry["sources"]}
+    if None in states.values():
+        return False
+    for url, state in states.items():
+        if state == tools.STALE:
+            _revalidate(url)
+    return True
+
+def _revalidate(url: str):
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return  # called outside the event loop: the next fetch of url refreshes it
+    tools.revalidate(url)
+
+def recall(question: str) -> Optional[Dict[str, Any]]:
+    """Answer for a question asked before in the same words, if its data is unchanged"""
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    intent_key = _answers.get("q:" + normalize_question(question))
+    entry = _answers.get(intent_key) if intent_key else None
+    return entry if _valid(entry) else None
+
+def lookup(question: str, calls: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Answer for the same intent resolved to the same tool calls, if its data is unchanged"""
+    if not ANSWER_CACHE_ENABLED or not calls:
+        return None
+    entry = _answers.get(f"i:{intent_tokens(question)}|{_calls_key(calls)}")
+    return entry if _valid(entry) else None
+
+def remember(question: str, calls: List[Dict[str, Any]], answer: str, sources: List[str]):
+    """Cache a synthesized answer under both its exact question and its intent key"""
+    if not ANSWER_CACHE_ENABLED or not calls or not sources:
+        return
+    versions = _versions(sources)
+    if versions is None:
+        return
+    intent_key = f"i:{intent_tokens(question)}|{_calls_key(calls)}"
+    entry = {"answer": answer, "sources": list(sources), "calls": calls, "versions": versions}
+    size = len(answer.encode()) + len(intent_key) + sum(len(s) for s in sources)
+    _answers.put(intent_key, entry, size, tags=set(sources))
+    question_key = "q:" + normalize_question(question)
+    _answers.put(question_key, intent_key, len(question_key) + len(intent_key), tags=set(sources))
+
+def stats() -> Dict[str, int]:
+    return _answers.stats()
+
+def clear():
+    _answers.clear()
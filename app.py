@@ -1,60 +1,313 @@
 from dotenv import load_dotenv; load_dotenv()
 
-import json
-from fastapi import FastAPI, HTTPException
+import os, json, asyncio
+from contextlib import asynccontextmanager, nullcontext
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from pydantic import BaseModel
+import tools, llm, answer_cache, router, compact, telemetry, batch, warmer, templates, speculate
+from compact import compact_tool_result, week_context
+from telemetry import get_logger, trace, span
+from resilience import REQUEST_DEADLINE, CircuitOpenError, DeadlineExceeded, deadline, remaining
+from admission import AdmissionRejected
 from tools import fetch_nfl_data
-from prompts import SYSTEM_PROMPT
-from llm import call_llm
+from prompts import Conversation, SYNTHESIS_INSTRUCTION
+from llm import call_llm, stream_llm
 
-app = FastAPI(title="NFL Week1 Agent")
+log = get_logger("app")
+
+telemetry.register_gauges("nfl_cache", tools.cache_stats)
+telemetry.register_gauges("nfl_singleflight", tools.flight_stats)
+telemetry.register_gauges("answer_cache", answer_cache.stats)
+telemetry.register_gauges("llm_usage", llm.usage_stats)
+telemetry.register_gauges("compact", compact.stats)
+telemetry.register_gauges("nfl_upstream", tools.upstream_stats)
+telemetry.register_gauges("llm_breaker", llm.breaker.stats)
+telemetry.register_gauges("llm_admission", llm.scheduler.stats)
+telemetry.register_gauges("warmer", warmer.status)
+telemetry.register_gauges("template_answers", templates.stats)
+telemetry.register_gauges("speculation", speculate.stats)
+
+_started = False
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _started
+    # One pooled client per upstream for the lifetime of the app; config is checked here, not at import
+    tools.open_client()
+    if llm._provider() != "none" and os.getenv("OPENAI_API_KEY"):
+        llm.open_client()
+    await asyncio.to_thread(compact.load_encoding)
+    snapshot_task = None
+    if tools.SNAPSHOT_ENABLED:
+        snapshot_task = asyncio.create_task(tools.refresh_snapshot_forever())
+    warm_task = None
+    if warmer.WARM_ENABLED:
+        warm_task = asyncio.create_task(warmer.warm_forever())
+    _started = True
+    yield
+    _started = False
+    if snapshot_task:
+        snapshot_task.cancel()
+    if warm_task:
+        warm_task.cancel()
+    await tools.close_client()
+    await llm.close_client()
+
+app = FastAPI(title="NFL Week1 Agent", lifespan=lifespan)
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open(request: Request, e: CircuitOpenError):
+    return JSONResponse({"detail": str(e)}, status_code=503,
+                        headers={"Retry-After": str(max(1, round(e.retry_after)))})
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, e: AdmissionRejected):
+    return JSONResponse({"detail": str(e)}, status_code=503,
+                        headers={"Retry-After": str(max(1, round(e.retry_after)))})
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded(request: Request, e: DeadlineExceeded):
+    return JSONResponse({"detail": str(e)}, status_code=504)
 
 class AskIn(BaseModel):
     question: str
 
+class AskBatchIn(BaseModel):
+    questions: List[str]
+    concurrency: Optional[int] = None
+
+NO_TOOL_ANSWER = "Ask me about a team or matchup, this week or any other week of the season."
+
+def _synthesis_messages(question, tool_call, tool_result):
+    tool_content, tokens = compact_tool_result(tool_result, question)
+    log.debug("Tool result tokens for %s: %d -> %d", tool_result['source_url'], tokens['before'], tokens['after'])
+    conversation = Conversation(question, week_context())
+    call = {"id": tool_call.get("id") or "call_0", "name": tool_call["name"], "arguments": tool_call["arguments"]}
+    conversation.add_tool_turn([call], [tool_content], [tool_result["source_url"]],
+                               note="I'll fetch the data for you.")
+    return conversation.with_instruction(SYNTHESIS_INSTRUCTION)
+
+def _template_answer(question, tc, tool_result):
+    with span("template_answer") as record:
+        answer = templates.answer(question, tc["arguments"], tool_result)
+        record["hit"] = answer is not None
+    return answer
+
+def _fallback_answer(tool_result):
+    return f"I fetched data from {tool_result['source_url']}. What specific detail would you like to know about?"
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _error_event(e):
+    return _sse("error", {"error": getattr(e, "detail", None) or str(e) or type(e).__name__})
+
+_NO_LIMIT = nullcontext()
+
+async def _decide(messages, question, llm_slot=_NO_LIMIT, fetch=fetch_nfl_data):
+    """(decision, speculation): the local router's decision when it is confident, else the LLM's.
+
+    While the LLM decides, the predicted fetch runs as a speculation; pass it
+    to speculate.resolve with the chosen arguments.
+    """
+    with span("route") as record:
+        routed = router.route(question)
+        record.update(kind=routed.kind, confident=routed.confident)
+    if routed.confident:
+        return routed.decision(), None
+    speculation = speculate.start(question, fetch, routed)
+    try:
+        async with llm_slot:
+            return await call_llm(messages, tools_schema=True), speculation
+    except BaseException:
+        speculate.settle(speculation)
+        raise
+
+async def _replay_events(answer, sources):
+    yield _sse("token", {"delta": answer})
+    yield _sse("done", {"answer": answer, "sources": sources})
+
 @app.get("/healthz")
 def healthz():
     return {"ok": True}
 
+def readiness():
+    """Readiness checks: started, clients open, and the first warm / snapshot pass landed when enabled"""
+    client = tools._client
+    checks = {"started": _started, "nfl_client": client is not None and not client.is_closed}
+    if llm._provider() != "none" and os.getenv("OPENAI_API_KEY"):
+        checks["llm_client"] = llm._client is not None
+    if warmer.WARM_ENABLED:
+        status = warmer.status()
+        checks["cache_warm"] = status["runs"] > 0 and status["last_fetched"] + status["last_skipped"] > 0
+    if tools.SNAPSHOT_ENABLED:
+        checks["snapshot"] = tools._snapshot.loaded
+    return checks
+
+@app.get("/readyz")
+def readyz():
+    """503 until the instance should get traffic; /healthz only says the process is up"""
+    checks = readiness()
+    ready = all(checks.values())
+    return JSONResponse({"ready": ready, "checks": checks}, status_code=200 if ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of stage latencies, counters and cache gauges"""
+    return telemetry.render_metrics()
+
 @app.post("/ask")
-def ask(body: AskIn):
-    messages = [
-        {"role":"system","content": SYSTEM_PROMPT},
-        {"role":"user","content": body.question}
-    ]
+async def ask(body: AskIn):
+    with trace("ask"), deadline(REQUEST_DEADLINE):
+        return await answer_question(body.question)
+
+async def answer_question(question: str, fetch=fetch_nfl_data, llm_slot=_NO_LIMIT):
+    """The /ask pipeline; /ask/batch swaps in a shared fetch and a bounded LLM slot"""
+    cached = answer_cache.recall(question)
+    if cached:
+        return {"answer": cached["answer"], "sources": cached["sources"]}
+
+    messages = Conversation(question, week_context()).messages
     
-    # First, get the tool call decision from the LLM
-    decision = call_llm(messages, tools_schema=True)
-    print(f"Message - {messages}")  # Add this line
-    print(f"DEBUG - Initial call_llm result: {decision}")  # Add this line
+    # First, get the tool call decision (local router, falling back to the LLM)
+    decision, speculation = await _decide(messages, question, llm_slot, fetch)
+    log.debug("Initial decision for %r: %s", question, decision)
     sources = []
     
     if "tool_call" in decision:
         tc = decision["tool_call"]
         if tc["name"] != "fetch_nfl_data":
+            speculate.settle(speculation)
             raise HTTPException(status_code=400, detail="Unknown tool requested")
         
-        # Fetch the data
-        tool_result = fetch_nfl_data(**tc["arguments"])
+        # Fetch the data (already in flight if the speculation guessed right)
+        try:
+            tool_result = await speculate.resolve(speculation, tc["arguments"], fetch)
+        finally:
+            speculate.settle(speculation)
         sources.append(tool_result["source_url"])
         
-        # Now synthesize a human-readable answer using the LLM
-        synthesis_messages = [
-            {"role":"system","content": SYSTEM_PROMPT},
-            {"role":"user","content": body.question},
-            {"role":"assistant","content": f"I'll fetch the data for you."},
-            {"role":"tool","name": "fetch_nfl_data", "content": json.dumps(tool_result)},
-            {"role":"user","content": "Based on this data, please answer the original question in a clear, human-readable way. Include specific details from the data and cite the sources."}
-        ]
+        cached = answer_cache.lookup(question, [tc["arguments"]])
+        if cached:
+            return {"answer": cached["answer"], "sources": sources}
+        
+        # Lookups with a single factual answer are rendered locally; the rest go to the LLM
+        answer = _template_answer(question, tc, tool_result)
+        if answer is not None:
+            answer_cache.remember(question, [tc["arguments"]], answer, sources)
+            return {"answer": answer, "sources": sources}
         
-        synthesis_result = call_llm(synthesis_messages, tools_schema=False)
+        # Now synthesize a human-readable answer using the LLM
+        with span("synthesis"):
+            synthesis_messages = _synthesis_messages(question, tc, tool_result)
+            async with llm_slot:
+                synthesis_result = await call_llm(synthesis_messages, tools_schema=False)
         
         if "content" in synthesis_result:
             answer = synthesis_result["content"]
+            answer_cache.remember(question, [tc["arguments"]], answer, sources)
         else:
             # Fallback if synthesis fails
-            answer = f"I fetched data from {tool_result['source_url']}. What specific detail would you like to know about?"
+            answer = _fallback_answer(tool_result)
     else:
-        answer = "Ask me about a team or matchup for Week 1."
+        speculate.settle(speculation)
+        answer = NO_TOOL_ANSWER
     
     return {"answer": answer, "sources": sources}
+
+@app.post("/ask/stream")
+async def ask_stream(body: AskIn):
+    """Same pipeline as /ask, streamed as Server-Sent Events.
+
+    Events: `tool` as soon as the tool call is decided (with the source_url the
+    answer will cite), `token` per synthesis delta, then `done` with the full answer
+    and sources; a failed fetch ends the stream with `error`. The ask_stream
+    trace covers the time until the first event; the fetch and streamed
+    synthesis are timed by their own stages.
+    """
+    with trace("ask_stream"), deadline(REQUEST_DEADLINE):
+        return await _ask_stream(body)
+
+async def _ask_stream(body: AskIn):
+    cached = answer_cache.recall(body.question)
+    if cached:
+        return StreamingResponse(_replay_events(cached["answer"], cached["sources"]),
+                                 media_type="text/event-stream")
+
+    messages = Conversation(body.question, week_context()).messages
+    decision, speculation = await _decide(messages, body.question)
+    try:
+        if "tool_call" not in decision:
+            return StreamingResponse(_replay_events(NO_TOOL_ANSWER, []), media_type="text/event-stream")
+        tc = decision["tool_call"]
+        if tc["name"] != "fetch_nfl_data":
+            raise HTTPException(status_code=400, detail="Unknown tool requested")
+        source_url = tools.source_url(**tc["arguments"])
+    except BaseException:
+        speculate.settle(speculation)
+        raise
+    left = remaining()
+
+    async def events():
+        yield _sse("tool", {"tool_call": tc["arguments"], "source_url": source_url})
+        with deadline(left):
+            # The client has the tool call while the data is fetched (already in flight if speculated)
+            try:
+                tool_result = await speculate.resolve(speculation, tc["arguments"])
+            except Exception as e:
+                log.warning("Fetch failed for %r: %s", body.question, e)
+                yield _error_event(e)
+                return
+            finally:
+                speculate.settle(speculation)
+            sources = [tool_result["source_url"]]
+
+            cached = answer_cache.lookup(body.question, [tc["arguments"]])
+            if cached:
+                yield _sse("token", {"delta": cached["answer"]})
+                yield _sse("done", {"answer": cached["answer"], "sources": sources})
+                return
+
+            answer = _template_answer(body.question, tc, tool_result)
+            if answer is not None:
+                answer_cache.remember(body.question, [tc["arguments"]], answer, sources)
+                yield _sse("token", {"delta": answer})
+                yield _sse("done", {"answer": answer, "sources": sources})
+                return
+
+            parts = []
+            try:
+                with span("synthesis"):
+                    async for delta in stream_llm(_synthesis_messages(body.question, tc, tool_result)):
+                        parts.append(delta)
+                        yield _sse("token", {"delta": delta})
+            except Exception as e:
+                # Cut off mid-answer: the tokens sent so far are not an answer to cache
+                yield _error_event(e)
+                return
+            if parts:
+                answer = "".join(parts)
+                answer_cache.remember(body.question, [tc["arguments"]], answer, sources)
+            else:
+                answer = _fallback_answer(tool_result)
+                yield _sse("token", {"delta": answer})
+            yield _sse("done", {"answer": answer, "sources": sources})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.post("/ask/batch")
+async def ask_batch(body: AskBatchIn):
+    """Answer many questions in one request, streamed back as NDJSON.
+
+    Each distinct NFL API URL is fetched once for the whole batch and LLM
+    calls run at most `concurrency` at a time. One line per question in
+    completion order ({index, question, answer, sources, ms} or {..., error}),
+    then a final {"summary": ...} line.
+    """
+    if len(body.questions) > batch.BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {batch.BATCH_MAX_QUESTIONS} questions per batch")
+    concurrency = max(1, min(body.concurrency or batch.BATCH_CONCURRENCY, batch.BATCH_CONCURRENCY))
+    results = batch.run_batch(body.questions, answer_question, concurrency)
+    return StreamingResponse(batch.ndjson(results), media_type="application/x-ndjson")
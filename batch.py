@@ -0,0 +1,110 @@
+"""Answer a batch of questions with shared fetches and bounded LLM concurrency.
+
+Used by POST /ask/batch and as a CLI for FAQ pre-generation and nightly evals:
+
+    python batch.py questions.txt [--concurrency 8] [--out answers.ndjson]
+
+The input is one question per line, or a JSON list of strings / {"question": ...}
+objects ("-" reads stdin). Results are NDJSON in completion order.
+"""
+import os, sys, json, time, asyncio, argparse
+from typing import Any, AsyncIterator, Dict, List
+import tools
+from telemetry import trace
+from resilience import REQUEST_DEADLINE, deadline
+from admission import BACKGROUND, priority
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+
+class SharedFetches:
+    """fetch_nfl_data stand-in that fetches each distinct call once per batch"""
+
+    def __init__(self):
+        self._tasks: Dict[tuple, asyncio.Future] = {}  # tools.request_key -> fetch
+        self.requested = 0
+
+    @property
+    def distinct(self) -> int:
+        return len(self._tasks)
+
+    async def __call__(self, **arguments):
+        key = tools.request_key(**arguments)
+        self.requested += 1
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(tools.fetch_nfl_data(**arguments))
+        # Shielded so one cancelled item does not cancel the fetch the others share
+        return await asyncio.shield(task)
+
+async def run_batch(questions: List[str], answer, concurrency: int = BATCH_CONCURRENCY) -> AsyncIterator[Dict[str, Any]]:
+    """Yield answer(question, fetch=..., llm_slot=...) results as they complete, then a summary"""
+    fetches = SharedFetches()
+    llm_slot = asyncio.Semaphore(concurrency)
+    done: asyncio.Queue = asyncio.Queue()
+    start = time.perf_counter()
+
+    async def one(index, question):
+        item_start = time.perf_counter()
+        item = {"index": index, "question": question}
+        try:
+            # Batch LLM calls queue behind interactive /ask and Discord traffic
+            with trace("batch_item"), deadline(REQUEST_DEADLINE), priority(BACKGROUND):
+                item.update(await answer(question, fetch=fetches, llm_slot=llm_slot))
+        except Exception as e:
+            item["error"] = getattr(e, "detail", None) or str(e) or type(e).__name__
+        item["ms"] = round((time.perf_counter() - item_start) * 1000, 1)
+        await done.put(item)
+
+    tasks = [asyncio.create_task(one(i, q)) for i, q in enumerate(questions)]
+    errors = 0
+    try:
+        for _ in tasks:
+            item = await done.get()
+            errors += "error" in item
+            yield item
+    finally:
+        for task in tasks:
+            task.cancel()
+    yield {"summary": {"questions": len(questions), "errors": errors,
+                       "fetches_requested": fetches.requested, "fetches_distinct": fetches.distinct,
+                       "ms": round((time.perf_counter() - start) * 1000, 1)}}
+
+async def ndjson(items: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    async for item in items:
+        yield json.dumps(item) + "\n"
+
+def read_questions(text: str) -> List[str]:
+    text = text.strip()
+    if text.startswith("["):
+        return [q if isinstance(q, str) else q.get("question") or q["q"] for q in json.loads(text)]
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+async def main_async(questions, concurrency, out):
+    from app import app, lifespan, answer_question
+    async with lifespan(app):
+        async for line in ndjson(run_batch(questions, answer_question, concurrency)):
+            out.write(line)
+            out.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions as NDJSON")
+    parser.add_argument("questions", help="question file (one per line or a JSON list); - for stdin")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="max LLM calls in flight")
+    parser.add_argument("--out", help="write NDJSON here instead of stdout")
+    opts = parser.parse_args()
+
+    if opts.questions == "-":
+        questions = read_questions(sys.stdin.read())
+    else:
+        with open(opts.questions) as f:
+            questions = read_questions(f.read())
+    out = open(opts.out, "w") if opts.out else sys.stdout
+    try:
+        asyncio.run(main_async(questions, max(1, opts.concurrency), out))
+    finally:
+        if opts.out:
+            out.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Local stand-ins for the NFL API and an OpenAI-compatible chat endpoint.
+
+Both are plain FastAPI apps with configurable latency and error rate, so the
+load test can run the real service end to end without touching the network.
+"""
+import os, sys, json, time, random, asyncio
+from collections import Counter
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from teams import TEAMS
+
+POSITIONS = ["QB", "RB", "WR", "TE", "LT", "LG", "C", "RG", "RT"]
+
+def _team(abbr):
+    city, nickname = TEAMS[abbr]
+    return {
+        "abbr": abbr.upper(), "name": f"{city} {nickname}", "id": sum(map(ord, abbr)),
+        "logo": f"https://img.example.com/{abbr}.png",
+        "starters": [{"position": pos, "name": f"{nickname} {pos}1", "headshot": None} for pos in POSITIONS],
+    }
+
+def _matchups():
+    abbrs = list(TEAMS)
+    return [{"away": {"abbr": away.upper()}, "home": {"abbr": home.upper()}, "kickoff": "2025-09-07T17:00:00Z"}
+            for away, home in zip(abbrs[0::2], abbrs[1::2])]
+
+class Knobs:
+    """Mutable latency / error settings plus per-path call counts"""
+
+    def __init__(self, latency=0.0, error_rate=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = Counter()
+
+    async def delay(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def should_fail(self):
+        return self.error_rate and random.random() < self.error_rate
+
+def fake_nfl_api(knobs: Knobs) -> FastAPI:
+    app = FastAPI()
+    teams = {abbr: _team(abbr) for abbr in TEAMS}
+    matchups = _matchups()
+
+    @app.post("/api/{path:path}")
+    async def api(path: str):
+        knobs.calls[path] += 1
+        await knobs.delay()
+        if knobs.should_fail():
+            return Response(status_code=503)
+        parts = path.strip("/").split("/")
+        if parts[:1] == ["teams"] and len(parts) == 2:
+            team = teams.get(parts[1])
+            return JSONResponse(team) if team else Response(status_code=404)
+        if parts[:1] == ["teams"]:
+            return JSONResponse({"teams": list(teams.values())})
+        if parts[:1] == ["matchups"] and len(parts) == 6:
+            away, home = parts[4].upper(), parts[5].upper()
+            if away.lower() not in TEAMS or home.lower() not in TEAMS:
+                return Response(status_code=404)
+            return JSONResponse({"away": teams[away.lower()], "home": teams[home.lower()],
+                                 "kickoff": "2025-09-07T17:00:00Z"})
+        if parts[:1] == ["matchups"]:
+            return JSONResponse(matchups)
+        return Response(status_code=404)
+
+    return app
+
+def _usage(messages, completion_tokens):
+    prompt_tokens = sum(len(str(m.get("content") or "")) for m in messages) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": 0}}
+
+def fake_openai(knobs: Knobs, answer_words: int = 60) -> FastAPI:
+    import llm
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        messages = body["messages"]
+        knobs.calls["decision" if body.get("tool_choice") == "auto" else "synthesis"] += 1
+        await knobs.delay()
+        if knobs.should_fail():
+            return JSONResponse({"error": {"message": "overloaded", "type": "server_error"}}, status_code=500)
+
+        base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": body["model"]}
+        last_user = next(m for m in reversed(messages) if m["role"] == "user")["content"]
+        if body.get("tool_choice") == "auto" and messages[-1]["role"] == "user":
+            args = llm._fallback_heuristic(last_user)["tool_call"]["arguments"]
+            message = {"role": "assistant", "content": None, "tool_calls": [{
+                "id": "call_fake", "type": "function",
+                "function": {"name": "fetch_nfl_data", "arguments": json.dumps(args)}}]}
+            finish = "tool_calls"
+        else:
+            message = {"role": "assistant", "content": " ".join(["answer"] * answer_words)}
+            finish = "stop"
+
+        if not body.get("stream"):
+            return JSONResponse({**base, "object": "chat.completion",
+                                 "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+                                 "usage": _usage(messages, answer_words)})
+
+        async def chunks():
+            for word in (message["content"] or "").split(" "):
+                delta = {"index": 0, "delta": {"content": word + " "}, "finish_reason": None}
+                yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [delta]})}\n\n"
+                await asyncio.sleep(0)
+            final = {**base, "object": "chat.completion.chunk", "choices": [], "usage": _usage(messages, answer_words)}
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
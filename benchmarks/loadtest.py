@@ -0,0 +1,181 @@
+"""End-to-end load test of /ask and the Discord agent loop against local fake upstreams.
+
+    python benchmarks/loadtest.py --requests 500 --concurrency 32 \
+        --nfl-latency 0.08 --llm-latency 0.4 --out results.json [--compare baseline.json]
+
+Starts a fake NFL API, a fake OpenAI-compatible endpoint and the real app on
+localhost, drives them with the labeled questions from router_questions.json,
+and reports throughput, p50/p95/p99 latency, upstream call counts and cache
+hit rates. Results are written as JSON so runs can be compared across commits.
+"""
+import os, sys, json, time, socket, random, asyncio, argparse, threading, subprocess, statistics
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import uvicorn
+from fake_upstreams import Knobs, fake_nfl_api, fake_openai
+
+QUESTIONS = os.path.join(os.path.dirname(__file__), "router_questions.json")
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _serve(app, port):
+    """Run an ASGI app on its own thread and event loop; returns the server"""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    server.thread = threading.Thread(target=server.run, daemon=True)
+    server.thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+def _percentiles(latencies):
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    qs = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {"p50_ms": qs[49] * 1000, "p95_ms": qs[94] * 1000, "p99_ms": qs[98] * 1000}
+
+async def _drive(n, concurrency, questions, one):
+    """Issue n calls of one(question) with at most concurrency in flight"""
+    latencies, errors = [], 0
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run(i):
+        nonlocal errors
+        async with slots:
+            start = time.perf_counter()
+            try:
+                await one(questions[i % len(questions)])
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(i) for i in range(n)))
+    elapsed = time.perf_counter() - start
+    return {"requests": n, "errors": errors, "seconds": elapsed,
+            "throughput_rps": n / elapsed, **_percentiles(latencies)}
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+def _reset_state():
+    """Empty caches and close breakers so each scenario starts cold"""
+    import tools, llm, answer_cache
+    tools._cache.clear()
+    answer_cache.clear()
+    tools.breaker.reset()
+    llm.breaker.reset()
+
+async def main_async(opts):
+    import httpx
+    import tools, llm, answer_cache, templates
+    import app as app_module
+    from discord_bot import process_nfl_question
+
+    with open(QUESTIONS) as f:
+        questions = [item["q"] for item in json.load(f)]
+    random.Random(opts.seed).shuffle(questions)
+
+    results = {"commit": _git_commit(), "scenarios": {}}
+
+    _reset_state()
+    app_port = _free_port()
+    server = _serve(app_module.app, app_port)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", timeout=60) as client:
+        async def ask(question):
+            r = await client.post("/ask", json={"question": question})
+            r.raise_for_status()
+        before_nfl, before_llm = dict(opts.nfl.calls), dict(opts.llm.calls)
+        results["scenarios"]["ask"] = await _drive(opts.requests, opts.concurrency, questions, ask)
+        results["scenarios"]["ask"]["upstream_calls"] = _calls_since(opts, before_nfl, before_llm)
+        results["scenarios"]["ask"]["cache"] = {"nfl": tools.cache_stats(), "answers": answer_cache.stats()}
+
+    # The app's clients belong to the server thread's loop: shut it down (its lifespan
+    # closes them) and give the Discord scenario clients of its own on this loop
+    server.should_exit = True
+    server.thread.join()
+    tools.open_client()
+    llm.open_client()
+    _reset_state()
+    before_nfl, before_llm = dict(opts.nfl.calls), dict(opts.llm.calls)
+    try:
+        results["scenarios"]["discord"] = await _drive(opts.requests, opts.concurrency, questions, process_nfl_question)
+    finally:
+        await tools.close_client()
+        await llm.close_client()
+    results["scenarios"]["discord"]["upstream_calls"] = _calls_since(opts, before_nfl, before_llm)
+    results["scenarios"]["discord"]["cache"] = {"nfl": tools.cache_stats(), "answers": answer_cache.stats()}
+    results["llm_usage"] = llm.usage_stats()
+    results["template_answers"] = templates.stats()
+    return results
+
+def _calls_since(opts, before_nfl, before_llm):
+    nfl = sum(opts.nfl.calls.values()) - sum(before_nfl.values())
+    llm_calls = {k: v - before_llm.get(k, 0) for k, v in opts.llm.calls.items()}
+    return {"nfl_api": nfl, "llm": llm_calls}
+
+def _print(results, baseline=None):
+    for name, r in results["scenarios"].items():
+        line = (f"{name:<8} {r['throughput_rps']:8.1f} req/s  p50 {r['p50_ms'] or 0:8.1f} ms  "
+                f"p95 {r['p95_ms'] or 0:8.1f} ms  p99 {r['p99_ms'] or 0:8.1f} ms  errors {r['errors']}  "
+                f"nfl calls {r['upstream_calls']['nfl_api']}  llm calls {r['upstream_calls']['llm']}")
+        print(line)
+        old = (baseline or {}).get("scenarios", {}).get(name)
+        if old:
+            for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+                if old.get(key) and r.get(key):
+                    print(f"    {key:<15} {old[key]:10.1f} -> {r[key]:10.1f} ({(r[key] / old[key] - 1):+.1%})")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--nfl-latency", type=float, default=0.05, help="seconds per fake NFL API call")
+    parser.add_argument("--nfl-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds per fake LLM call")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to diff against")
+    opts = parser.parse_args()
+
+    # The fake provider has no rate limits; don't let admission control throttle the run.
+    # Set before fake_openai() imports llm, which builds the scheduler from these.
+    os.environ.setdefault("LLM_RPM", "0")
+    os.environ.setdefault("LLM_TPM", "0")
+
+    opts.nfl = Knobs(opts.nfl_latency, opts.nfl_error_rate)
+    opts.llm = Knobs(opts.llm_latency, opts.llm_error_rate)
+    nfl_port, llm_port = _free_port(), _free_port()
+    _serve(fake_nfl_api(opts.nfl), nfl_port)
+    _serve(fake_openai(opts.llm), llm_port)
+
+    # Point the service at the fakes before any of its modules are imported
+    os.environ["NFL_API_BASE"] = f"http://127.0.0.1:{nfl_port}"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{llm_port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-loadtest")
+    os.environ["LLM_PROVIDER"] = "openai"
+
+    results = asyncio.run(main_async(opts))
+    nfl, llm_knobs = opts.nfl, opts.llm
+    del opts.nfl, opts.llm
+    results["config"] = vars(opts)
+    results["fake_upstream_calls"] = {"nfl_api": dict(nfl.calls), "llm": dict(llm_knobs.calls)}
+
+    baseline = None
+    if opts.compare:
+        with open(opts.compare) as f:
+            baseline = json.load(f)
+    _print(results, baseline)
+    if opts.out:
+        with open(opts.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
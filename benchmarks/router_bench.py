@@ -0,0 +1,85 @@
+"""Local intent router vs. the LLM tool decision on a labeled question set.
+
+    python benchmarks/router_bench.py [--llm] [--json out.json]
+
+Reports per-question latency, coverage (share of questions the router is
+confident about) and accuracy for the router, the old keyword heuristic and,
+with --llm and OPENAI_API_KEY set, the LLM decision call.
+"""
+import os, sys, json, time, asyncio, argparse, statistics
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("NFL_API_BASE", "https://example.com")
+
+import router, llm
+from prompts import SYSTEM_PROMPT
+
+QUESTIONS = os.path.join(os.path.dirname(__file__), "router_questions.json")
+
+def _same(args, expect):
+    if expect is None or not args:
+        return False
+    return {k: str(v).lower() for k, v in args.items()} == expect
+
+def _summary(name, latencies, decided, correct, total):
+    return {
+        "name": name,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "coverage": decided / total,
+        "accuracy_when_decided": correct / decided if decided else None,
+    }
+
+def bench_local(labeled, name, decide, reps=200):
+    latencies, decided, correct = [], 0, 0
+    for item in labeled:
+        start = time.perf_counter()
+        for _ in range(reps):
+            args = decide(item["q"])
+        latencies.append((time.perf_counter() - start) / reps)
+        if args is not None:
+            decided += 1
+            correct += _same(args, item["expect"])
+    return _summary(name, latencies, decided, correct, len(labeled))
+
+async def bench_llm(labeled):
+    latencies, decided, correct = [], 0, 0
+    for item in labeled:
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": item["q"]}]
+        start = time.perf_counter()
+        decision = await llm.call_llm(messages, tools_schema=True)
+        latencies.append(time.perf_counter() - start)
+        if "tool_call" in decision:
+            decided += 1
+            correct += _same(decision["tool_call"]["arguments"], item["expect"])
+    await llm.close_client()
+    return _summary("llm", latencies, decided, correct, len(labeled))
+
+def _routed(question):
+    r = router.route(question)
+    return r.arguments if r.confident else None
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm", action="store_true", help="also time the LLM decision (needs OPENAI_API_KEY)")
+    parser.add_argument("--json", help="write results to this file")
+    opts = parser.parse_args()
+
+    with open(QUESTIONS) as f:
+        labeled = json.load(f)
+    results = [
+        bench_local(labeled, "router", _routed),
+        bench_local(labeled, "heuristic", lambda q: llm._fallback_heuristic(q)["tool_call"]["arguments"]),
+    ]
+    if opts.llm:
+        results.append(asyncio.run(bench_llm(labeled)))
+
+    for r in results:
+        acc = "n/a" if r["accuracy_when_decided"] is None else f"{r['accuracy_when_decided']:.0%}"
+        print(f"{r['name']:<10} p50 {r['p50_ms']:9.3f} ms  max {r['max_ms']:9.3f} ms  "
+              f"coverage {r['coverage']:.0%}  accuracy {acc}")
+    if opts.json:
+        with open(opts.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Cold-start cost of the app and bot entry points.
+
+    python benchmarks/startup_bench.py [--runs 5] [--out startup.json] [--compare baseline.json]
+
+Each run is a fresh interpreter: it times `import app` and `import discord_bot`,
+then the app's lifespan startup, and records which heavy dependencies the
+import pulled in. `python -X importtime` supplies the slowest imports by
+cumulative time. Results are written as JSON so runs can be compared across
+commits.
+"""
+import os, sys, json, argparse, subprocess, statistics
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+HEAVY = ("openai", "discord", "uvicorn")
+
+_PROBE = """
+import sys, time, json, asyncio
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+startup = None
+if {lifespan}:
+    async def run():
+        async with {module}.lifespan({module}.app):
+            pass
+    t = time.perf_counter()
+    asyncio.run(run())
+    startup = time.perf_counter() - t
+print(json.dumps({{"import_ms": (imported - start) * 1000, "startup_ms": startup and startup * 1000,
+                  "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault("NFL_API_BASE", "https://example.com")
+    env.update(LLM_PROVIDER="none", NFL_WARM="0", NFL_SNAPSHOT="0")
+    return env
+
+def _probe(module, lifespan):
+    code = _PROBE.format(module=module, lifespan=lifespan, heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=_env(),
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def _slowest_imports(module, top=10):
+    """(cumulative ms, name) of the slowest imports under module, from -X importtime"""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                         env=_env(), capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if name != module:
+            rows.append((int(cumulative) / 1000, name))
+    return [{"module": name, "cumulative_ms": ms} for ms, name in sorted(rows, reverse=True)[:top]]
+
+def bench(module, runs, lifespan=False):
+    samples = [_probe(module, lifespan) for _ in range(runs)]
+    result = {"import_ms": statistics.median(s["import_ms"] for s in samples),
+              "loaded": samples[-1]["loaded"], "slowest_imports": _slowest_imports(module)}
+    if lifespan:
+        result["startup_ms"] = statistics.median(s["startup_ms"] for s in samples)
+    return result
+
+def _print(results, baseline=None):
+    for name, r in results["entry_points"].items():
+        startup = f"  startup {r['startup_ms']:7.1f} ms" if "startup_ms" in r else ""
+        print(f"{name:<12} import {r['import_ms']:7.1f} ms{startup}  loads {', '.join(r['loaded']) or '-'}")
+        old = (baseline or {}).get("entry_points", {}).get(name)
+        if old:
+            for key in ("import_ms", "startup_ms"):
+                if old.get(key) and r.get(key):
+                    print(f"    {key:<12} {old[key]:8.1f} -> {r[key]:8.1f} ({(r[key] / old[key] - 1):+.1%})")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per entry point")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to diff against")
+    opts = parser.parse_args()
+
+    results = {"commit": _git_commit(), "python": sys.version.split()[0], "entry_points": {
+        "app": bench("app", opts.runs, lifespan=True),
+        "discord_bot": bench("discord_bot", opts.runs),
+    }}
+    baseline = None
+    if opts.compare:
+        with open(opts.compare) as f:
+            baseline = json.load(f)
+    _print(results, baseline)
+    if opts.out:
+        with open(opts.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import json, time, sqlite3, threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+FRESH, STALE = "fresh", "stale"
+
+class SWRCache:
+    """Thread-safe LRU cache with per-entry TTLs and a stale-while-revalidate window.
+
+    An entry is fresh for its TTL, then stale (still servable) for max_stale
+    more seconds, after which it is dropped.
+    """
+
+    def __init__(self, maxsize: int = 64, max_stale: float = 600.0,
+                 clock: Callable[[], float] = time.time):
+        self.maxsize = maxsize
+        self.max_stale = max_stale
+        self.clock = clock
+        self._data: "OrderedDict[str, Tuple[Any, float, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._stats = {"hits": 0, "misses": 0, "stale_served": 0, "refresh_errors": 0}
+
+    def __contains__(self, key: str) -> bool:
+        return self.lookup(key, count=False)[1] is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def lookup(self, key: str, count: bool = True) -> Tuple[Any, Optional[str]]:
+        """Return (value, FRESH | STALE) or (None, None) on a miss"""
+        with self._lock:
+            entry = self._data.get(key)
+            state = None
+            if entry is not None:
+                value, fetched_at, ttl = entry
+                age = self.clock() - fetched_at
+                if age <= ttl:
+                    state = FRESH
+                elif age <= ttl + self.max_stale:
+                    state = STALE
+                else:
+                    del self._data[key]
+            if state is None:
+                if count:
+                    self._stats["misses"] += 1
+                return None, None
+            self._data.move_to_end(key)
+            if count:
+                self._stats["hits" if state == FRESH else "stale_served"] += 1
+            return value, state
+
+    def set(self, key: str, value: Any, ttl: float, fetched_at: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (value, self.clock() if fetched_at is None else fetched_at, ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def entry(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        """Raw (value, fetched_at, ttl) without touching LRU order or stats"""
+        with self._lock:
+            return self._data.get(key)
+
+    def record_refresh_error(self):
+        with self._lock:
+            self._stats["refresh_errors"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "size": len(self._data)}
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+class WeekPartitionedCache:
+    """SWRCache split into one LRU partition per (season, week), same interface.
+
+    Each partition holds up to partition_size entries. Past max_partitions whole
+    partitions are dropped: completed weeks first (oldest first), then the least
+    recently used; the current week's partition is never dropped.
+    """
+
+    def __init__(self, partition_of: Callable[[str], Tuple[int, int]], is_final: Callable[[Tuple[int, int]], bool],
+                 current: Callable[[], Tuple[int, int]], partition_size: int = 64, max_partitions: int = 8,
+                 max_stale: float = 600.0, clock: Callable[[], float] = time.time):
+        self.partition_of = partition_of
+        self.is_final = is_final
+        self.current = current
+        self.partition_size = partition_size
+        self.max_partitions = max(1, max_partitions)
+        self.max_stale = max_stale
+        self.clock = clock
+        self._partitions: "OrderedDict[Tuple[int, int], SWRCache]" = OrderedDict()
+        self._lock = threading.RLock()
+        # Counters of dropped partitions and misses on partitions that don't exist
+        self._retired = {"hits": 0, "misses": 0, "stale_served": 0, "refresh_errors": 0}
+        self._evicted_partitions = 0
+
+    def _partition(self, key: str, create: bool) -> Optional[SWRCache]:
+        partition = self.partition_of(key)
+        with self._lock:
+            cache = self._partitions.get(partition)
+            if cache is None:
+                if not create:
+                    return None
+                cache = self._partitions[partition] = SWRCache(self.partition_size, self.max_stale,
+                                                               clock=lambda: self.clock())
+                self._evict(keep=partition)
+            self._partitions.move_to_end(partition)
+            return cache
+
+    def _evict(self, keep: Tuple[int, int]):
+        protected = {keep, self.current()}
+        while len(self._partitions) > self.max_partitions:
+            candidates = [p for p in self._partitions if p not in protected]
+            if not candidates:
+                return
+            final = sorted(p for p in candidates if self.is_final(p))
+            # Completed weeks oldest first, else least recently used (dict order)
+            victim = final[0] if final else candidates[0]
+            for name, value in self._partitions.pop(victim).stats().items():
+                if name in self._retired:
+                    self._retired[name] += value
+            self._evicted_partitions += 1
+
+    def __contains__(self, key: str) -> bool:
+        return self.lookup(key, count=False)[1] is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(cache) for cache in self._partitions.values())
+
+    def lookup(self, key: str, count: bool = True) -> Tuple[Any, Optional[str]]:
+        cache = self._partition(key, create=False)
+        if cache is None:
+            if count:
+                with self._lock:
+                    self._retired["misses"] += 1
+            return None, None
+        return cache.lookup(key, count)
+
+    def set(self, key: str, value: Any, ttl: float, fetched_at: Optional[float] = None):
+        self._partition(key, create=True).set(key, value, ttl, fetched_at)
+
+    def entry(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        cache = self._partition(key, create=False)
+        return cache.entry(key) if cache is not None else None
+
+    def record_refresh_error(self):
+        with self._lock:
+            self._retired["refresh_errors"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            totals = dict(self._retired)
+            for cache in self._partitions.values():
+                for name, value in cache.stats().items():
+                    if name in totals:
+                        totals[name] += value
+            return {**totals, "size": sum(len(c) for c in self._partitions.values()),
+                    "partitions": len(self._partitions), "evicted_partitions": self._evicted_partitions}
+
+    def clear(self):
+        with self._lock:
+            self._partitions.clear()
+
+class AnswerCache:
+    """Thread-safe LRU + TTL cache bounded by total value size in bytes.
+
+    Entries carry tags (source URLs) so everything derived from a URL can be
+    dropped at once when that URL's data changes.
+    """
+
+    def __init__(self, max_bytes: int = 1_000_000, ttl: float = 600.0,
+                 clock: Callable[[], float] = time.time):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.bytes = 0
+        self._data: "OrderedDict[str, Tuple[Any, float, int, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, set] = {}
+        self._lock = threading.RLock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self.clock() - entry[1] > self.ttl:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, key: str, value: Any, size: int, tags=()):
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            if size > self.max_bytes:
+                return
+            tags = tuple(tags)
+            self._data[key] = (value, self.clock(), size, tags)
+            self.bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+                self._stats["evictions"] += 1
+
+    def invalidate(self, tag: str) -> int:
+        """Drop every entry carrying tag; returns how many were dropped"""
+        with self._lock:
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                self._drop(key)
+            self._stats["invalidations"] += len(keys)
+            return len(keys)
+
+    def _drop(self, key: str):
+        _, _, size, tags = self._data.pop(key)
+        self.bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "size": len(self._data), "bytes": self.bytes}
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+            self.bytes = 0
+
+class DiskEntry(NamedTuple):
+    value: Any
+    fetched_at: float
+    etag: Optional[str]
+    version: Optional[str]
+
+class DiskCache:
+    """SQLite-backed response store shared by every process on the host.
+
+    WAL mode lets uvicorn workers and the bot read while one of them writes.
+    Leases give cross-process single-flight: the process holding a URL's
+    lease fetches it, the others wait for its row to land.
+    """
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.clock = clock
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, body TEXT NOT NULL,"
+                         " fetched_at REAL NOT NULL, etag TEXT, version TEXT)")
+            conn.execute("CREATE TABLE IF NOT EXISTS leases (url TEXT PRIMARY KEY, owner TEXT NOT NULL,"
+                         " expires_at REAL NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, url: str) -> Optional[DiskEntry]:
+        row = self._conn().execute(
+            "SELECT body, fetched_at, etag, version FROM responses WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return DiskEntry(json.loads(row[0]), row[1], row[2], row[3])
+
+    def put(self, url: str, value: Any, fetched_at: float, etag: Optional[str] = None,
+            version: Optional[str] = None):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO responses (url, body, fetched_at, etag, version) VALUES (?, ?, ?, ?, ?)",
+            (url, json.dumps(value), fetched_at, etag, version))
+
+    def acquire_lease(self, url: str, owner: str, seconds: float) -> bool:
+        """Take url's fetch lease unless another live owner holds it"""
+        now = self.clock()
+        cur = self._conn().execute(
+            "INSERT INTO leases (url, owner, expires_at) VALUES (?, ?, ?)"
+            " ON CONFLICT(url) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at"
+            " WHERE leases.expires_at < ? OR leases.owner = excluded.owner",
+            (url, owner, now + seconds, now))
+        return cur.rowcount == 1
+
+    def release_lease(self, url: str, owner: str):
+        self._conn().execute("DELETE FROM leases WHERE url = ? AND owner = ?", (url, owner))
@@ -0,0 +1,162 @@
+import os, re, json
+from typing import Any, Dict, Tuple
+import tools
+from router import find_teams
+from tools import _abbr
+
+COMPACT_ENABLED = os.getenv("COMPACT_TOOL_RESULTS", "1").lower() in ("1", "true", "yes")
+COMPACT_TOKEN_BUDGET = int(os.getenv("COMPACT_TOKEN_BUDGET", "1500"))
+PROMPT_WEEK_CONTEXT = os.getenv("PROMPT_WEEK_CONTEXT", "0").lower() in ("1", "true", "yes")
+
+# Keys that never help answer a question but cost tokens on every call
+DROP_KEYS = {"id", "_id", "__v", "created_at", "updated_at", "createdAt", "updatedAt",
+             "slug", "logo", "logo_url", "image", "image_url", "headshot", "photo", "photo_url"}
+
+POSITIONS = {
+    "qb": ("qb", "quarterback"), "rb": ("rb", "running back", "hb"), "wr": ("wr", "receiver", "wide receiver"),
+    "te": ("te", "tight end"), "lt": ("lt", "left tackle"), "lg": ("lg", "left guard"),
+    "c": ("c", "center"), "rg": ("rg", "right guard"), "rt": ("rt", "right tackle"),
+    "k": ("k", "kicker"), "p": ("p", "punter"), "cb": ("cb", "cornerback"), "lb": ("lb", "linebacker"),
+    "s": ("s", "fs", "ss", "safety"),
+}
+_POSITION_RES = {pos: re.compile(r"\b(" + "|".join(re.escape(a) for a in aliases if len(a) > 1) + r")\d?\b")
+                 for pos, aliases in POSITIONS.items()}
+_POSITION_KEYS = ("position", "pos")
+
+_stats = {"requests": 0, "tokens_before": 0, "tokens_after": 0}
+_encoding = None  # see load_encoding(); False when tiktoken is unavailable
+
+def load_encoding():
+    """The o200k_base encoding, loaded once (False without tiktoken).
+
+    The first load can download the BPE file with a blocking request, so the
+    app and bot call this in a thread at startup rather than on the first
+    synthesis; anything else loads it on its first count_tokens call.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:  # tiktoken is optional; fall back to a chars/4 estimate
+            _encoding = False
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    encoding = load_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+def question_positions(question: str) -> set:
+    text = question.lower()
+    return {pos for pos, pattern in _POSITION_RES.items() if pattern.search(text)}
+
+def _prune(obj):
+    """Drop nulls, empty containers and DROP_KEYS, recursively"""
+    if isinstance(obj, dict):
+        pruned = {k: _prune(v) for k, v in obj.items() if k not in DROP_KEYS}
+        return {k: v for k, v in pruned.items() if v not in (None, "", [], {})}
+    if isinstance(obj, list):
+        return [v for v in (_prune(v) for v in obj) if v not in (None, "", [], {})]
+    return obj
+
+def _involves(entry, teams) -> bool:
+    if _abbr(entry) in teams:
+        return True
+    if isinstance(entry, dict):
+        return any(_abbr(entry.get(k)) in teams for k in ("away", "home", "away_team", "home_team"))
+    return False
+
+def _project(obj, teams: set, positions: set):
+    """Keep only the records about the asked-for teams and player positions"""
+    if isinstance(obj, dict):
+        position = next((obj[k] for k in _POSITION_KEYS if isinstance(obj.get(k), str)), None)
+        projected = {}
+        for k, v in obj.items():
+            # Position-keyed maps like {"QB": {...}, "LT": {...}}
+            if positions and isinstance(k, str) and k.lower() in POSITIONS and k.lower() not in positions \
+                    and position is None:
+                continue
+            projected[k] = _project(v, teams, positions)
+        return projected if projected else obj
+    if isinstance(obj, list):
+        items = obj
+        if teams:
+            kept = [v for v in items if _involves(v, teams)]
+            items = kept or items
+        if positions:
+            kept = [v for v in items if isinstance(v, dict) and any(
+                isinstance(v.get(k), str) and matches_position(v[k], positions) for k in _POSITION_KEYS)]
+            items = kept or items
+        return [_project(v, teams, positions) for v in items]
+    return obj
+
+def matches_position(value: str, positions: set) -> bool:
+    value = value.lower()
+    return any(value in POSITIONS[pos] or _POSITION_RES[pos].fullmatch(value) for pos in positions)
+
+def _fit(obj, budget: int):
+    """Halve the longest list until the JSON fits the token budget"""
+    text = _dumps(obj)
+    while count_tokens(text) > budget:
+        longest = _longest_list(obj)
+        if longest is None or len(longest) <= 1:
+            break
+        del longest[max(1, len(longest) // 2):]
+        if isinstance(obj, dict):
+            obj["_truncated"] = True
+        text = _dumps(obj)
+    return text
+
+def _longest_list(obj):
+    best = None
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            if best is None or len(node) > len(best):
+                best = node
+            stack.extend(node)
+        elif isinstance(node, dict):
+            stack.extend(node.values())
+    return best
+
+def compact_tool_result(tool_result: Dict[str, Any], question: str,
+                        budget: int = COMPACT_TOKEN_BUDGET) -> Tuple[str, Dict[str, int]]:
+    """Compact JSON for a fetch_nfl_data result, projected to the question and capped at budget tokens.
+
+    Returns (json_text, {"before": tokens, "after": tokens}). The input is not mutated.
+    """
+    before_text = json.dumps(tool_result)
+    if not COMPACT_ENABLED:
+        tokens = count_tokens(before_text)
+        return before_text, {"before": tokens, "after": tokens}
+
+    data = _project(_prune(tool_result.get("data")), set(find_teams(question)), question_positions(question))
+    compacted = {"source_url": tool_result["source_url"], "data": data}
+    text = _fit(compacted, budget)
+    report = {"before": count_tokens(before_text), "after": count_tokens(text)}
+    _stats["requests"] += 1
+    _stats["tokens_before"] += report["before"]
+    _stats["tokens_after"] += report["after"]
+    return text, report
+
+def stats() -> Dict[str, int]:
+    return dict(_stats)
+
+_week_context = {"loaded_at": None, "text": None}
+
+def week_context():
+    """Compact week snapshot for the shared prompt prefix (None unless enabled and loaded)"""
+    snapshot = tools._snapshot
+    if not PROMPT_WEEK_CONTEXT or not snapshot.loaded:
+        return None
+    if _week_context["loaded_at"] != snapshot.loaded_at:
+        payload = {"teams": list(snapshot.teams.values()), "matchups": list(snapshot.matchups.values())}
+        _week_context["text"] = _dumps(_prune(payload))
+        _week_context["loaded_at"] = snapshot.loaded_at
+    return _week_context["text"]
@@ -3,31 +3,171 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import os
+import time
+import asyncio
 import discord
+from contextlib import asynccontextmanager
 from discord.ext import commands
+import tools, llm, answer_cache, compact, router, warmer, templates, speculate, followups
+from compact import compact_tool_result, week_context
 from tools import fetch_nfl_data
-from prompts import SYSTEM_PROMPT
-from llm import call_llm
-import json
+from prompts import Conversation, FINAL_SYNTHESIS_INSTRUCTION
+from llm import call_llm, stream_llm
+from telemetry import get_logger, trace, span
+from resilience import REQUEST_DEADLINE, deadline
 
-# Debug: Print environment variables
-print(f"DEBUG - NFL_API_BASE: {os.getenv('NFL_API_BASE')}")
-print(f"DEBUG - DISCORD_TOKEN: {os.getenv('DISCORD_TOKEN')[:20]}..." if os.getenv('DISCORD_TOKEN') else "DEBUG - DISCORD_TOKEN: None")
-print(f"DEBUG - TARGET_CHANNEL_ID: {os.getenv('TARGET_CHANNEL_ID')}")
+log = get_logger("discord")
+
+class NFLBot(commands.Bot):
+    """Bot that owns the shared NFL API / LLM clients for its lifetime"""
+
+    async def setup_hook(self):
+        tools.open_client()
+        if llm._provider() != "none" and os.getenv("OPENAI_API_KEY"):
+            llm.open_client()
+        await asyncio.to_thread(compact.load_encoding)
+        if tools.SNAPSHOT_ENABLED:
+            self.snapshot_task = asyncio.create_task(tools.refresh_snapshot_forever())
+        if warmer.WARM_ENABLED:
+            self.warm_task = asyncio.create_task(warmer.warm_forever())
+
+    async def close(self):
+        if getattr(self, "snapshot_task", None):
+            self.snapshot_task.cancel()
+        if getattr(self, "warm_task", None):
+            self.warm_task.cancel()
+        await tools.close_client()
+        await llm.close_client()
+        await super().close()
 
 # Discord bot setup
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix='!', intents=intents)
+bot = NFLBot(command_prefix='!', intents=intents, help_command=None)
 
 # Configuration
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 TARGET_CHANNEL_ID = int(os.getenv("TARGET_CHANNEL_ID", "0"))  # Channel where bot should respond
+CHANNEL_CONCURRENCY = int(os.getenv("DISCORD_CHANNEL_CONCURRENCY", "4"))  # Questions answered at once per channel
+EDIT_INTERVAL = float(os.getenv("DISCORD_EDIT_INTERVAL", "1.2"))  # Min seconds between edits of a streaming answer
+MESSAGE_LIMIT = 2000  # Discord's per-message character limit
+
+# Per (guild, channel) concurrency slots and the queue-depth gauge
+_channel_slots = {}
+_queue_depth = {"waiting": 0, "active": 0}
+
+def queue_depth():
+    """Snapshot of questions waiting for a slot and currently being answered"""
+    return dict(_queue_depth)
+
+@asynccontextmanager
+async def _channel_slot(channel):
+    guild = getattr(channel, "guild", None)
+    key = (guild.id if guild else None, channel.id)
+    slot = _channel_slots.get(key)
+    if slot is None:
+        slot = _channel_slots[key] = asyncio.Semaphore(CHANNEL_CONCURRENCY)
+
+    _queue_depth["waiting"] += 1
+    try:
+        await slot.acquire()
+    finally:
+        _queue_depth["waiting"] -= 1
+    _queue_depth["active"] += 1
+    try:
+        yield
+    finally:
+        _queue_depth["active"] -= 1
+        slot.release()
+
+def split_message(text, limit=MESSAGE_LIMIT):
+    """Split text into Discord-sized chunks, preferring line then word boundaries"""
+    chunks = []
+    while len(text) > limit:
+        # Only break early at a boundary in the back half, so chunks stay full
+        cut = text.rfind("\n", limit // 2, limit)
+        if cut < 0:
+            cut = text.rfind(" ", limit // 2, limit)
+        if cut < 0:
+            cut = limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip("\n ")
+    chunks.append(text)
+    return chunks
+
+class ProgressiveReply:
+    """A reply that is posted as a placeholder and edited as the answer streams in.
+
+    Edits are throttled to EDIT_INTERVAL to stay inside Discord's rate limits,
+    and text past the 2000-char limit spills into follow-up messages.
+    """
+
+    def __init__(self, channel, header, min_interval=EDIT_INTERVAL):
+        self.channel = channel
+        self.header = header
+        self.min_interval = min_interval
+        self.messages = []
+        self.rendered = []
+        self.last_edit = 0.0
+
+    async def start(self):
+        await self._render(self.header + "…")
+
+    async def update(self, text, final=False):
+        if not final and time.monotonic() - self.last_edit < self.min_interval:
+            return
+        await self._render(self.header + text + ("" if final else " …"))
+
+    async def _render(self, full_text):
+        self.last_edit = time.monotonic()
+        chunks = split_message(full_text)
+        for i, chunk in enumerate(chunks):
+            if i < len(self.messages):
+                if self.rendered[i] != chunk:
+                    await self.messages[i].edit(content=chunk)
+                    self.rendered[i] = chunk
+            else:
+                self.messages.append(await self.channel.send(chunk))
+                self.rendered.append(chunk)
+        # A shorter render (e.g. an error replacing a long partial answer) drops the spilled messages
+        while len(self.messages) > len(chunks):
+            self.rendered.pop()
+            await self.messages.pop().delete()
+
+def _with_sources(answer: str, sources) -> str:
+    """answer plus a Sources line, unless it already cites them (template answers do)"""
+    uncited = [url for url in sources if url not in answer]
+    if not uncited:
+        return answer
+    return f"{answer}\n\n**Sources:** {', '.join(uncited)}"
+
+async def answer_in_channel(channel, question, author=None):
+    """Answer a question in a channel, bounded by the channel's concurrency slots.
+
+    With an author, follow-ups build on that user's recent questions in the channel.
+    """
+    async with _channel_slot(channel):
+        reply = ProgressiveReply(channel, f"**Question:** {question}\n\n**Answer:** ")
+        context = followups.get(channel.id, author.id) if author is not None else None
+        try:
+            await reply.start()
+            # Process the question using your existing agent logic
+            answer, sources = await process_nfl_question(question, on_delta=reply.update, context=context)
+            if author is not None:
+                followups.save(channel.id, author.id, context)
+            await reply.update(_with_sources(answer, sources), final=True)
+        except Exception as e:
+            error_msg = f"Sorry, I encountered an error: {str(e)}"
+            if reply.messages:
+                await reply.update(error_msg, final=True)
+            else:
+                await channel.send(error_msg)
+            log.exception("Error processing question: %s", e)
 
 @bot.event
 async def on_ready():
-    print(f'{bot.user} has connected to Discord!')
-    print(f'Target channel ID: {TARGET_CHANNEL_ID}')
+    log.info("%s has connected to Discord!", bot.user)
+    log.info("Target channel ID: %s", TARGET_CHANNEL_ID)
 
 @bot.event
 async def on_message(message):
@@ -39,125 +179,148 @@ async def on_message(message):
     if message.channel.id != TARGET_CHANNEL_ID:
         return
 
-    # Check if message mentions the bot or uses command prefix
-    if bot.user.mentioned_in(message) or message.content.startswith('!nfl'):
-        # Extract the question (remove bot mention or command prefix)
-        question = message.content.replace(f'<@{bot.user.id}>', '').replace('!nfl', '').strip()
+    # Mentions are answered here; !nfl is handled by the nfl command below
+    if bot.user.mentioned_in(message) and not message.content.startswith('!'):
+        # Extract the question (remove bot mention)
+        question = message.content.replace(f'<@{bot.user.id}>', '').strip()
         
         if not question:
             await message.channel.send("Please ask me a question about NFL Week 1! For example: 'Who is the Broncos starting LT?'")
             return
 
-        # Show typing indicator
-        async with message.channel.typing():
-            try:
-                # Process the question using your existing agent logic
-                answer, sources = await process_nfl_question(question)
-                
-                # Format the response
-                response = f"**Question:** {question}\n\n**Answer:** {answer}\n\n**Sources:** {', '.join(sources)}"
-                
-                # Split long responses if needed (Discord has 2000 character limit)
-                if len(response) > 2000:
-                    # Send answer first
-                    answer_part = f"**Question:** {question}\n\n**Answer:** {answer}"
-                    await message.channel.send(answer_part[:2000])
-                    
-                    # Send sources separately
-                    sources_part = f"**Sources:** {', '.join(sources)}"
-                    await message.channel.send(sources_part)
-                else:
-                    await message.channel.send(response)
-                    
-            except Exception as e:
-                error_msg = f"Sorry, I encountered an error: {str(e)}"
-                await message.channel.send(error_msg)
-                print(f"Error processing question: {e}")
+        await answer_in_channel(message.channel, question, message.author)
+        return
 
     # Process commands
     await bot.process_commands(message)
 
-async def process_nfl_question(question):
-    """Process NFL questions using your existing agent logic"""
-    messages = [
-        {"role":"system","content": SYSTEM_PROMPT},
-        {"role":"user","content": question}
-    ]
+async def process_nfl_question(question, on_delta=None, context=None):
+    """Process NFL questions using your existing agent logic
+
+    When on_delta is given the synthesis is streamed and on_delta(text_so_far)
+    is awaited as each token arrives. With a followups.ChannelContext the
+    question is read as a follow-up to its recent turns, reusing their data.
+    """
+    with trace("discord", streaming=on_delta is not None), deadline(REQUEST_DEADLINE):
+        if context is None:
+            return await _answer_question(question, on_delta)
+        question = context.expand(question)
+        fetch = followups.ContextFetch(context, fetch_nfl_data)
+        answer, sources = await _answer_question(question, on_delta, fetch, context.history())
+        if sources:
+            # Only the calls whose data made it into the answer (not a missed speculation)
+            context.record(question, answer, [arguments for key, arguments in fetch.calls.items() if key[0] in sources])
+        return answer, sources
+
+async def _answer_question(question, on_delta, fetch=None, history=()):
+    log.info("Processing Discord question: %s", question)
+    fetch = fetch or fetch_nfl_data
     
-    print(f"Processing Discord question: {question}")
+    cached = answer_cache.recall(question)
+    if cached:
+        return cached["answer"], cached["sources"]
     
-    # Start a conversation loop for data gathering
-    conversation_messages = messages.copy()
+    # Start a conversation loop for data gathering; the stable prefix is shared by every call
+    conversation = Conversation(question, week_context(), history)
     max_iterations = 5
     iteration = 0
+    calls = []
+    tool_results = []
+    # A confident local route stands in for the first LLM decision, then goes straight to synthesis
+    with span("route") as record:
+        routed = router.route(question)
+        record.update(kind=routed.kind, confident=routed.confident)
+    # Otherwise the predicted first fetch runs while the LLM makes its first decision
+    speculation = None if routed.confident else speculate.start(question, fetch, routed)
     
     while iteration < max_iterations:
-        print(f"DEBUG - Iteration {iteration + 1}")
+        log.debug("Iteration %d", iteration + 1)
         
         # Get the next action from the LLM
-        decision = call_llm(conversation_messages, tools_schema=True)
-        print(f"DEBUG - LLM decision: {decision}")
+        if routed.confident and iteration == 0:
+            decision = routed.decision()
+        elif routed.confident and iteration == 1:
+            decision = {"content": "Routed locally"}
+        else:
+            try:
+                decision = await call_llm(conversation.messages, tools_schema=True)
+            except BaseException:
+                speculate.settle(speculation)
+                raise
+        log.debug("LLM decision: %s", decision)
         
         if "tool_call" in decision:
-            tc = decision["tool_call"]
-            if tc["name"] != "fetch_nfl_data":
+            turn_calls = decision.get("tool_calls") or [decision["tool_call"]]
+            if any(tc["name"] != "fetch_nfl_data" for tc in turn_calls):
+                speculate.settle(speculation)
                 raise ValueError("Unknown tool requested")
             
-            # Fetch the data
-            tool_result = fetch_nfl_data(**tc["arguments"])
-            print(f"DEBUG - Fetched data: {tool_result}")
-            
-            # Add the tool call and result to the conversation
-            conversation_messages.append({
-                "role": "assistant",
-                "content": f"I'll fetch {tc['arguments']['kind']} data for you.",
-                "tool_calls": [{
-                    "id": f"call_{iteration}",
-                    "type": "function",
-                    "function": {
-                        "name": tc["name"],
-                        "arguments": json.dumps(tc["arguments"])
-                    }
-                }]
-            })
+            # Fetch the data for every tool call of this turn concurrently
+            try:
+                turn_results = await asyncio.gather(*(speculate.resolve(speculation, tc["arguments"], fetch)
+                                                      for tc in turn_calls))
+            finally:
+                speculate.settle(speculation)
+                speculation = None
+            calls.extend(tc["arguments"] for tc in turn_calls)
+            tool_results.extend(turn_results)
+            log.debug("Fetched data: %s", turn_results)
             
-            conversation_messages.append({
-                "role": "tool",
-                "tool_call_id": f"call_{iteration}",
-                "content": json.dumps(tool_result)
-            })
+            # Add the tool calls and all their results to the conversation in one step
+            turn_calls = [{**tc, "id": tc.get("id") or f"call_{iteration}_{i}"} for i, tc in enumerate(turn_calls)]
+            tool_contents = []
+            for tool_result in turn_results:
+                tool_content, tokens = compact_tool_result(tool_result, question)
+                log.debug("Tool result tokens for %s: %d -> %d", tool_result['source_url'], tokens['before'], tokens['after'])
+                tool_contents.append(tool_content)
+            conversation.add_tool_turn(turn_calls, tool_contents, [r["source_url"] for r in turn_results])
             
             iteration += 1
             
         elif "content" in decision:
+            speculate.settle(speculation)
             # LLM is ready to synthesize the final answer
-            print(f"DEBUG - LLM ready to synthesize: {decision['content']}")
+            log.debug("LLM ready to synthesize: %s", decision['content'])
+            
+            cached = answer_cache.lookup(question, calls)
+            if cached:
+                return cached["answer"], cached["sources"]
+            
+            # A single lookup with one factual answer is rendered locally
+            if len(calls) == 1:
+                with span("template_answer") as record:
+                    answer = templates.answer(question, calls[0], tool_results[0])
+                    record["hit"] = answer is not None
+                if answer is not None:
+                    sources = list(conversation.sources)
+                    answer_cache.remember(question, calls, answer, sources)
+                    return answer, sources
             
             # Ask for final synthesis
-            final_messages = conversation_messages + [
-                {"role": "user", "content": "Now synthesize a complete answer to the original question using all the data you've gathered. Be comprehensive and cite all sources."}
-            ]
+            final_messages = conversation.with_instruction(FINAL_SYNTHESIS_INSTRUCTION)
             
-            synthesis_result = call_llm(final_messages, tools_schema=False)
+            with span("synthesis"):
+                if on_delta is None:
+                    synthesis_result = await call_llm(final_messages, tools_schema=False)
+                else:
+                    # A stream cut off mid-answer raises, so only a finished answer reaches the cache
+                    parts = []
+                    async for delta in stream_llm(final_messages):
+                        parts.append(delta)
+                        await on_delta("".join(parts))
+                    synthesis_result = {"content": "".join(parts)} if parts else {}
             
             if "content" in synthesis_result:
                 answer = synthesis_result["content"]
-                # Extract all source URLs from the conversation
-                sources = []
-                for msg in conversation_messages:
-                    if msg.get("role") == "tool":
-                        try:
-                            data = json.loads(msg["content"])
-                            if "source_url" in data:
-                                sources.append(data["source_url"])
-                        except:
-                            pass
+                sources = list(conversation.sources)
+                answer_cache.remember(question, calls, answer, sources)
                 return answer, sources
             else:
                 answer = f"DEBUG: Final synthesis failed. Raw result: {synthesis_result}"
                 return answer, []
         
         else:
+            speculate.settle(speculation)
             # Unexpected response
             answer = f"DEBUG: Unexpected LLM response: {decision}"
             return answer, []
@@ -172,23 +335,16 @@ async def nfl_command(ctx, *, question):
     if ctx.channel.id != TARGET_CHANNEL_ID:
         return
     
-    async with ctx.channel.typing():
-        try:
-            answer, sources = await process_nfl_question(question)
-            response = f"**Question:** {question}\n\n**Answer:** {answer}\n\n**Sources:** {', '.join(sources)}"
-            
-            if len(response) > 2000:
-                answer_part = f"**Question:** {question}\n\n**Answer:** {answer}"
-                await ctx.send(answer_part[:2000])
-                
-                sources_part = f"**Sources:** {', '.join(sources)}"
-                await ctx.send(sources_part)
-            else:
-                await ctx.send(response)
-                
-        except Exception as e:
-            error_msg = f"Sorry, I encountered an error: {str(e)}"
-            await ctx.send(error_msg)
+    await answer_in_channel(ctx.channel, question, ctx.author)
+
+@bot.command(name='queue')
+async def queue_command(ctx):
+    """Show how many questions are queued and in progress"""
+    if ctx.channel.id != TARGET_CHANNEL_ID:
+        return
+
+    depth = queue_depth()
+    await ctx.send(f"Questions in progress: {depth['active']} | waiting: {depth['waiting']}")
 
 @bot.command(name='help')
 async def help_command(ctx):
@@ -203,12 +359,15 @@ async def help_command(ctx):
 1. **Mention the bot:** @YourBotName Who is the Broncos starting LT?
 2. **Use command:** !nfl Who is the Broncos starting LT?
 3. **Get help:** !help
+4. **Queue status:** !queue
 
 **Example questions:**
 - Who is the Broncos starting LT in Week 1?
 - What are the Week 1 matchups?
+- Who played the Chiefs in week 3 of 2024?
 - Compare the starting QBs for the Chiefs and Raiders
 - Who are the key players for the Eagles this week?
+- ...then follow up with "and their QB?"
 
 The bot will automatically fetch relevant data and provide comprehensive answers!
 """
@@ -216,18 +375,27 @@ The bot will automatically fetch relevant data and provide comprehensive answers
 
 def run_discord_bot():
     """Run the Discord bot"""
+    log.debug("NFL_API_BASE: %s", os.getenv('NFL_API_BASE'))
+    log.debug("DISCORD_TOKEN set: %s", bool(DISCORD_TOKEN))
+    log.debug("TARGET_CHANNEL_ID: %s", TARGET_CHANNEL_ID)
     if not DISCORD_TOKEN:
-        print("ERROR: DISCORD_TOKEN not found in environment variables")
+        log.error("DISCORD_TOKEN not found in environment variables")
         return
     
     if TARGET_CHANNEL_ID == 0:
-        print("ERROR: TARGET_CHANNEL_ID not found in environment variables")
+        log.error("TARGET_CHANNEL_ID not found in environment variables")
+        return
+    
+    try:
+        tools.api_base()
+    except RuntimeError as e:
+        log.error("%s", e)
         return
     
     try:
         bot.run(DISCORD_TOKEN)
     except Exception as e:
-        print(f"Error running Discord bot: {e}")
+        log.error("Error running Discord bot: %s", e)
 
 if __name__ == "__main__":
     run_discord_bot()
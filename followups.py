@@ -0,0 +1,173 @@
+"""Per-channel, per-user conversation context so follow-up questions reuse what was already fetched.
+
+Each (channel, user) keeps its last few turns, the teams / week they were
+about and the tool results they fetched. A follow-up that names no team
+("and their QB?") is expanded with the previous turn's teams and week before
+routing, its fetches are served from the stored results while they are fresh
+and unchanged, and older turns are folded into a one-line summary so the
+prompt stays small. Contexts live in a byte-capped LRU with a TTL.
+"""
+import os, re, json, time, threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import tools
+from cache import AnswerCache
+from compact import question_positions
+from router import find_teams, find_week
+from teams import TEAMS
+
+FOLLOWUP_CONTEXT = os.getenv("FOLLOWUP_CONTEXT", "1").lower() in ("1", "true", "yes")
+FOLLOWUP_TTL = float(os.getenv("FOLLOWUP_TTL", "900"))
+FOLLOWUP_BYTES = int(os.getenv("FOLLOWUP_BYTES", str(4 * 1024 * 1024)))
+FOLLOWUP_TURNS = int(os.getenv("FOLLOWUP_TURNS", "3"))        # turns kept verbatim in the prompt
+FOLLOWUP_RESULTS = int(os.getenv("FOLLOWUP_RESULTS", "6"))    # tool results kept per context
+FOLLOWUP_ANSWER_CHARS = 600
+
+# Pronouns and openers that lean on the previous turn
+_REFERENCE_RE = re.compile(r"\b(they|them|their|theirs|he|his|him|it|its|that team|those|same)\b"
+                           r"|^\s*(and|also|what about|how about|and what about)\b")
+
+_contexts = AnswerCache(max_bytes=FOLLOWUP_BYTES, ttl=FOLLOWUP_TTL)
+_lock = threading.Lock()
+_stats = {"followups": 0, "reused_results": 0, "fetched_results": 0}
+
+def stats() -> Dict[str, int]:
+    """Follow-ups expanded, tool results reused vs. fetched, and the store's own counters"""
+    with _lock:
+        counts = dict(_stats)
+    return {**counts, **{f"store_{k}": v for k, v in _contexts.stats().items()}}
+
+def _count(name: str):
+    with _lock:
+        _stats[name] += 1
+
+def _name(abbr: str) -> str:
+    city, nickname = TEAMS[abbr]
+    return f"{city} {nickname}"
+
+def _call_teams(arguments: Dict[str, Any]) -> List[str]:
+    found = []
+    for key in ("abbr", "away", "home"):
+        try:
+            abbr = tools.normalize_abbr(arguments[key]) if arguments.get(key) else None
+        except ValueError:
+            abbr = None
+        if abbr and abbr not in found:
+            found.append(abbr)
+    return found
+
+class ChannelContext:
+    """Recent turns, resolved entities and fetched tool results of one conversation"""
+
+    def __init__(self):
+        self.turns: List[Dict[str, str]] = []
+        self.summary: List[str] = []
+        self.teams: List[str] = []
+        self.week: Dict[str, int] = {}
+        self.results: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()  # request key -> {result, version, at, size}
+
+    @property
+    def size(self) -> int:
+        turns = sum(len(t["question"]) + len(t["answer"]) for t in self.turns)
+        return turns + sum(map(len, self.summary)) + sum(r["size"] for r in self.results.values())
+
+    def expand(self, question: str) -> str:
+        """question with the teams and week it refers back to, when it names none of its own"""
+        if not self.teams or find_teams(question):
+            return question
+        # "their QB?" / "what about the LT" lean on the last turn; so does a bare "QB?"
+        bare_position = len(question.split()) <= 4 and question_positions(question)
+        if not (_REFERENCE_RE.search(question.lower()) or bare_position):
+            return question
+        _count("followups")
+        about = ", ".join(_name(abbr) for abbr in self.teams)
+        if self.week and not find_week(question):
+            about += f", week {self.week['week']}"
+            if "season" in self.week:
+                about += f" of {self.week['season']}"
+        return f"{question} ({about})"
+
+    def history(self) -> List[Dict[str, str]]:
+        """Earlier turns as messages: a summary line for old ones, then the recent ones verbatim"""
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": "Earlier in this conversation: " + "; ".join(self.summary)})
+        for turn in self.turns:
+            messages.append({"role": "user", "content": turn["question"]})
+            messages.append({"role": "assistant", "content": turn["answer"]})
+        return messages
+
+    def cached_result(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """A stored tool result still within its fetch TTL and matching the latest data version"""
+        entry = self.results.get(key)
+        if entry is None:
+            return None
+        url, kind, _ = key
+        fresh = time.time() - entry["at"] <= tools._ttl(url, kind)
+        if not fresh or tools.data_version(url) != entry["version"]:
+            del self.results[key]
+            return None
+        self.results.move_to_end(key)
+        return entry["result"]
+
+    def store_result(self, key: tuple, result: Dict[str, Any]):
+        """Keep result under its tools.request_key"""
+        self.results[key] = {"result": result, "version": tools.data_version(key[0]), "at": time.time(),
+                             "size": len(json.dumps(result, default=str))}
+        self.results.move_to_end(key)
+        while len(self.results) > FOLLOWUP_RESULTS:
+            self.results.popitem(last=False)
+
+    def record(self, question: str, answer: str, calls: List[Dict[str, Any]]):
+        """Remember a finished turn and what it was about, folding the oldest turn into the summary"""
+        teams = find_teams(question)
+        for call in calls:
+            teams += [abbr for abbr in _call_teams(call) if abbr not in teams]
+        if teams:
+            self.teams = teams[:2]
+        weeks = [{k: call[k] for k in ("season", "week") if k in call} for call in calls]
+        if calls:
+            self.week = next((w for w in weeks if "week" in w), {})
+        if len(answer) > FOLLOWUP_ANSWER_CHARS:
+            answer = answer[:FOLLOWUP_ANSWER_CHARS].rsplit(" ", 1)[0] + " …"
+        self.turns.append({"question": question, "answer": answer})
+        while len(self.turns) > FOLLOWUP_TURNS:
+            old = self.turns.pop(0)
+            self.summary = (self.summary + [f"asked {old['question']!r}"])[-FOLLOWUP_TURNS:]
+
+class ContextFetch:
+    """fetch_nfl_data stand-in that serves a context's stored results before fetching"""
+
+    def __init__(self, context: ChannelContext, fetch=None):
+        self.context = context
+        self.fetch = fetch or tools.fetch_nfl_data
+        self.calls: Dict[tuple, Dict[str, Any]] = {}  # request key -> arguments
+
+    async def __call__(self, **arguments):
+        key = tools.request_key(**arguments)
+        self.calls[key] = arguments
+        result = self.context.cached_result(key)
+        if result is not None:
+            _count("reused_results")
+            return result
+        result = await self.fetch(**arguments)
+        _count("fetched_results")
+        self.context.store_result(key, result)
+        return result
+
+def _key(channel_id, user_id) -> str:
+    return f"{channel_id}:{user_id}"
+
+def get(channel_id, user_id) -> Optional[ChannelContext]:
+    """The (channel, user) conversation context, new if none is live (None when disabled)"""
+    if not FOLLOWUP_CONTEXT:
+        return None
+    return _contexts.get(_key(channel_id, user_id)) or ChannelContext()
+
+def save(channel_id, user_id, context: Optional[ChannelContext]):
+    """Store context back, refreshing its TTL, LRU position and byte size"""
+    if context is not None:
+        _contexts.put(_key(channel_id, user_id), context, context.size)
+
+def clear():
+    _contexts.clear()
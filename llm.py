@@ -1,10 +1,131 @@
-import os, re
-from openai import OpenAI
-from typing import Dict, Any, List
+import os, re, sys, time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, List, Literal, Optional, AsyncIterator
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, create_model, field_validator, model_validator
+from teams import normalize_abbr
+from telemetry import get_logger, span, annotate, LLM_TOKENS
+from resilience import CircuitBreaker, DeadlineExceeded, remaining
+from admission import AdmissionRejected, Scheduler, estimate_tokens
 
-PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()
-MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+log = get_logger("llm")
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30.0"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+# 429s are retried here, after the provider's Retry-After, so every caller backs off together
+LLM_RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "2"))
+
+_client: Optional["AsyncOpenAI"] = None
+_usage = {"calls": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0}
+breaker = CircuitBreaker("llm", LLM_BREAKER_FAILURES, LLM_BREAKER_RESET)
+scheduler = Scheduler()
+
+def _provider() -> str:
+    return os.getenv("LLM_PROVIDER", "openai").lower()
+
+def _model() -> str:
+    return os.getenv("LLM_MODEL") or "gpt-4o-mini"
+
+def __getattr__(name):
+    # The OpenAI SDK is the slowest import in the app; load it when a client is first needed
+    if name in ("openai", "AsyncOpenAI"):
+        import openai
+        globals().update(openai=openai, AsyncOpenAI=openai.AsyncOpenAI)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Attribute access through the module goes via __getattr__ (and honours test patches)
+_sdk = sys.modules[__name__]
+
+def open_client() -> "AsyncOpenAI":
+    """Return the shared AsyncOpenAI client, creating it on first use"""
+    global _client
+    if _client is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise RuntimeError("OPENAI_API_KEY is required when using OpenAI provider")
+        # The SDK's own retries would bypass the scheduler; _create retries 429s instead
+        _client = _sdk.AsyncOpenAI(api_key=api_key, timeout=LLM_TIMEOUT, max_retries=0)
+    return _client
+
+def usage_stats() -> Dict[str, int]:
+    """Prompt (cached vs. total) and completion tokens reported by the provider"""
+    return dict(_usage)
+
+def _record_usage(usage) -> Optional[int]:
+    """Record reported usage; returns the call's total tokens (None if unreported)"""
+    if usage is None:
+        return None
+    def tokens(obj, name):
+        value = getattr(obj, name, None)
+        return value if isinstance(value, int) else 0
+    prompt = tokens(usage, "prompt_tokens")
+    cached = tokens(getattr(usage, "prompt_tokens_details", None), "cached_tokens")
+    completion = tokens(usage, "completion_tokens")
+    _usage["calls"] += 1
+    _usage["prompt_tokens"] += prompt
+    _usage["cached_prompt_tokens"] += cached
+    _usage["completion_tokens"] += completion
+    LLM_TOKENS.inc(cached, type="cached_prompt")
+    LLM_TOKENS.inc(prompt - cached, type="uncached_prompt")
+    LLM_TOKENS.inc(completion, type="completion")
+    annotate(prompt_tokens=prompt, cached_tokens=cached, completion_tokens=completion)
+    log.debug("LLM usage - prompt %d (cached %d, uncached %d), completion %d",
+              prompt, cached, prompt - cached, completion)
+    return prompt + completion
+
+def _record_outcome(error: Exception = None):
+    """Feed the breaker: connection errors, timeouts, 429s and 5xx count against the provider"""
+    if error is None:
+        breaker.record_success()
+    elif isinstance(error, (_sdk.openai.APIConnectionError, _sdk.openai.APITimeoutError)) or (
+            isinstance(error, _sdk.openai.APIStatusError) and (error.status_code >= 500 or error.status_code == 429)):
+        breaker.record_failure()
+
+def _retry_after(error: Exception) -> float:
+    """Seconds the provider asked us to wait (retry-after-ms, retry-after seconds or date), default 1"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return 1.0
+
+async def _create(client: "AsyncOpenAI", messages: List[Dict[str, str]], **kwargs):
+    """chat.completions.create through the admission scheduler; returns (response, tokens reserved)"""
+    reserved = estimate_tokens(messages, TOOLS_SCHEMA)
+    attempt = 0
+    while True:
+        await scheduler.acquire(reserved)
+        try:
+            response = await client.chat.completions.create(
+                model=_model(), messages=messages, tools=TOOLS_SCHEMA, timeout=remaining(LLM_TIMEOUT), **kwargs)
+            return response, reserved
+        except _sdk.openai.RateLimitError as e:
+            # The rejected attempt used no tokens; the retry reserves its own
+            scheduler.settle(reserved, 0)
+            wait = _retry_after(e)
+            scheduler.rate_limited(wait)
+            left = remaining()
+            if attempt >= LLM_RATE_LIMIT_RETRIES or (left is not None and left <= wait):
+                # Still limited: backpressure for the caller, not a heuristic guess
+                _record_outcome(e)
+                raise AdmissionRejected(f"LLM provider is rate limiting; retry in {wait:.0f}s", wait) from e
+            attempt += 1
+            log.info("LLM rate limited, retrying after %.1fs", wait)
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
 
 # Tool schema for fetch_nfl_data
 TOOLS_SCHEMA = [
@@ -32,6 +153,16 @@ TOOLS_SCHEMA = [
                     "home": {
                         "type": "string",
                         "description": "Home team abbreviation (required for 'matchup' kind)"
+                    },
+                    "season": {
+                        "type": "integer",
+                        "description": "Season year, e.g. 2025 (defaults to the current season)"
+                    },
+                    "week": {
+                        "type": "integer",
+                        "minimum": 1,
+                        "maximum": 22,
+                        "description": "Week number; 19-22 are the playoffs (defaults to the current week)"
                     }
                 },
                 "required": ["kind"]
@@ -40,56 +171,156 @@ TOOLS_SCHEMA = [
     }
 ]
 
-def call_llm(messages: List[Dict[str, str]], tools_schema: bool = True) -> Dict[str, Any]:
-    print(f"step 1")
+class ToolCallError(ValueError):
+    """A tool call from the model that can't be run as-is"""
+
+class _FetchArguments(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    @field_validator("abbr", "away", "home", check_fields=False)
+    @classmethod
+    def _team(cls, value):
+        return None if value is None else normalize_abbr(value)
+
+    @model_validator(mode="after")
+    def _required_for_kind(self):
+        if self.kind == "team" and not self.abbr:
+            raise ValueError("team requires abbr")
+        if self.kind == "matchup" and not (self.away and self.home):
+            raise ValueError("matchup requires away & home")
+        return self
+
+_JSON_TYPES = {"string": str, "integer": int, "number": float, "boolean": bool}
+
+def _arguments_model(tool, base=BaseModel):
+    """pydantic model for a tool's JSON-schema parameters"""
+    function = tool["function"]
+    parameters = function["parameters"]
+    fields = {}
+    for name, spec in parameters["properties"].items():
+        annotation = Literal[tuple(spec["enum"])] if "enum" in spec else _JSON_TYPES[spec["type"]]
+        bounds = {"ge": spec.get("minimum"), "le": spec.get("maximum")}
+        if name in parameters.get("required", ()):
+            fields[name] = (annotation, Field(..., **bounds))
+        else:
+            fields[name] = (Optional[annotation], Field(None, **bounds))
+    return create_model(f"{function['name']}_arguments", __base__=base, **fields)
+
+# Built once at import; decoding goes straight from the JSON string to a validated model
+TOOL_MODELS = {"fetch_nfl_data": _arguments_model(TOOLS_SCHEMA[0], base=_FetchArguments)}
+
+def parse_tool_arguments(name: str, arguments: str) -> Dict[str, Any]:
+    """Decode and validate a tool call's JSON arguments, normalizing team abbreviations"""
+    model = TOOL_MODELS.get(name)
+    if model is None:
+        raise ToolCallError(f"unknown tool: {name}")
+    try:
+        parsed = model.model_validate_json(arguments or "{}")
+    except ValidationError as e:
+        error = e.errors()[0]
+        where = ".".join(map(str, error["loc"]))
+        raise ToolCallError(f"invalid {name} arguments: {where + ': ' if where else ''}{error['msg']}") from None
+    return parsed.model_dump(exclude_none=True)
+
+async def call_llm(messages: List[Dict[str, str]], tools_schema: bool = True) -> Dict[str, Any]:
     """Call OpenAI GPT-4o-mini with tool calling capabilities"""
-    
-    if PROVIDER == "none":
-        print(f"step2.1")
+    if _provider() == "none":
         # Fallback to MVP heuristic router for testing
         return _fallback_heuristic(messages[-1]["content"])
     
-    if not OPENAI_API_KEY:
-        raise RuntimeError("OPENAI_API_KEY is required when using OpenAI provider")
+    if not breaker.allow():
+        # Provider is known to be down: answer from the heuristic right away
+        log.info("LLM circuit open, using heuristic")
+        return _fallback_heuristic(messages[-1]["content"])
     
-    print(f"step2.2")
-    client = OpenAI(api_key=OPENAI_API_KEY)
-    print(f"step2.3 - MODEL - {MODEL}")
+    client = open_client()
     try:
-        print(f"step2.4")
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=messages
-            # tools=TOOLS_SCHEMA if tools_schema else None,
-            # tool_choice="auto" if tools_schema else None,
-            # temperature=0.1,
-            # max_tokens=1000
-        )
-        print(f"step2.5")
-        print(f"client - {client}")
-        print(f"Response - {response}")
-        print(f"Response - {response.choices[0]}")
+        with span("llm", purpose="decision" if tools_schema else "synthesis", model=_model()):
+            # Tools are always sent so every call shares the same cacheable prefix;
+            # synthesis calls just forbid using them
+            response, reserved = await _create(
+                client,
+                messages,
+                tool_choice="auto" if tools_schema else "none",
+                # temperature=0.1,
+                # max_tokens=1000
+            )
+            scheduler.settle(reserved, _record_usage(getattr(response, "usage", None)))
+        _record_outcome()
+        log.debug("LLM response: %s", response.choices[0])
         
         choice = response.choices[0]
         
         if tools_schema and choice.message.tool_calls:
-            # Return tool call information
-            tool_call = choice.message.tool_calls[0]
-            return {
-                "tool_call": {
+            # Return every tool call; "tool_call" stays as the first for single-call callers
+            tool_calls = [
+                {
+                    "id": tool_call.id,
                     "name": tool_call.function.name,
-                    "arguments": eval(tool_call.function.arguments)
+                    "arguments": parse_tool_arguments(tool_call.function.name, tool_call.function.arguments)
                 }
-            }
+                for tool_call in choice.message.tool_calls
+            ]
+            return {"tool_call": tool_calls[0], "tool_calls": tool_calls}
         else:
             # Return the text response
             return {"content": choice.message.content}
             
+    except ToolCallError as e:
+        # Not worth a round trip to the NFL API or another LLM call
+        log.warning("Discarding malformed tool call: %s", e)
+        return _fallback_heuristic(messages[-1]["content"])
+    except (AdmissionRejected, DeadlineExceeded):
+        # Backpressure or no time left: the caller answers 503 / 504 rather than a heuristic guess
+        raise
     except Exception as e:
         # Fallback to heuristic if OpenAI fails
-        print(f"OpenAI call failed: {e}")
+        _record_outcome(e)
+        log.warning("OpenAI call failed: %s", e)
         return _fallback_heuristic(messages[-1]["content"])
 
+async def stream_llm(messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+    """Streaming mode of call_llm: yield completion text deltas as they arrive.
+
+    Yields nothing when the provider is disabled or the call fails before the
+    first delta, so callers can fall back exactly as they do when call_llm
+    returns no content. A failure after that re-raises: the text so far is a
+    truncated answer, not one to show as final or cache. AdmissionRejected and
+    DeadlineExceeded always reach the caller, as they do from call_llm.
+    """
+    if _provider() == "none" or not breaker.allow():
+        return
+    
+    client = open_client()
+    streamed = False
+    try:
+        start = time.perf_counter()
+        with span("llm", purpose="synthesis_stream", model=_model()) as record:
+            stream, reserved = await _create(
+                client,
+                messages,
+                tool_choice="none",
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    record.setdefault("first_token_ms", (time.perf_counter() - start) * 1000)
+                    streamed = True
+                    yield chunk.choices[0].delta.content
+                elif not chunk.choices:
+                    # The final chunk carries usage and no choices
+                    scheduler.settle(reserved, _record_usage(getattr(chunk, "usage", None)))
+        _record_outcome()
+    except (AdmissionRejected, DeadlineExceeded):
+        # As in call_llm: backpressure and an expired deadline reach the caller
+        raise
+    except Exception as e:
+        _record_outcome(e)
+        log.warning("OpenAI stream failed: %s", e)
+        if streamed:
+            raise
+
 def _fallback_heuristic(user_content: str) -> Dict[str, Any]:
     """Fallback heuristic router for when OpenAI is unavailable"""
     TEAMS = r"(ari|atl|bal|buf|car|chi|cin|cle|dal|den|det|gb|hou|ind|jax|kc|lv|lac|lar|mia|min|ne|no|nyg|nyj|phi|pit|sea|sf|tb|ten|was)"
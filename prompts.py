@@ -1,4 +1,7 @@
-SYSTEM_PROMPT = """You are an NFL Week 1 analyst expert. Your role is to:
+import json
+from tools import CURRENT_SEASON, CURRENT_WEEK
+
+SYSTEM_PROMPT = f"""You are an NFL analyst expert. It is currently week {CURRENT_WEEK} of the {CURRENT_SEASON} season; questions are about this week unless they name another season or week. Your role is to:
 
 1. Understand user questions about NFL teams, players, and matchups
 2. Use the fetch_nfl_data tool to retrieve relevant information
@@ -13,3 +16,64 @@ When analyzing data:
 - Include relevant statistics, player names, and team details when available
 
 Remember: You can only use information from the fetch_nfl_data tool responses. Do not make assumptions or use external knowledge."""
+
+SYNTHESIS_INSTRUCTION = "Based on this data, please answer the original question in a clear, human-readable way. Include specific details from the data and cite the sources."
+
+FINAL_SYNTHESIS_INSTRUCTION = "Now synthesize a complete answer to the original question using all the data you've gathered. Be comprehensive and cite all sources."
+
+_prefixes = {}
+
+def stable_prefix(context=None):
+    """The cacheable head of every conversation: system prompt plus optional shared data.
+
+    Built once per distinct context and reused as-is, so every LLM call starts
+    with byte-identical messages and provider-side prompt caching can hit.
+    """
+    prefix = _prefixes.get(context)
+    if prefix is None:
+        prefix = [{"role": "system", "content": SYSTEM_PROMPT}]
+        if context:
+            prefix.append({"role": "system", "content": f"Shared NFL data for {CURRENT_SEASON} week {CURRENT_WEEK}:\n{context}"})
+        # Only keep the latest context's prefix around
+        _prefixes.clear()
+        prefix = _prefixes[context] = tuple(prefix)
+    return prefix
+
+class Conversation:
+    """Messages for one question: stable prefix, then the question, then tool turns.
+
+    Variable content is only ever appended after the prefix, never spliced in.
+    """
+
+    def __init__(self, question, context=None, history=()):
+        self.question = question
+        self.prefix = stable_prefix(context)
+        # Earlier turns of a conversation go after the prefix so it stays cacheable
+        self.turns = [*history, {"role": "user", "content": question}]
+        self.sources = []
+
+    @property
+    def messages(self):
+        return [*self.prefix, *self.turns]
+
+    def add_tool_turn(self, calls, contents, sources, note=None):
+        """Append one assistant turn carrying every tool call, then each call's result"""
+        kinds = ", ".join(call["arguments"]["kind"] for call in calls)
+        self.turns.append({
+            "role": "assistant",
+            "content": note or f"I'll fetch {kinds} data for you.",
+            "tool_calls": [{
+                "id": call["id"],
+                "type": "function",
+                "function": {
+                    "name": call["name"],
+                    "arguments": json.dumps(call["arguments"])
+                }
+            } for call in calls]
+        })
+        for call, content in zip(calls, contents):
+            self.turns.append({"role": "tool", "tool_call_id": call["id"], "content": content})
+        self.sources.extend(sources)
+
+    def with_instruction(self, instruction):
+        return [*self.messages, {"role": "user", "content": instruction}]
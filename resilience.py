@@ -0,0 +1,194 @@
+"""Circuit breakers, request deadlines and hedged requests for the upstream calls."""
+import os, time, asyncio, threading, contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Optional
+
+# Overall budget for answering one question, shared by every fetch and LLM call it makes
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "25"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open; retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+class DeadlineExceeded(TimeoutError):
+    """The request's overall deadline passed before the call could start"""
+
+class CircuitBreaker:
+    """Thread-safe consecutive-failure breaker.
+
+    Opens after failure_threshold failures in a row, rejects calls for
+    reset_timeout seconds, then lets a single trial call through (half-open):
+    success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+        self._trial_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "rejected": 0, "failures": 0, "successes": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current()
+
+    def _current(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            self._state, self._trial = HALF_OPEN, False
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now (claims the trial slot when half-open)"""
+        with self._lock:
+            state = self._current()
+            if state == CLOSED:
+                return True
+            # A trial that never reported back (e.g. was cancelled) gives way after reset_timeout
+            if state == HALF_OPEN and (not self._trial or self.clock() - self._trial_at >= self.reset_timeout):
+                self._trial, self._trial_at = True, self.clock()
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def check(self):
+        """allow() or raise CircuitOpenError"""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return max(0.0, self.reset_timeout - (self.clock() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self._stats["successes"] += 1
+            self._state, self._failures, self._trial = CLOSED, 0, False
+
+    def record_failure(self):
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._stats["opened"] += 1
+                self._state, self._opened_at, self._trial = OPEN, self.clock(), False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "open": int(self._current() != CLOSED)}
+
+    def reset(self):
+        with self._lock:
+            self._state, self._failures, self._trial = CLOSED, 0, False
+
+# --- deadlines ---------------------------------------------------------------
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("nfl_agent_deadline", default=None)
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """Bound everything awaited inside to finish within seconds (None or <= 0: no limit).
+
+    Nested deadlines never extend an outer one.
+    """
+    if not seconds or seconds <= 0:
+        yield
+        return
+    at = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(at if outer is None else min(outer, at))
+    try:
+        yield
+    finally:
+        try:
+            _deadline.reset(token)
+        except ValueError:
+            pass
+
+@contextmanager
+def detached():
+    """Run work shared by several requests without the current one's deadline.
+
+    Each request then bounds its own wait for the shared result.
+    """
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        try:
+            _deadline.reset(token)
+        except ValueError:
+            pass
+
+def remaining(default: Optional[float] = None) -> Optional[float]:
+    """Seconds left before the current deadline, capped at default; raises once it has passed"""
+    at = _deadline.get()
+    if at is None:
+        return default
+    left = at - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
+    return left if default is None else min(left, default)
+
+# --- hedging -----------------------------------------------------------------
+
+class LatencyWindow:
+    """Recent call latencies, for picking a hedge delay"""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+async def hedged(call: Callable[[], Awaitable], delay: float, on_hedge: Callable[[], None] = None):
+    """Run call(); if it hasn't finished after delay, race a second call() against it.
+
+    Returns the first successful result and cancels the other attempt. Only for
+    idempotent calls. Raises the last error if both attempts fail.
+    """
+    tasks = {asyncio.ensure_future(call())}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            if on_hedge is not None:
+                on_hedge()
+            tasks.add(asyncio.ensure_future(call()))
+        error = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,136 @@
+import os, re
+from typing import Any, Dict, List, NamedTuple, Optional
+import tools
+from teams import TEAMS
+
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "1").lower() in ("1", "true", "yes")
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.8"))
+
+def _team_aliases() -> Dict[str, Optional[str]]:
+    """alias -> abbr; None marks an alias shared by two teams (e.g. "new york")"""
+    aliases: Dict[str, Optional[str]] = {}
+    def add(alias, abbr):
+        alias = alias.lower()
+        aliases[alias] = abbr if aliases.get(alias, abbr) == abbr else None
+    for abbr, (city, nickname) in TEAMS.items():
+        add(abbr, abbr)
+        add(nickname, abbr)
+        add(city, abbr)
+        add(f"{city} {nickname}", abbr)
+    add("niners", "sf")
+    add("bucs", "tb")
+    add("pats", "ne")
+    add("jags", "jax")
+    add("commies", "was")
+    add("vegas", "lv")
+    add("philly", "phi")
+    add("kansas city", "kc")
+    return aliases
+
+_ALIASES = _team_aliases()
+# Longest alias first so "new york giants" wins over "new york"
+_TEAM_RE = re.compile(r"\b(" + "|".join(re.escape(a) for a in sorted(_ALIASES, key=len, reverse=True)) + r")\b")
+# Abbreviations that are also common English words only count in upper case
+_WORD_ABBRS = {"no", "min", "was", "ne", "ten"}
+
+_POSITION_RE = re.compile(
+    r"\b((qb|rb|wr|te)\d?|lt|lg|rg|rt|ol|dl|de|dt|lb|cb|fs|ss|o-line|offensive line|defensive line|"
+    r"players|quarterback|running back|receiver|"
+    r"tight end|left tackle|right tackle|left guard|right guard|center|tackle|guard|linebacker|"
+    r"cornerback|safety|kicker|punter|starting|starter|starters|starts|lineup|roster|depth chart)\b")
+_MATCHUP_RE = re.compile(r"\b(vs\.?|versus|matchup|matchups|against|play|plays|playing|facing|face|opponent|game)\b|@")
+_AT_RE = re.compile(r"\s(@|at)\s")
+_WEEK_GAMES_RE = re.compile(r"\b(matchups|schedule|games|slate|home teams|away teams|who is playing|who's playing)\b")
+_TEAMS_WEEK_RE = re.compile(r"\b(teams|every team|all teams|league)\b")
+_WEEK_RE = re.compile(r"\bweek\s*#?(\d{1,2})\b")
+_RELATIVE_WEEK_RE = re.compile(r"\b(last|next) week\b")
+_SEASON_RE = re.compile(r"\b(19[2-9]\d|20\d\d)\b")
+
+class Route(NamedTuple):
+    kind: Optional[str]
+    arguments: Dict[str, Any]
+    confidence: float
+
+    @property
+    def confident(self) -> bool:
+        return ROUTER_ENABLED and self.kind is not None and self.confidence >= ROUTER_MIN_CONFIDENCE
+
+    def decision(self) -> Dict[str, Any]:
+        """The route in call_llm's tool-call shape"""
+        return {"tool_call": {"name": "fetch_nfl_data", "arguments": dict(self.arguments)}}
+
+def find_teams(question: str) -> List[str]:
+    """Team abbreviations in the order they are mentioned, without repeats"""
+    found = []
+    for m in _TEAM_RE.finditer(question.lower()):
+        alias = m.group(1)
+        if alias in _WORD_ABBRS and question[m.start():m.end()] != alias.upper():
+            continue
+        abbr = _ALIASES[alias]
+        if abbr and abbr not in found:
+            found.append(abbr)
+    return found
+
+def find_week(question: str) -> Dict[str, int]:
+    """season / week arguments for the week a question names ({} for the current week)"""
+    text = question.lower()
+    season, week = tools.current_week()
+    found = {}
+    m = _SEASON_RE.search(text)
+    if m and int(m.group(1)) != season:
+        found["season"] = int(m.group(1))
+    m = _WEEK_RE.search(text)
+    relative = _RELATIVE_WEEK_RE.search(text)
+    if m and 1 <= int(m.group(1)) <= tools.MAX_WEEK:
+        if int(m.group(1)) != week or "season" in found:
+            found["week"] = int(m.group(1))
+    elif relative and "season" not in found:
+        shifted = week - 1 if relative.group(1) == "last" else week + 1
+        if 1 <= shifted <= tools.MAX_WEEK:
+            found["week"] = shifted
+    return found
+
+def _orient(first: str, second: str, explicit_at: bool, current: bool = True):
+    """(away, home, confidence) for a two-team matchup, checked against the snapshot if loaded"""
+    known = tools._snapshot.matchups if current else {}
+    if (first, second) in known:
+        return first, second, 0.95
+    if (second, first) in known:
+        return second, first, 0.95
+    return first, second, 0.85 if explicit_at else 0.6
+
+def route(question: str) -> Route:
+    """Pick the fetch_nfl_data call for a question without asking the LLM"""
+    text = question.lower()
+    found = find_teams(question)
+    positions = _POSITION_RE.search(text)
+    explicit_at = bool(_AT_RE.search(f" {text} "))
+    matchup = _MATCHUP_RE.search(text) or explicit_at
+    when = find_week(question)
+    current = not when
+    routed = _route(found, positions, explicit_at, matchup, text, current)
+    if routed.kind is None or current:
+        return routed
+    # A season without a week is ambiguous (which week?), so leave it to the LLM
+    confidence = routed.confidence if "week" in when else min(routed.confidence, 0.6)
+    return Route(routed.kind, {**routed.arguments, **when}, confidence)
+
+def _route(found, positions, explicit_at, matchup, text, current) -> Route:
+    if len(found) == 2 and matchup and not positions:
+        away, home, confidence = _orient(found[0], found[1], explicit_at, current)
+        return Route("matchup", {"kind": "matchup", "away": away, "home": home}, confidence)
+    if len(found) == 1 and positions:
+        return Route("team", {"kind": "team", "abbr": found[0]}, 0.9)
+    if len(found) == 1 and matchup:
+        for away, home in (tools._snapshot.matchups if current else ()):
+            if found[0] in (away, home):
+                return Route("matchup", {"kind": "matchup", "away": away, "home": home}, 0.9)
+        return Route("matchups_week", {"kind": "matchups_week"}, 0.8)
+    if len(found) == 1:
+        return Route("team", {"kind": "team", "abbr": found[0]}, 0.7)
+    if not found and _WEEK_GAMES_RE.search(text):
+        return Route("matchups_week", {"kind": "matchups_week"}, 0.85)
+    if not found and _TEAMS_WEEK_RE.search(text):
+        return Route("teams_week", {"kind": "teams_week"}, 0.6)
+    # Comparisons across teams and anything unrecognised go to the LLM
+    return Route(None, {}, 0.0)
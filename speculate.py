@@ -0,0 +1,102 @@
+"""Speculative prefetch: start the likely NFL API fetch while the LLM is still deciding.
+
+The local router (or the MVP heuristic when the router has no idea) predicts
+the tool call. Its fetch runs alongside the LLM decision; if the LLM picks the
+same arguments the result is already there or on its way, otherwise the fetch
+just finishes in the background and fills the cache.
+"""
+import os, time, asyncio, threading
+from typing import Any, Dict, Optional
+import tools
+from llm import _fallback_heuristic
+from telemetry import annotate
+
+SPECULATIVE_PREFETCH = os.getenv("SPECULATIVE_PREFETCH", "1").lower() in ("1", "true", "yes")
+
+_lock = threading.Lock()
+_stats = {"speculated": 0, "hits": 0, "misses": 0, "saved_ms_total": 0.0}
+
+def stats() -> Dict[str, float]:
+    """Speculations started, hit / missed, hit rate and latency saved"""
+    with _lock:
+        settled = _stats["hits"] + _stats["misses"]
+        return {**_stats, "hit_rate": _stats["hits"] / settled if settled else 0.0,
+                "saved_ms_per_request": _stats["saved_ms_total"] / settled if settled else 0.0}
+
+def _key(arguments: Dict[str, Any]):
+    try:
+        return tools.request_key(**arguments)
+    except (TypeError, ValueError):
+        return None
+
+class Speculation:
+    """One predicted fetch running in the background"""
+
+    def __init__(self, arguments: Dict[str, Any], fetch):
+        self.arguments = arguments
+        self.key = _key(arguments)
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.claimed = False
+        self.settled = False
+        self.task = asyncio.ensure_future(fetch(**arguments))
+        self.task.add_done_callback(self._done)
+
+    def _done(self, task):
+        self.finished = time.perf_counter()
+        if not task.cancelled():
+            task.exception()  # a wrong guess that failed is nobody's error
+
+    def claim(self, arguments: Dict[str, Any]) -> bool:
+        """Whether arguments make the predicted request (each speculation is used once)"""
+        if self.claimed or self.key is None or _key(arguments) != self.key:
+            return False
+        self.claimed = True
+        return True
+
+    def settle(self):
+        """Count the speculation as a miss unless it was claimed"""
+        if self.settled:
+            return
+        self.settled = True
+        if not self.claimed:
+            with _lock:
+                _stats["misses"] += 1
+            annotate(speculation="miss")
+
+def predict(question: str, routed=None) -> Optional[Dict[str, Any]]:
+    if routed is not None and routed.kind is not None:
+        return dict(routed.arguments)
+    return _fallback_heuristic(question)["tool_call"]["arguments"]
+
+def start(question: str, fetch=tools.fetch_nfl_data, routed=None) -> Optional[Speculation]:
+    """Begin prefetching the predicted tool call's data (None when disabled or unpredictable)"""
+    if not SPECULATIVE_PREFETCH:
+        return None
+    arguments = predict(question, routed)
+    if not arguments or _key(arguments) is None:
+        return None
+    with _lock:
+        _stats["speculated"] += 1
+    return Speculation(arguments, fetch)
+
+async def resolve(speculation: Optional[Speculation], arguments: Dict[str, Any], fetch=tools.fetch_nfl_data):
+    """The fetch for arguments, taken from the speculation when it predicted them"""
+    if speculation is None or not speculation.claim(arguments):
+        return await fetch(**arguments)
+    decided = time.perf_counter()
+    result = await speculation.task
+    # Sequentially the fetch would have started at `decided`; it overlapped the decision instead
+    saved_ms = min(decided, speculation.finished or decided) - speculation.started
+    saved_ms = max(0.0, saved_ms * 1000)
+    speculation.settled = True
+    with _lock:
+        _stats["hits"] += 1
+        _stats["saved_ms_total"] += saved_ms
+    annotate(speculation="hit", saved_ms=round(saved_ms, 1))
+    return result
+
+def settle(speculation: Optional[Speculation]):
+    """Finish with a request's speculation: a miss unless resolve() used it"""
+    if speculation is not None:
+        speculation.settle()
@@ -0,0 +1,70 @@
+# The 32 teams, keyed by the lowercase abbreviation the NFL API uses
+TEAMS = {
+    "ari": ("Arizona", "Cardinals"),
+    "atl": ("Atlanta", "Falcons"),
+    "bal": ("Baltimore", "Ravens"),
+    "buf": ("Buffalo", "Bills"),
+    "car": ("Carolina", "Panthers"),
+    "chi": ("Chicago", "Bears"),
+    "cin": ("Cincinnati", "Bengals"),
+    "cle": ("Cleveland", "Browns"),
+    "dal": ("Dallas", "Cowboys"),
+    "den": ("Denver", "Broncos"),
+    "det": ("Detroit", "Lions"),
+    "gb": ("Green Bay", "Packers"),
+    "hou": ("Houston", "Texans"),
+    "ind": ("Indianapolis", "Colts"),
+    "jax": ("Jacksonville", "Jaguars"),
+    "kc": ("Kansas City", "Chiefs"),
+    "lv": ("Las Vegas", "Raiders"),
+    "lac": ("Los Angeles", "Chargers"),
+    "lar": ("Los Angeles", "Rams"),
+    "mia": ("Miami", "Dolphins"),
+    "min": ("Minnesota", "Vikings"),
+    "ne": ("New England", "Patriots"),
+    "no": ("New Orleans", "Saints"),
+    "nyg": ("New York", "Giants"),
+    "nyj": ("New York", "Jets"),
+    "phi": ("Philadelphia", "Eagles"),
+    "pit": ("Pittsburgh", "Steelers"),
+    "sea": ("Seattle", "Seahawks"),
+    "sf": ("San Francisco", "49ers"),
+    "tb": ("Tampa Bay", "Buccaneers"),
+    "ten": ("Tennessee", "Titans"),
+    "was": ("Washington", "Commanders"),
+}
+
+def team_words() -> set:
+    """Every lowercase word that only serves to name a team (abbrs, cities, nicknames)"""
+    words = set(TEAMS)
+    for city, nickname in TEAMS.values():
+        words.update(city.lower().split())
+        words.add(nickname.lower())
+    return words
+
+# Other abbreviations in common use (and that models tend to produce)
+ALT_ABBRS = {
+    "arz": "ari", "blt": "bal", "clv": "cle", "gnb": "gb", "hst": "hou", "jac": "jax", "kan": "kc",
+    "lvr": "lv", "oak": "lv", "sd": "lac", "stl": "lar", "nwe": "ne", "nor": "no", "sfo": "sf",
+    "tam": "tb", "wsh": "was",
+}
+
+def _team_names() -> dict:
+    names = {}
+    cities = [city.lower() for city, _ in TEAMS.values()]
+    for abbr, (city, nickname) in TEAMS.items():
+        names[nickname.lower()] = abbr
+        names[f"{city} {nickname}".lower()] = abbr
+        if cities.count(city.lower()) == 1:
+            names[city.lower()] = abbr
+    return names
+
+_NAMES = _team_names()
+
+def normalize_abbr(value: str) -> str:
+    """The API's abbreviation for a team abbreviation, alternate abbreviation or name"""
+    key = " ".join(str(value).lower().split())
+    abbr = key if key in TEAMS else ALT_ABBRS.get(key) or _NAMES.get(key)
+    if abbr is None:
+        raise ValueError(f"unknown team: {value!r}")
+    return abbr
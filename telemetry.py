@@ -0,0 +1,168 @@
+"""Leveled non-blocking logging, per-request spans and Prometheus-style metrics."""
+import os, json, time, queue, random, logging, threading, contextvars
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, List, Optional, Tuple
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# --- logging -----------------------------------------------------------------
+
+_listener: Optional[QueueListener] = None
+
+def _setup_logging():
+    """Route the nfl_agent loggers through a queue so the hot path never blocks on stdout"""
+    global _listener
+    root = logging.getLogger("nfl_agent")
+    if _listener is not None:
+        return root
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    _listener = QueueListener(records, stream, respect_handler_level=True)
+    _listener.start()
+    root.addHandler(QueueHandler(records))
+    root.setLevel(LOG_LEVEL)
+    root.propagate = False
+    return root
+
+def get_logger(name: str) -> logging.Logger:
+    _setup_logging()
+    return logging.getLogger(f"nfl_agent.{name}")
+
+# --- metrics -----------------------------------------------------------------
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(labels.items())) + "}"
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(dict(key))} {value:g}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.buckets = name, help, tuple(buckets)
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                labels = dict(key)
+                for bound, n in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_labels({**labels, 'le': f'{bound:g}'})} {n}")
+                lines.append(f"{self.name}_bucket{_labels({**labels, 'le': '+Inf'})} {count}")
+                lines.append(f"{self.name}_sum{_labels(labels)} {total:g}")
+                lines.append(f"{self.name}_count{_labels(labels)} {count}")
+        return lines
+
+STAGE_SECONDS = Histogram("nfl_agent_stage_seconds", "Latency of each request stage")
+REQUEST_SECONDS = Histogram("nfl_agent_request_seconds", "End-to-end request latency")
+FETCHES = Counter("nfl_agent_fetch_total", "fetch_nfl_data calls by kind and cache outcome")
+RETRIES = Counter("nfl_agent_upstream_retries_total", "Upstream request retries")
+LLM_TOKENS = Counter("nfl_agent_llm_tokens_total", "LLM tokens by type")
+LLM_QUEUE_SECONDS = Histogram("nfl_agent_llm_queue_seconds", "Time LLM calls waited for admission, by priority")
+
+_metrics = [REQUEST_SECONDS, STAGE_SECONDS, FETCHES, RETRIES, LLM_TOKENS, LLM_QUEUE_SECONDS]
+_gauge_sources: List[Tuple[str, Callable[[], Dict[str, float]]]] = []
+
+def register_gauges(prefix: str, source: Callable[[], Dict[str, float]]):
+    """Expose source()'s numeric values as gauges named nfl_agent_<prefix>_<key>"""
+    _gauge_sources.append((prefix, source))
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for prefix, source in _gauge_sources:
+        for key, value in sorted(source().items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                name = f"nfl_agent_{prefix}_{key}"
+                lines.extend([f"# TYPE {name} gauge", f"{name} {value:g}"])
+    return "\n".join(lines) + "\n"
+
+# --- spans -------------------------------------------------------------------
+
+_trace: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("nfl_agent_trace", default=None)
+_span: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("nfl_agent_span", default=None)
+_trace_log = get_logger("trace")
+
+@contextmanager
+def trace(name: str, **attrs):
+    """Root span for one request; sampled traces are logged as one JSON line"""
+    record = {"name": name, "attrs": attrs, "spans": [], "sampled": random.random() < TRACE_SAMPLE_RATE}
+    token = _trace.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["duration_ms"] = (time.perf_counter() - start) * 1000
+        REQUEST_SECONDS.observe(record["duration_ms"] / 1000, endpoint=name)
+        try:
+            _trace.reset(token)
+        except ValueError:
+            pass
+        if record["sampled"]:
+            _trace_log.info(json.dumps(record, default=str))
+
+@contextmanager
+def span(stage: str, **attrs):
+    """Time one stage, record it in the stage histogram and attach it to the current trace"""
+    record = {"stage": stage, **attrs}
+    token = _span.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        try:
+            _span.reset(token)
+        except ValueError:
+            # An async generator closed from another task (e.g. a dropped stream)
+            pass
+        record["duration_ms"] = elapsed * 1000
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        current = _trace.get()
+        if current is not None:
+            current["spans"].append(record)
+
+def annotate(**attrs):
+    """Add attributes to the innermost open span (no-op outside one)"""
+    current = _span.get()
+    if current is not None:
+        current.update(attrs)
@@ -0,0 +1,155 @@
+"""Deterministic answers for lookup questions whose answer is sitting in the fetched payload.
+
+Recognized shapes: the starter at one position for a team, a team's opponent,
+the week's home teams and the full matchup list. Anything else, including a
+question qualified past the plain lookup (backups, "not", past seasons,
+injuries), returns None and goes to LLM synthesis. Compare the two paths with the `template_answer` and
+`synthesis` stages on /metrics, or by running benchmarks/loadtest.py with
+TEMPLATE_ANSWERS=0 and then --compare.
+"""
+import os, re, threading
+from typing import Any, Dict, List, Optional
+import tools
+from compact import question_positions, matches_position
+from router import find_teams
+from teams import TEAMS
+
+TEMPLATE_ANSWERS = os.getenv("TEMPLATE_ANSWERS", "1").lower() in ("1", "true", "yes")
+
+# Questions asking for judgement or detail the payload doesn't carry
+_OPEN_ENDED_RE = re.compile(r"\b(compare|comparison|better|best|worst|why|how|stats?|analy[sz]e|preview|"
+                            r"predict|think|injur\w*|key players|interesting|tell me about)\b")
+# Qualifiers that change who is meant: a template would answer the plain question instead
+_QUALIFIED_RE = re.compile(r"\b(backups?|back-up|second[- ]string|third[- ]string|depth|behind|not|\w+n't|"
+                           r"was|were|used to|former|last (season|year)|previous|injur\w*|out|inactive)\b")
+_STARTER_RE = re.compile(r"\b(who|starting|starter|starts|plays)\b")
+_OPPONENT_RE = re.compile(r"\b(who (do|does|is|are)\b.*\b(play|playing|face|facing)|opponent)")
+_HOME_TEAMS_RE = re.compile(r"\bhome teams\b")
+_MATCHUP_LIST_RE = re.compile(r"\b(matchups|schedule|games|slate)\b")
+
+_lock = threading.Lock()
+_stats = {"answered": 0, "fallthrough": 0}
+
+def stats() -> Dict[str, float]:
+    """Questions answered from a template vs. handed to the LLM, and the hit rate"""
+    with _lock:
+        total = _stats["answered"] + _stats["fallthrough"]
+        return {**_stats, "hit_rate": _stats["answered"] / total if total else 0.0}
+
+def _name(abbr: Optional[str]) -> Optional[str]:
+    if abbr not in TEAMS:
+        return abbr.upper() if abbr else None
+    city, nickname = TEAMS[abbr]
+    return f"{city} {nickname}"
+
+def _team_abbr(entry) -> Optional[str]:
+    abbr = tools._abbr(entry)
+    return abbr if abbr in TEAMS else None
+
+def _starters(team) -> List[Dict[str, str]]:
+    """[{"position", "name"}] from the starter shapes the API uses"""
+    if isinstance(team, dict) and isinstance(team.get("team"), dict) and "starters" not in team:
+        team = team["team"]
+    starters = team.get("starters") if isinstance(team, dict) else None
+    found = []
+    if isinstance(starters, dict):
+        for position, player in starters.items():
+            name = player.get("name") if isinstance(player, dict) else player
+            if isinstance(name, str):
+                found.append({"position": position, "name": name})
+    elif isinstance(starters, list):
+        for player in starters:
+            if not isinstance(player, dict):
+                continue
+            position = player.get("position") or player.get("pos")
+            name = player.get("name") or player.get("player")
+            if isinstance(position, str) and isinstance(name, str):
+                found.append({"position": position, "name": name})
+    return found
+
+def _starter(question: str, arguments: Dict[str, Any], data) -> Optional[str]:
+    positions = question_positions(question)
+    if len(positions) != 1 or not _STARTER_RE.search(question.lower()):
+        return None
+    players = [p for p in _starters(data) if matches_position(p["position"], positions)]
+    if not players:
+        return None
+    team = _name(tools.normalize_abbr(arguments["abbr"]))
+    names = " and ".join(p["name"] for p in players)
+    position = players[0]["position"].upper()
+    verb = "are" if len(players) > 1 else "is"
+    return f"The {team} starting {position} {verb} {names}."
+
+def _game_line(game) -> Optional[str]:
+    away = _team_abbr(game.get("away") or game.get("away_team"))
+    home = _team_abbr(game.get("home") or game.get("home_team"))
+    if not (away and home):
+        return None
+    kickoff = game.get("kickoff") or game.get("kickoff_time") or game.get("start_time")
+    line = f"{_name(away)} at {_name(home)}"
+    return f"{line} ({kickoff})" if isinstance(kickoff, str) else line
+
+def _opponent(question: str, arguments: Dict[str, Any], data) -> Optional[str]:
+    text = question.lower()
+    teams = find_teams(question)
+    if len(teams) != 1 or not _OPPONENT_RE.search(text):
+        return None
+    team = teams[0]
+    games = [data] if arguments["kind"] == "matchup" else list(tools.matchup_index(data).values())
+    for game in games:
+        if not isinstance(game, dict):
+            continue
+        away = _team_abbr(game.get("away") or game.get("away_team"))
+        home = _team_abbr(game.get("home") or game.get("home_team"))
+        if team in (away, home):
+            where = "at" if team == away else "at home against"
+            opponent = home if team == away else away
+            kickoff = game.get("kickoff") or game.get("kickoff_time")
+            when = f" (kickoff {kickoff})" if isinstance(kickoff, str) else ""
+            return f"The {_name(team)} play {where} the {_name(opponent)}{when}."
+    return None
+
+def _week_label(arguments: Dict[str, Any]) -> str:
+    season, week = tools.season_week(arguments.get("season"), arguments.get("week"))
+    return f"Week {week}" if season == tools.CURRENT_SEASON else f"Week {week} of {season}"
+
+def _home_teams(question: str, arguments: Dict[str, Any], data) -> Optional[str]:
+    if not _HOME_TEAMS_RE.search(question.lower()) or find_teams(question):
+        return None
+    homes = [_name(home) for _, home in tools.matchup_index(data)]
+    if not homes:
+        return None
+    return f"{_week_label(arguments)} home teams:\n" + "\n".join(f"- {name}" for name in homes)
+
+def _matchup_list(question: str, arguments: Dict[str, Any], data) -> Optional[str]:
+    if not _MATCHUP_LIST_RE.search(question.lower()) or find_teams(question):
+        return None
+    lines = [line for line in map(_game_line, tools.matchup_index(data).values()) if line]
+    if not lines:
+        return None
+    return f"{_week_label(arguments)} matchups:\n" + "\n".join(f"- {line}" for line in lines)
+
+_SHAPES = {
+    "team": (_starter,),
+    "matchup": (_opponent,),
+    "matchups_week": (_opponent, _home_teams, _matchup_list),
+}
+
+def answer(question: str, arguments: Dict[str, Any], tool_result: Dict[str, Any]) -> Optional[str]:
+    """Template answer with its source citation, or None when the LLM should phrase it"""
+    if not TEMPLATE_ANSWERS:
+        return None
+    text = None
+    text_lower = question.lower()
+    if (not _OPEN_ENDED_RE.search(text_lower) and not _QUALIFIED_RE.search(text_lower)
+            and tool_result.get("data") is not None):
+        for shape in _SHAPES.get(arguments.get("kind"), ()):
+            try:
+                text = shape(question, arguments, tool_result["data"])
+            except (KeyError, TypeError, ValueError):
+                text = None
+            if text:
+                break
+    with _lock:
+        _stats["answered" if text else "fallthrough"] += 1
+    return f"{text}\n\nSource: {tool_result['source_url']}" if text else None
@@ -0,0 +1,151 @@
+import os
+os.environ.setdefault("NFL_API_BASE","https://example.com")
+import time, asyncio
+from unittest.mock import patch, MagicMock, AsyncMock
+import httpx, openai
+import pytest
+import llm
+from admission import BACKGROUND, INTERACTIVE, AdmissionRejected, Scheduler, TokenBucket
+from resilience import DeadlineExceeded, deadline
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_token_bucket_refills_and_goes_into_debt():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)  # one a second
+    assert bucket.wait_for(60) == 0
+    bucket.take(61)
+    assert bucket.wait_for(1) == pytest.approx(2.0)
+    clock.now = 2.0
+    assert bucket.wait_for(1) == 0
+    assert bucket.wait_for(1000) == pytest.approx(59.0)  # capped at one full bucket
+
+def _drained(rpm=1200, **kwargs):
+    scheduler = Scheduler(rpm=rpm, tpm=0, **kwargs)
+    scheduler.requests.level = 0
+    return scheduler
+
+def test_interactive_calls_are_admitted_before_queued_background_work():
+    scheduler = _drained()  # one request every 50ms
+    order = []
+
+    async def call(name, level):
+        await scheduler.acquire(10, level)
+        order.append(name)
+
+    async def run():
+        background = [asyncio.create_task(call(f"batch{i}", BACKGROUND)) for i in range(3)]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(call("ask", INTERACTIVE))
+        await asyncio.gather(*background, interactive)
+
+    asyncio.run(run())
+    assert order[0] == "ask"
+    assert order[1:] == ["batch0", "batch1", "batch2"]
+    assert scheduler.stats()["queued"] == 4
+    assert scheduler.stats()["waiting"] == 0
+
+def test_full_queue_rejects_and_deadline_expires_queued_calls():
+    scheduler = _drained(rpm=6, max_queue=1)  # one request every 10s
+
+    async def run():
+        with deadline(0.05):
+            first = asyncio.create_task(scheduler.acquire(10))
+            await asyncio.sleep(0)
+            with pytest.raises(AdmissionRejected) as rejected:
+                await scheduler.acquire(10)
+            assert rejected.value.retry_after >= 1
+            with pytest.raises(DeadlineExceeded):
+                await first
+
+    asyncio.run(run())
+    stats = scheduler.stats()
+    assert (stats["rejected"], stats["expired"], stats["waiting"]) == (1, 1, 0)
+
+def test_queued_past_deadline_raises_deadline_exceeded_up_front():
+    scheduler = _drained(rpm=6)
+
+    async def run():
+        with deadline(0.01):
+            await asyncio.sleep(0.02)
+            await scheduler.acquire(10)
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+
+def test_rate_limited_pauses_admission_and_settle_refunds_tokens():
+    scheduler = Scheduler(rpm=0, tpm=6000)
+
+    async def run():
+        await scheduler.acquire(1000)
+        scheduler.settle(1000, 100)
+        assert scheduler.tokens.level == pytest.approx(5900, abs=5)
+        scheduler.rate_limited(0.05)
+        start = time.monotonic()
+        await scheduler.acquire(100)
+        return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.04
+    assert scheduler.stats()["rate_limited"] == 1
+
+@patch.dict(os.environ, {"LLM_PROVIDER": "openai", "OPENAI_API_KEY": "test-key"})
+@patch("llm.AsyncOpenAI")
+def test_call_llm_waits_out_429_retry_after(mock_openai):
+    llm._client = None
+    llm.breaker.reset()
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    limited = openai.RateLimitError("rate limited", response=httpx.Response(
+        429, request=request, headers={"retry-after-ms": "20"}), body=None)
+    choice = MagicMock()
+    choice.message.tool_calls = None
+    choice.message.content = "ok"
+    mock_client = MagicMock()
+    mock_openai.return_value = mock_client
+    mock_client.chat.completions.create = AsyncMock(side_effect=[limited, MagicMock(choices=[choice])])
+    before = llm.scheduler.stats()["rate_limited"]
+    settled = []
+    real_settle = llm.scheduler.settle
+
+    try:
+        with patch.object(llm.scheduler, "settle", lambda reserved, used: settled.append(used) or real_settle(reserved, used)):
+            result = asyncio.run(llm.call_llm([{"role": "user", "content": "hi"}], tools_schema=False))
+    finally:
+        llm._client = None
+    assert result == {"content": "ok"}
+    assert settled[0] == 0  # the 429'd attempt's reservation was handed back
+    assert mock_client.chat.completions.create.await_count == 2
+    assert llm.scheduler.stats()["rate_limited"] - before == 1
+    assert llm.breaker.state == "closed"
+    assert mock_openai.call_args.kwargs["max_retries"] == 0
+
+@patch.dict(os.environ, {"LLM_PROVIDER": "openai", "OPENAI_API_KEY": "test-key"})
+@patch("llm.AsyncOpenAI")
+def test_429_past_the_retries_and_full_queue_reach_the_caller(mock_openai):
+    llm._client = None
+    llm.breaker.reset()
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    limited = openai.RateLimitError("rate limited", response=httpx.Response(
+        429, request=request, headers={"retry-after-ms": "10"}), body=None)
+    mock_client = MagicMock()
+    mock_openai.return_value = mock_client
+    mock_client.chat.completions.create = AsyncMock(side_effect=limited)
+
+    async def stream():
+        return [d async for d in llm.stream_llm([{"role": "user", "content": "hi"}])]
+
+    try:
+        with pytest.raises(AdmissionRejected):
+            asyncio.run(llm.call_llm([{"role": "user", "content": "hi"}], tools_schema=False))
+        assert mock_client.chat.completions.create.await_count == llm.LLM_RATE_LIMIT_RETRIES + 1
+        llm.breaker.reset()
+        with patch.object(llm.scheduler, "acquire", AsyncMock(side_effect=AdmissionRejected("queue full", 2))):
+            with pytest.raises(AdmissionRejected):
+                asyncio.run(stream())
+    finally:
+        llm._client = None
+        llm.breaker.reset()
@@ -0,0 +1,86 @@
+import os
+os.environ.setdefault("NFL_API_BASE","https://example.com")
+import time, asyncio
+import pytest
+import tools
+import answer_cache
+from cache import AnswerCache
+
+URL = "https://example.com/api/teams/den"
+
+@pytest.fixture(autouse=True)
+def _reset():
+    answer_cache.clear()
+    tools._cache.clear()
+    tools._versions.clear()
+    yield
+    answer_cache.clear()
+
+def test_paraphrased_question_hits_cache():
+    tools._store(URL, {"LT": "Garett Bolles"}, "team")
+    call = {"kind": "team", "abbr": "den"}
+    answer_cache.remember("Broncos starting LT?", [call], "Garett Bolles", [URL])
+
+    assert answer_cache.recall("broncos starting lt")["answer"] == "Garett Bolles"
+    assert answer_cache.lookup("who starts at LT for DEN", [{"kind": "team", "abbr": "DEN"}])["answer"] == "Garett Bolles"
+    assert answer_cache.lookup("who starts at QB for DEN", [call]) is None
+    assert answer_cache.recall("Who is the Broncos starting QB?") is None
+
+def test_answer_invalidated_when_source_data_changes():
+    tools._store(URL, {"LT": "Garett Bolles"}, "team")
+    answer_cache.remember("Broncos starting LT?", [{"kind": "team", "abbr": "den"}], "Garett Bolles", [URL])
+    tools._store(URL, {"LT": "Garett Bolles"}, "team")
+    assert answer_cache.recall("Broncos starting LT?") is not None
+
+    tools._store(URL, {"LT": "Someone Else"}, "team")
+    assert answer_cache.recall("Broncos starting LT?") is None
+    assert answer_cache.stats()["size"] == 0
+
+def test_answer_cache_byte_bound_evicts_lru():
+    cache = AnswerCache(max_bytes=100)
+    cache.put("a", "x" * 40, 40)
+    cache.put("b", "y" * 40, 40)
+    cache.get("a")
+    cache.put("c", "z" * 40, 40)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.bytes <= 100
+
+def test_answer_cache_ttl():
+    now = [0.0]
+    cache = AnswerCache(ttl=10, clock=lambda: now[0])
+    cache.put("a", "x", 1)
+    now[0] = 11
+    assert cache.get("a") is None
+
+def test_explicit_current_week_shares_key():
+    tools._store(URL, {"LT": "Garett Bolles"}, "team")
+    call = {"kind": "team", "abbr": "den"}
+    answer_cache.remember("Broncos starting LT?", [call], "Garett Bolles", [URL])
+    explicit = {**call, "season": tools.CURRENT_SEASON, "week": tools.CURRENT_WEEK}
+    assert answer_cache.lookup("Broncos starting LT?", [explicit])["answer"] == "Garett Bolles"
+    assert answer_cache.lookup("Broncos starting LT?", [{**call, "week": tools.CURRENT_WEEK + 1}]) is None
+
+def test_answer_only_served_while_sources_are_cached():
+    tools._store(URL, {"LT": "Garett Bolles"}, "team")
+    answer_cache.remember("Broncos starting LT?", [{"kind": "team", "abbr": "den"}], "Garett Bolles", [URL])
+    tools._cache.clear()
+    assert answer_cache.recall("Broncos starting LT?") is None
+
+def test_stale_source_serves_answer_and_revalidates(monkeypatch):
+    tools._store(URL, {"LT": "Garett Bolles"}, "team", fetched_at=time.time() - tools.ttl_for("team") - 1)
+    answer_cache.remember("Broncos starting LT?", [{"kind": "team", "abbr": "den"}], "Garett Bolles", [URL])
+    refetched = []
+    async def fake_post(url):
+        refetched.append(url)
+        return {"LT": "Garett Bolles"}
+    monkeypatch.setattr(tools, "_post", fake_post)
+
+    async def run():
+        cached = answer_cache.recall("Broncos starting LT?")
+        await asyncio.gather(*tools._refresh_tasks)
+        return cached
+
+    assert asyncio.run(run())["answer"] == "Garett Bolles"
+    assert refetched == [URL]
+    assert tools.freshness(URL) == tools.FRESH
@@ -0,0 +1,115 @@
+import os
+os.environ.setdefault("NFL_API_BASE","https://example.com")
+import json
+from unittest.mock import patch
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+import tools, answer_cache
+from app import app
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def _mock_upstream():
+    tools._cache.clear()
+    answer_cache.clear()
+    tools._client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, json={"path": request.url.path})))
+    with patch.dict(os.environ, {"LLM_PROVIDER": "none"}):
+        yield
+    tools._client = None
+    tools.breaker.reset()
+
+def _events(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_ask():
+    r = client.post("/ask", json={"question": "Who is the DEN starting LT?"})
+    assert r.status_code == 200
+    assert r.json()["sources"] == ["https://example.com/api/teams/den"]
+
+def test_ask_stream_events():
+    r = client.post("/ask/stream", json={"question": "Who is the DEN starting LT?"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = _events(r.text)
+    assert events[0] == ("tool", {"tool_call": {"kind": "team", "abbr": "den"},
+                                  "source_url": "https://example.com/api/teams/den"})
+    assert [e for e, _ in events[1:]] == ["token", "done"]
+    assert events[-1][1]["sources"] == ["https://example.com/api/teams/den"]
+    assert events[-1][1]["answer"] == events[1][1]["delta"]
+
+def test_ask_stream_sends_tool_event_before_the_fetch_and_fetch_errors_as_event():
+    from resilience import CircuitOpenError
+    with patch("app.speculate.resolve", side_effect=CircuitOpenError("nfl_api", 30)):
+        r = client.post("/ask/stream", json={"question": "Who is the DEN starting LT?"})
+    assert r.status_code == 200
+    events = _events(r.text)
+    assert events[0] == ("tool", {"tool_call": {"kind": "team", "abbr": "den"},
+                                  "source_url": "https://example.com/api/teams/den"})
+    assert events[1] == ("error", {"error": "nfl_api circuit is open; retry in 30s"})
+    assert len(events) == 2
+
+def test_ask_stream_cut_off_mid_answer_ends_with_error_and_is_not_cached():
+    async def cut_off(messages):
+        yield "The Broncos start"
+        raise httpx.ReadError("connection reset")
+
+    with patch("app.stream_llm", cut_off):
+        r = client.post("/ask/stream", json={"question": "How do the Broncos look this week?"})
+    events = _events(r.text)
+    assert [e for e, _ in events] == ["tool", "token", "error"]
+    assert events[-1][1] == {"error": "connection reset"}
+    assert answer_cache.recall("How do the Broncos look this week?") is None
+
+def test_ask_stream_tool_event_names_the_snapshot_source():
+    teams_url, matchups_url = tools.url_for("teams_week"), tools.url_for("matchups_week")
+    tools._snapshot.load(teams_url, {"teams": [{"abbr": "DEN", "starters": [{"position": "LT", "name": "Garett Bolles"}]}]},
+                         matchups_url, [])
+    try:
+        r = client.post("/ask/stream", json={"question": "Who is the DEN starting LT?"})
+    finally:
+        tools._snapshot.loaded_at = None
+    events = _events(r.text)
+    assert events[0][1]["source_url"] == teams_url
+    assert events[-1] == ("done", {"answer": events[1][1]["delta"], "sources": [teams_url]})
+
+def test_synthesis_messages_share_stable_prefix():
+    from app import _synthesis_messages
+    tc = {"name": "fetch_nfl_data", "arguments": {"kind": "team", "abbr": "den"}}
+    result = {"source_url": "https://example.com/api/teams/den", "data": {}}
+    a = _synthesis_messages("Who is the DEN starting LT?", tc, result)
+    b = _synthesis_messages("Who is the DEN starting QB?", tc, result)
+    assert a[0] is b[0]
+    assert a[2]["tool_calls"][0]["id"] == a[3]["tool_call_id"]
+
+def test_metrics_after_ask():
+    client.post("/ask", json={"question": "Who is the DEN starting LT?"})
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert 'nfl_agent_request_seconds_count{endpoint="ask"}' in r.text
+    assert 'nfl_agent_stage_seconds_count{stage="fetch"}' in r.text
+    assert 'nfl_agent_fetch_total{cache="miss",kind="team"}' in r.text
+    assert "nfl_agent_answer_cache_" in r.text
+
+def test_ask_fails_fast_when_breaker_open_and_nothing_cached():
+    for _ in range(tools.breaker.failure_threshold):
+        tools.breaker.record_failure()
+    r = client.post("/ask", json={"question": "Who is the DEN starting LT?"})
+    assert r.status_code == 503
+    assert int(r.headers["Retry-After"]) >= 1
+
+def test_ask_answers_lookup_from_template_without_llm():
+    tools._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(
+        200, json={"abbr": "DEN", "starters": [{"position": "LT", "name": "Garett Bolles"}]})))
+    async def no_llm(*args, **kwargs):
+        raise AssertionError("synthesis should not be needed")
+    with patch("app.call_llm", no_llm):
+        r = client.post("/ask", json={"question": "Who is the DEN starting LT?"})
+    assert r.json()["answer"].startswith("The Denver Broncos starting LT is Garett Bolles.")
+    assert r.json()["sources"] == ["https://example.com/api/teams/den"]
@@ -0,0 +1,87 @@
+import os
+os.environ.setdefault("NFL_API_BASE","https://example.com")
+import json, asyncio
+from unittest.mock import patch
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+import tools, answer_cache, batch
+from app import app
+
+client = TestClient(app)
+
+@pytest.fixture
+def upstream_calls():
+    tools._cache.clear()
+    answer_cache.clear()
+    calls = []
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(200, json={"path": request.url.path})
+    tools._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with patch.dict(os.environ, {"LLM_PROVIDER": "none"}):
+        yield calls
+    tools._client = None
+
+def test_batch_dedupes_fetches_and_streams_ndjson(upstream_calls):
+    questions = ["Who is the DEN starting LT?", "Who is the DEN starting QB?", "Who is the KC starting QB?"]
+    r = client.post("/ask/batch", json={"questions": questions, "concurrency": 2})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    items, summary = lines[:-1], lines[-1]["summary"]
+    assert sorted(item["index"] for item in items) == [0, 1, 2]
+    assert all("answer" in item and item["ms"] >= 0 for item in items)
+    assert {item["sources"][0] for item in items} == {"https://example.com/api/teams/den",
+                                                      "https://example.com/api/teams/kc"}
+    assert summary["fetches_requested"] == 3
+    assert summary["fetches_distinct"] == 2
+    assert sorted(upstream_calls) == ["/api/teams/den", "/api/teams/kc"]
+
+def test_shared_fetches_keep_past_week_teams_apart():
+    tools._cache.clear()
+    calls = []
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(200, json={"teams": [{"abbr": "KC"}, {"abbr": "LV"}]})
+    tools._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    fetches = batch.SharedFetches()
+    week = tools.CURRENT_WEEK + 2
+
+    async def run():
+        kc = await fetches(kind="team", abbr="kc", week=week)
+        lv = await fetches(kind="team", abbr="lv", week=week)
+        again = await fetches(kind="team", abbr="KC", week=week)
+        return kc, lv, again
+
+    try:
+        kc, lv, again = asyncio.run(run())
+    finally:
+        tools._client = None
+    assert (kc["data"]["abbr"], lv["data"]["abbr"], again["data"]["abbr"]) == ("KC", "LV", "KC")
+    assert kc["source_url"] == lv["source_url"]
+    assert fetches.distinct == 2
+    assert len(calls) == 1  # both teams come out of one week payload
+
+def test_batch_reports_item_errors(upstream_calls):
+    async def answer(question, fetch, llm_slot):
+        if "bad" in question:
+            raise ValueError("bad question")
+        return {"answer": question.upper(), "sources": []}
+
+    async def run():
+        return [item async for item in batch.run_batch(["ok", "bad"], answer, 1)]
+    items = asyncio.run(run())
+    by_question = {item.get("question"): item for item in items[:-1]}
+    assert by_question["ok"]["answer"] == "OK"
+    assert by_question["bad"]["error"] == "bad question"
+    assert items[-1]["summary"]["errors"] == 1
+
+def test_batch_limit(upstream_calls):
+    with patch.object(batch, "BATCH_MAX_QUESTIONS", 1):
+        r = client.post("/ask/batch", json={"questions": ["a", "b"]})
+    assert r.status_code == 400
+
+def test_read_questions():
+    assert batch.read_questions("Who is DEN QB?\n\n KC vs LV \n") == ["Who is DEN QB?", "KC vs LV"]
+    assert batch.read_questions('["a", {"question": "b"}, {"q": "c"}]') == ["a", "b", "c"]
@@ -0,0 +1,37 @@
+import os
+os.environ.setdefault("NFL_API_BASE","https://example.com")
+import json
+import copy
+import compact
+
+TEAMS_WEEK = {
+    "source_url": "https://example.com/api/teams/2025/week/1",
+    "data": {"teams": [
+        {"abbr": "DEN", "id": 7, "logo": "https://img/den.png", "coach": None, "starters": [
+            {"position": "QB", "name": "Bo Nix", "headshot": "https://img/nix.png"},
+            {"position": "LT", "name": "Garett Bolles", "notes": ""},
+        ]},
+        {"abbr": "KC", "id": 16, "starters": [{"position": "QB", "name": "Patrick Mahomes"}]},
+    ]},
+}
+
+def test_projects_to_team_and_position():
+    original = copy.deepcopy(TEAMS_WEEK)
+    text, tokens = compact.compact_tool_result(TEAMS_WEEK, "Who is the Broncos starting LT?")
+    data = json.loads(text)
+    assert data["source_url"] == TEAMS_WEEK["source_url"]
+    assert data["data"] == {"teams": [{"abbr": "DEN", "starters": [{"position": "LT", "name": "Garett Bolles"}]}]}
+    assert tokens["after"] < tokens["before"]
+    assert TEAMS_WEEK == original
+
+def test_no_match_keeps_everything_but_noise():
+    text, _ = compact.compact_tool_result(TEAMS_WEEK, "Tell me about week 1")
+    data = json.loads(text)["data"]
+    assert [t["abbr"] for t in data["teams"]] == ["DEN", "KC"]
+    assert "id" not in data["teams"][0] and "coach" not in data["teams"][0]
+
+def test_budget_truncates_lists():
+    big = {"source_url": "u", "data": [{"abbr": f"T{i}", "name": "x" * 40} for i in range(200)]}
+    text, tokens = compact.compact_tool_result(big, "list everything", budget=300)
+    assert tokens["after"] <= 300
+    assert 1 <= len(json.loads(text)["data"]) < 200
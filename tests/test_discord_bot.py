@@ -0,0 +1,158 @@
+import os
+os.environ.setdefault("NFL_API_BASE","https://example.com")
+import asyncio
+from types import SimpleNamespace
+import pytest
+import discord_bot
+
+def test_channel_slot_limits_concurrency():
+    """Test questions in one channel are capped while other channels run freely"""
+    channel_a = SimpleNamespace(id=1, guild=SimpleNamespace(id=10))
+    channel_b = SimpleNamespace(id=2, guild=SimpleNamespace(id=10))
+    running = {1: 0, 2: 0}
+    peak = {1: 0, 2: 0}
+    depths = []
+
+    async def work(channel):
+        async with discord_bot._channel_slot(channel):
+            running[channel.id] += 1
+            peak[channel.id] = max(peak[channel.id], running[channel.id])
+            depths.append(discord_bot.queue_depth())
+            await asyncio.sleep(0.01)
+            running[channel.id] -= 1
+
+    async def run():
+        discord_bot._channel_slots.clear()
+        jobs = [work(channel_a) for _ in range(6)] + [work(channel_b) for _ in range(2)]
+        await asyncio.gather(*jobs)
+
+    asyncio.run(run())
+    assert peak[1] == discord_bot.CHANNEL_CONCURRENCY
+    assert peak[2] == 2
+    assert any(d["waiting"] > 0 for d in depths)
+    assert discord_bot.queue_depth() == {"waiting": 0, "active": 0}
+
+def test_split_message_respects_limit():
+    text = ("word " * 300 + "\n") * 3
+    chunks = discord_bot.split_message(text, limit=2000)
+    assert len(chunks) > 1
+    assert all(len(c) <= 2000 for c in chunks)
+    assert "".join(chunks).replace(" ", "").replace("\n", "") == text.replace(" ", "").replace("\n", "")
+
+def test_sources_line_skipped_when_answer_cites_them():
+    url = "https://example.com/api/teams/den"
+    templated = f"The Denver Broncos starting LT is Garett Bolles.\n\nSource: {url}"
+    assert discord_bot._with_sources(templated, [url]) == templated
+    assert discord_bot._with_sources("Garett Bolles.", [url]) == f"Garett Bolles.\n\n**Sources:** {url}"
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+        self.edits = 0
+
+    async def edit(self, content):
+        self.content = content
+        self.edits += 1
+
+    async def delete(self):
+        self.deleted = True
+
+class FakeChannel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content):
+        message = FakeMessage(content)
+        self.sent.append(message)
+        return message
+
+def test_progressive_reply_throttles_and_spills():
+    channel = FakeChannel()
+
+    async def run():
+        reply = discord_bot.ProgressiveReply(channel, "**Answer:** ", min_interval=60)
+        await reply.start()
+        for i in range(50):
+            await reply.update("x" * i)
+        await reply.update("y" * 4500, final=True)
+
+    asyncio.run(run())
+    assert channel.sent[0].edits == 1  # only the final edit got through the throttle
+    assert len(channel.sent) == 3
+    assert all(len(m.content) <= 2000 for m in channel.sent)
+    assert "".join(m.content for m in channel.sent) == "**Answer:** " + "y" * 4500
+
+def test_progressive_reply_deletes_spilled_messages_on_shorter_final_render():
+    channel = FakeChannel()
+
+    async def run():
+        reply = discord_bot.ProgressiveReply(channel, "**Answer:** ", min_interval=0)
+        await reply.start()
+        await reply.update("y" * 4500)
+        await reply.update("Sorry, I encountered an error: connection reset", final=True)
+        return reply
+
+    reply = asyncio.run(run())
+    assert len(channel.sent) == 3
+    assert [getattr(m, "deleted", False) for m in channel.sent] == [False, True, True]
+    assert reply.messages == channel.sent[:1]
+    assert channel.sent[0].content == "**Answer:** Sorry, I encountered an error: connection reset"
+
+def test_streamed_answer_cut_off_is_not_cached(monkeypatch):
+    decisions = [{"tool_call": {"name": "fetch_nfl_data", "arguments": {"kind": "teams_week"}}}, {"content": "ready"}]
+    async def fake_call_llm(messages, tools_schema=True):
+        return decisions.pop(0)
+
+    async def fake_fetch(kind, **params):
+        return {"source_url": "https://example.com/api/teams/2025/week/1", "data": {}}
+
+    async def cut_off(messages):
+        yield "The Broncos start"
+        raise ConnectionError("connection reset")
+
+    monkeypatch.setattr(discord_bot, "call_llm", fake_call_llm)
+    monkeypatch.setattr(discord_bot, "fetch_nfl_data", fake_fetch)
+    monkeypatch.setattr(discord_bot, "stream_llm", cut_off)
+    deltas = []
+
+    async def on_delta(text):
+        deltas.append(text)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(discord_bot.process_nfl_question("How do the teams look this week?", on_delta=on_delta))
+    assert deltas == ["The Broncos start"]
+    assert discord_bot.answer_cache.recall("How do the teams look this week?") is None
+
+def test_agent_loop_runs_tool_calls_of_one_turn_concurrently(monkeypatch):
+    decisions = [
+        {"tool_call": {"id": "a", "name": "fetch_nfl_data", "arguments": {"kind": "team", "abbr": "kc"}},
+         "tool_calls": [
+             {"id": "a", "name": "fetch_nfl_data", "arguments": {"kind": "team", "abbr": "kc"}},
+             {"id": "b", "name": "fetch_nfl_data", "arguments": {"kind": "team", "abbr": "lv"}},
+         ]},
+        {"content": "ready"},
+        {"content": "Mahomes vs. Smith"},
+    ]
+    seen = []
+    async def fake_call_llm(messages, tools_schema=True):
+        seen.append(list(messages))
+        return decisions[len(seen) - 1]
+
+    running, peak = [0], [0]
+    async def fake_fetch(kind, **params):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.01)
+        running[0] -= 1
+        return {"source_url": f"https://example.com/api/teams/{params['abbr']}", "data": {}}
+
+    monkeypatch.setattr(discord_bot, "call_llm", fake_call_llm)
+    monkeypatch.setattr(discord_bot, "fetch_nfl_data", fake_fetch)
+
+    answer, sources = asyncio.run(discord_bot.process_nfl_question("Compare the KC and LV starting QBs"))
+    assert answer == "Mahomes vs. Smith"
+    assert peak[0] == 2
+    assert len(seen) == 3  # one tool turn, one readiness check, one synthesis
+    assert sources == ["https://example.com/api/teams/kc", "https://example.com/api/teams/lv"]
+    tool_messages = [m for m in seen[1] if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in tool_messages] == ["a", "b"]
@@ -0,0 +1,87 @@
+import os
+os.environ.setdefault("NFL_API_BASE","https://example.com")
+import asyncio
+from unittest.mock import patch
+import pytest
+import answer_cache, discord_bot, followups
+from followups import ChannelContext, ContextFetch
+
+@pytest.fixture(autouse=True)
+def _clean():
+    followups.clear()
+    answer_cache.clear()
+    with patch.dict(os.environ, {"LLM_PROVIDER": "none"}):
+        yield
+
+def test_expand_follow_ups_with_previous_teams_and_week():
+    context = ChannelContext()
+    assert context.expand("and their QB?") == "and their QB?"  # nothing to refer back to
+    context.record("Who played the Chiefs in week 3 of 2024?", "The Falcons.",
+                   [{"kind": "matchups_week", "season": 2024, "week": 3}])
+    assert context.expand("and their QB?") == "and their QB? (Kansas City Chiefs, week 3 of 2024)"
+    assert context.expand("LT?") == "LT? (Kansas City Chiefs, week 3 of 2024)"
+    assert context.expand("Who is the Broncos QB?") == "Who is the Broncos QB?"
+    assert context.expand("List the home teams") == "List the home teams"
+
+def test_old_turns_fold_into_summary_and_answers_are_trimmed():
+    context = ChannelContext()
+    for i in range(followups.FOLLOWUP_TURNS + 2):
+        context.record(f"question {i}", "word " * 500, [])
+    history = context.history()
+    assert history[0]["role"] == "system"
+    assert "question 0" in history[0]["content"] and "question 1" in history[0]["content"]
+    assert len(history) == 1 + 2 * followups.FOLLOWUP_TURNS
+    assert all(len(m["content"]) <= followups.FOLLOWUP_ANSWER_CHARS + 2 for m in history if m["role"] == "assistant")
+
+def test_context_fetch_reuses_stored_results_until_the_data_changes():
+    calls = []
+    async def fetch(**arguments):
+        calls.append(arguments)
+        return {"source_url": "https://example.com/api/teams/den", "data": {"n": len(calls)}}
+
+    context = ChannelContext()
+    fetched = ContextFetch(context, fetch)
+    asyncio.run(fetched(kind="team", abbr="den"))
+    again = asyncio.run(ContextFetch(context, fetch)(kind="team", abbr="DEN"))
+    assert again["data"] == {"n": 1}
+    assert len(calls) == 1
+    with patch("followups.tools.data_version", lambda url: "changed"):
+        asyncio.run(ContextFetch(context, fetch)(kind="team", abbr="den"))
+    assert len(calls) == 2
+
+def test_context_fetch_keeps_past_week_teams_apart():
+    async def fetch(**arguments):
+        return {"source_url": "https://example.com/api/teams/2025/week/3", "data": {"abbr": arguments["abbr"]}}
+
+    context = ChannelContext()
+    asyncio.run(ContextFetch(context, fetch)(kind="team", abbr="kc", week=3))
+    lv = asyncio.run(ContextFetch(context, fetch)(kind="team", abbr="lv", week=3))
+    assert lv["data"] == {"abbr": "lv"}
+
+def test_store_is_per_channel_and_user():
+    context = followups.get(1, 100)
+    context.record("Who is the DEN starting LT?", "Garett Bolles.", [{"kind": "team", "abbr": "den"}])
+    followups.save(1, 100, context)
+    assert followups.get(1, 100).teams == ["den"]
+    assert followups.get(1, 200).teams == []
+    assert followups.get(2, 100).teams == []
+
+def test_discord_follow_up_answers_from_already_fetched_data(monkeypatch):
+    fetches = []
+    async def fake_fetch(kind, **params):
+        fetches.append(params)
+        return {"source_url": f"https://example.com/api/teams/{params['abbr']}",
+                "data": {"abbr": "DEN", "starters": [{"position": "LT", "name": "Garett Bolles"},
+                                                     {"position": "QB", "name": "Bo Nix"}]}}
+    monkeypatch.setattr(discord_bot, "fetch_nfl_data", fake_fetch)
+
+    async def ask(question):
+        context = followups.get(1, 100)
+        answer, sources = await discord_bot.process_nfl_question(question, context=context)
+        followups.save(1, 100, context)
+        return answer
+
+    assert "Garett Bolles" in asyncio.run(ask("Who is the Broncos starting LT?"))
+    assert "Bo Nix" in asyncio.run(ask("and who is their starting QB?"))
+    assert len(fetches) == 1
+    assert followups.stats()["reused_results"] >= 1
@@ -1,6 +1,7 @@
 import os
 os.environ.setdefault("NFL_API_BASE","https://example.com")
 from app import app
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 client = TestClient(app)
 
@@ -8,3 +9,39 @@ def test_health():
     r = client.get("/healthz")
     assert r.status_code == 200
     assert r.json().get("ok") is True
+
+@patch.dict(os.environ, {"LLM_PROVIDER": "none"})
+def test_readyz_reports_checks_and_waits_for_startup():
+    r = client.get("/readyz")
+    assert r.status_code == 503
+    assert r.json()["checks"]["started"] is False
+    with TestClient(app) as started:
+        r = started.get("/readyz")
+        assert r.status_code == 200
+        assert r.json() == {"ready": True, "checks": {"started": True, "nfl_client": True}}
+
+def test_import_is_lazy_about_config_and_the_openai_sdk():
+    import subprocess, sys
+    env = {k: v for k, v in os.environ.items() if k != "NFL_API_BASE"}
+    code = "import sys, app, tools; print('openai' in sys.modules, 'discord' in sys.modules)\n" \
+           "try:\n    tools.url_for('teams_week')\nexcept RuntimeError as e:\n    print(e)"
+    out = subprocess.run([sys.executable, "-c", code], env={**env, "NFL_API_BASE": ""},
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         capture_output=True, text=True, check=True).stdout.splitlines()
+    assert out[0] == "False False"
+    assert "NFL_API_BASE is missing or invalid" in out[1]
+
+@patch.dict(os.environ, {"LLM_PROVIDER": "none"})
+def test_startup_loads_the_token_encoding_off_the_event_loop():
+    import asyncio
+    on_loop = []
+    def load():
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+    with patch("compact.load_encoding", load):
+        with TestClient(app):
+            pass
+    assert on_loop == [False]
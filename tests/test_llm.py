@@ -1,8 +1,19 @@
 import pytest
 import os
-from unittest.mock import patch, MagicMock
+import asyncio
+import httpx
+from unittest.mock import patch, MagicMock, AsyncMock
+import llm
 from llm import call_llm, _fallback_heuristic
 
+@pytest.fixture(autouse=True)
+def _reset_client():
+    llm._client = None
+    llm.breaker.reset()
+    yield
+    llm._client = None
+    llm.breaker.reset()
+
 def test_fallback_heuristic_matchup():
     """Test fallback heuristic for matchup questions"""
     result = _fallback_heuristic("What's the matchup between PHI and DAL?")
@@ -28,12 +39,12 @@ def test_fallback_heuristic_teams_week():
 def test_llm_fallback_mode():
     """Test LLM falls back to heuristic when provider is none"""
     messages = [{"role": "user", "content": "PHI vs DAL matchup"}]
-    result = call_llm(messages)
+    result = asyncio.run(call_llm(messages))
     assert "tool_call" in result
     assert result["tool_call"]["name"] == "fetch_nfl_data"
 
 @patch.dict(os.environ, {"LLM_PROVIDER": "openai", "OPENAI_API_KEY": "test-key"})
-@patch('llm.OpenAI')
+@patch('llm.AsyncOpenAI')
 def test_llm_openai_success(mock_openai):
     """Test successful OpenAI call with tool call"""
     mock_client = MagicMock()
@@ -49,16 +60,16 @@ def test_llm_openai_success(mock_openai):
     mock_tool_call.function = mock_function
     mock_choice.message.tool_calls = [mock_tool_call]
     mock_response.choices = [mock_choice]
-    mock_client.chat.completions.create.return_value = mock_response
+    mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
     
     messages = [{"role": "user", "content": "What teams are playing?"}]
-    result = call_llm(messages)
+    result = asyncio.run(call_llm(messages))
     
     assert result["tool_call"]["name"] == "fetch_nfl_data"
     assert result["tool_call"]["arguments"]["kind"] == "teams_week"
 
 @patch.dict(os.environ, {"LLM_PROVIDER": "openai", "OPENAI_API_KEY": "test-key"})
-@patch('llm.OpenAI')
+@patch('llm.AsyncOpenAI')
 def test_llm_openai_text_response(mock_openai):
     """Test successful OpenAI call with text response"""
     mock_client = MagicMock()
@@ -69,10 +80,172 @@ def test_llm_openai_text_response(mock_openai):
     mock_choice.message.tool_calls = None
     mock_choice.message.content = "Here's the answer"
     mock_response.choices = [mock_choice]
-    mock_client.chat.completions.create.return_value = mock_response
+    mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
     
     messages = [{"role": "user", "content": "What teams are playing?"}]
-    result = call_llm(messages, tools_schema=False)
+    result = asyncio.run(call_llm(messages, tools_schema=False))
     
     # When tools_schema=False, we should get content directly
     assert result["content"] == "Here's the answer"
+
+@patch.dict(os.environ, {"LLM_PROVIDER": "openai", "OPENAI_API_KEY": "test-key"})
+@patch('llm.AsyncOpenAI')
+def test_llm_client_reused(mock_openai):
+    """Test the AsyncOpenAI client is built once and shared across calls"""
+    mock_client = MagicMock()
+    mock_openai.return_value = mock_client
+    mock_choice = MagicMock()
+    mock_choice.message.tool_calls = None
+    mock_choice.message.content = "ok"
+    mock_client.chat.completions.create = AsyncMock(return_value=MagicMock(choices=[mock_choice]))
+
+    messages = [{"role": "user", "content": "What teams are playing?"}]
+    asyncio.run(call_llm(messages, tools_schema=False))
+    asyncio.run(call_llm(messages, tools_schema=False))
+
+    assert mock_openai.call_count == 1
+    assert mock_client.chat.completions.create.await_count == 2
+
+@patch.dict(os.environ, {"LLM_PROVIDER": "openai", "OPENAI_API_KEY": "test-key"})
+@patch('llm.AsyncOpenAI')
+def test_stream_llm_yields_deltas(mock_openai):
+    """Test streaming mode yields content deltas and skips empty chunks"""
+    def chunk(text):
+        c = MagicMock()
+        c.choices = [MagicMock()]
+        c.choices[0].delta.content = text
+        return c
+
+    async def fake_stream():
+        for text in ["Garett ", None, "Bolles"]:
+            yield chunk(text)
+
+    mock_client = MagicMock()
+    mock_openai.return_value = mock_client
+    mock_client.chat.completions.create = AsyncMock(return_value=fake_stream())
+
+    async def collect():
+        return [d async for d in llm.stream_llm([{"role": "user", "content": "LT?"}])]
+
+    assert asyncio.run(collect()) == ["Garett ", "Bolles"]
+    assert mock_client.chat.completions.create.call_args.kwargs["stream"] is True
+
+@patch.dict(os.environ, {"LLM_PROVIDER": "openai", "OPENAI_API_KEY": "test-key"})
+@patch('llm.AsyncOpenAI')
+def test_stream_llm_raises_when_cut_off_mid_answer(mock_openai):
+    """Test a stream failing after its first delta raises instead of ending quietly"""
+    chunk = MagicMock()
+    chunk.choices = [MagicMock()]
+    chunk.choices[0].delta.content = "The Broncos start"
+
+    async def fake_stream():
+        yield chunk
+        raise httpx.ReadError("connection reset")
+
+    mock_client = MagicMock()
+    mock_openai.return_value = mock_client
+    mock_client.chat.completions.create = AsyncMock(return_value=fake_stream())
+    received = []
+
+    async def collect():
+        async for delta in llm.stream_llm([{"role": "user", "content": "LT?"}]):
+            received.append(delta)
+
+    with pytest.raises(httpx.ReadError):
+        asyncio.run(collect())
+    assert received == ["The Broncos start"]
+
+@patch.dict(os.environ, {"LLM_PROVIDER": "openai", "OPENAI_API_KEY": "test-key"})
+@patch('llm.AsyncOpenAI')
+def test_llm_returns_all_tool_calls(mock_openai):
+    """Test every tool call in one turn is returned, with the first kept as tool_call"""
+    def tool_call(call_id, arguments):
+        tc = MagicMock()
+        tc.id = call_id
+        tc.function.name = "fetch_nfl_data"
+        tc.function.arguments = arguments
+        return tc
+
+    mock_client = MagicMock()
+    mock_openai.return_value = mock_client
+    mock_choice = MagicMock()
+    mock_choice.message.tool_calls = [tool_call("a", '{"kind": "team", "abbr": "kc"}'),
+                                      tool_call("b", '{"kind": "team", "abbr": "lv"}')]
+    mock_client.chat.completions.create = AsyncMock(return_value=MagicMock(choices=[mock_choice]))
+
+    result = asyncio.run(call_llm([{"role": "user", "content": "Compare KC and LV QBs"}]))
+    assert [tc["arguments"]["abbr"] for tc in result["tool_calls"]] == ["kc", "lv"]
+    assert result["tool_call"]["id"] == "a"
+
+@patch.dict(os.environ, {"LLM_PROVIDER": "openai", "OPENAI_API_KEY": "test-key"})
+@patch('llm.AsyncOpenAI')
+def test_llm_records_cached_prompt_tokens(mock_openai):
+    """Test usage reporting splits cached from uncached prompt tokens"""
+    mock_client = MagicMock()
+    mock_openai.return_value = mock_client
+    mock_choice = MagicMock()
+    mock_choice.message.tool_calls = None
+    mock_choice.message.content = "ok"
+    usage = MagicMock(prompt_tokens=1500, completion_tokens=40)
+    usage.prompt_tokens_details.cached_tokens = 1024
+    mock_client.chat.completions.create = AsyncMock(return_value=MagicMock(choices=[mock_choice], usage=usage))
+
+    before = llm.usage_stats()
+    asyncio.run(call_llm([{"role": "user", "content": "hi"}], tools_schema=False))
+    after = llm.usage_stats()
+
+    assert after["prompt_tokens"] - before["prompt_tokens"] == 1500
+    assert after["cached_prompt_tokens"] - before["cached_prompt_tokens"] == 1024
+    kwargs = mock_client.chat.completions.create.call_args.kwargs
+    assert kwargs["tools"] == llm.TOOLS_SCHEMA and kwargs["tool_choice"] == "none"
+
+@patch.dict(os.environ, {"LLM_PROVIDER": "openai", "OPENAI_API_KEY": "test-key"})
+@patch('llm.AsyncOpenAI')
+def test_llm_breaker_skips_provider_when_open(mock_openai):
+    """After repeated connection failures call_llm goes straight to the heuristic"""
+    import httpx, openai
+    mock_client = MagicMock()
+    mock_openai.return_value = mock_client
+    error = openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+    mock_client.chat.completions.create = AsyncMock(side_effect=error)
+
+    messages = [{"role": "user", "content": "Who is the KC starting QB?"}]
+    for _ in range(llm.LLM_BREAKER_FAILURES + 2):
+        result = asyncio.run(call_llm(messages))
+        assert result["tool_call"]["arguments"] == {"kind": "team", "abbr": "kc"}
+    assert mock_client.chat.completions.create.await_count == llm.LLM_BREAKER_FAILURES
+    assert llm.breaker.state == "open"
+
+def test_parse_tool_arguments_normalizes_and_validates():
+    parse = llm.parse_tool_arguments
+    assert parse("fetch_nfl_data", '{"kind": "matchup", "away": "KAN", "home": "Chargers", "week": 2}') == \
+        {"kind": "matchup", "away": "kc", "home": "lac", "week": 2}
+    assert parse("fetch_nfl_data", '{"kind": "teams_week", "abbr": null}') == {"kind": "teams_week"}
+    for bad in ['{"kind": "team"}',                       # missing abbr
+                '{"kind": "team", "abbr": "XYZ"}',        # not one of the 32
+                '{"kind": "roster"}',                     # not in the enum
+                '{"kind": "teams_week", "week": 40}',     # out of range
+                '{"kind": "teams_week", "extra": true}',  # unknown field
+                "{'kind': 'teams_week'}",                 # not JSON
+                ]:
+        with pytest.raises(llm.ToolCallError):
+            parse("fetch_nfl_data", bad)
+    with pytest.raises(llm.ToolCallError):
+        parse("delete_everything", "{}")
+
+@patch.dict(os.environ, {"LLM_PROVIDER": "openai", "OPENAI_API_KEY": "test-key"})
+@patch('llm.AsyncOpenAI')
+def test_llm_malformed_tool_call_falls_back(mock_openai):
+    """A tool call with invalid arguments falls back to the heuristic instead of being run"""
+    mock_client = MagicMock()
+    mock_openai.return_value = mock_client
+    tc = MagicMock()
+    tc.function.name = "fetch_nfl_data"
+    tc.function.arguments = '{"kind": "team", "abbr": "__import__(\'os\')"}'
+    mock_choice = MagicMock()
+    mock_choice.message.tool_calls = [tc]
+    mock_client.chat.completions.create = AsyncMock(return_value=MagicMock(choices=[mock_choice]))
+
+    result = asyncio.run(call_llm([{"role": "user", "content": "Who is the KC starting QB?"}]))
+    assert result["tool_call"]["arguments"] == {"kind": "team", "abbr": "kc"}
+    assert llm.breaker.state == "closed"
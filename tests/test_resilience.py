@@ -0,0 +1,73 @@
+import asyncio
+import time
+import pytest
+from resilience import (CircuitBreaker, CircuitOpenError, DeadlineExceeded, LatencyWindow,
+                        deadline, hedged, remaining)
+
+def test_breaker_opens_half_opens_and_closes():
+    now = [0.0]
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError) as e:
+        breaker.check()
+    assert e.value.retry_after == 10
+
+    now[0] = 10
+    assert breaker.allow()          # the single half-open trial
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.stats()["opened"] == 2
+
+def test_breaker_success_resets_failure_count():
+    breaker = CircuitBreaker("test", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+def test_deadline_nests_and_expires():
+    assert remaining(5) == 5
+    with deadline(10):
+        with deadline(60):
+            assert remaining() <= 10
+        assert remaining(1) == 1
+    with deadline(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            remaining()
+
+def test_latency_window_percentile():
+    window = LatencyWindow(size=100)
+    for i in range(1, 101):
+        window.observe(i / 100)
+    assert window.percentile(0.95) == 0.96
+
+def test_hedged_second_attempt_wins():
+    delays = iter([1.0, 0.01])
+    hedges = []
+    async def call():
+        delay = next(delays)
+        await asyncio.sleep(delay)
+        return delay
+
+    start = time.perf_counter()
+    result = asyncio.run(hedged(call, 0.02, lambda: hedges.append(1)))
+    assert result == 0.01
+    assert hedges == [1]
+    assert time.perf_counter() - start < 0.5
+
+def test_hedged_fast_call_is_not_hedged():
+    async def call():
+        return "ok"
+    hedges = []
+    assert asyncio.run(hedged(call, 0.05, lambda: hedges.append(1))) == "ok"
+    assert hedges == []
@@ -0,0 +1,57 @@
+import os
+os.environ.setdefault("NFL_API_BASE","https://example.com")
+import json
+import pytest
+import router
+import tools
+
+QUESTIONS = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "router_questions.json")
+
+def test_find_teams_by_name_city_and_abbr():
+    assert router.find_teams("Broncos vs Kansas City") == ["den", "kc"]
+    assert router.find_teams("New York Giants at the Niners") == ["nyg", "sf"]
+    assert router.find_teams("Who was the starter for NO?") == ["no"]
+    assert router.find_teams("New York starting QB") == []
+
+def test_team_position_question_routes_confidently():
+    r = router.route("Who is the Broncos starting LT?")
+    assert r.confident
+    assert r.arguments == {"kind": "team", "abbr": "den"}
+
+def test_comparison_defers_to_llm():
+    assert not router.route("Compare the starting QBs for the Chiefs and Raiders").confident
+
+def test_matchup_orientation_uses_snapshot():
+    snapshot = tools._snapshot
+    tools._snapshot = tools.WeekSnapshot()
+    tools._snapshot.matchups = {("kc", "lac"): {}}
+    try:
+        r = router.route("Chargers vs Chiefs")
+        assert r.confident
+        assert r.arguments == {"kind": "matchup", "away": "kc", "home": "lac"}
+        assert router.route("Who do the Chiefs play?").arguments["home"] == "lac"
+    finally:
+        tools._snapshot = snapshot
+
+def test_labeled_questions_never_misrouted():
+    with open(QUESTIONS) as f:
+        labeled = json.load(f)
+    confident = [(item, router.route(item["q"])) for item in labeled if router.route(item["q"]).confident]
+    assert len(confident) >= len(labeled) * 0.7
+    for item, r in confident:
+        assert r.arguments == item["expect"], item["q"]
+
+def test_week_and_season_become_arguments(monkeypatch):
+    monkeypatch.setattr(tools, "CURRENT_SEASON", 2025)
+    monkeypatch.setattr(tools, "CURRENT_WEEK", 5)
+    assert router.find_teams("Who is the KC QB in week 5?") == ["kc"]
+    assert router.find_week("Who is the KC QB in week 5?") == {}
+    assert router.find_week("Who was the KC QB in week 3?") == {"week": 3}
+    assert router.find_week("Who was the KC QB last week?") == {"week": 4}
+    assert router.find_week("KC vs LV week 2 of 2024") == {"season": 2024, "week": 2}
+    assert router.find_week("week 40 schedule") == {}
+
+    r = router.route("Who started at QB for KC in week 3?")
+    assert r.confident
+    assert r.arguments == {"kind": "team", "abbr": "kc", "week": 3}
+    assert not router.route("Who started at QB for KC in 2024?").confident
@@ -0,0 +1,96 @@
+import os
+os.environ.setdefault("NFL_API_BASE","https://example.com")
+import asyncio
+from unittest.mock import patch
+import pytest
+import answer_cache, router, speculate
+from app import answer_question
+
+class FakeFetch:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, **arguments):
+        self.calls.append(arguments)
+        await asyncio.sleep(self.delay)
+        return {"source_url": f"https://example.com/{arguments['kind']}", "data": {}}
+
+@pytest.fixture(autouse=True)
+def _clean():
+    answer_cache.clear()
+    with patch.dict(os.environ, {"LLM_PROVIDER": "none"}):
+        yield
+
+def test_hit_reuses_the_prefetch_and_counts_saved_time():
+    fetch = FakeFetch()
+    before = speculate.stats()
+
+    async def run():
+        routed = router.route("How do the Broncos look?")
+        speculation = speculate.start("How do the Broncos look?", fetch, routed)
+        await asyncio.sleep(0.03)  # the LLM deciding
+        result = await speculate.resolve(speculation, {"kind": "team", "abbr": "DEN"}, fetch)
+        speculate.settle(speculation)
+        return result
+
+    assert asyncio.run(run())["source_url"] == "https://example.com/team"
+    assert fetch.calls == [{"kind": "team", "abbr": "den"}]
+    after = speculate.stats()
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] == before["misses"]
+    assert after["saved_ms_total"] - before["saved_ms_total"] >= 20
+
+def test_miss_fetches_the_chosen_arguments_and_leaves_the_guess_running():
+    fetch = FakeFetch(delay=0)
+    before = speculate.stats()
+
+    async def run():
+        speculation = speculate.start("How do the Broncos look?", fetch, router.route("How do the Broncos look?"))
+        result = await speculate.resolve(speculation, {"kind": "matchups_week"}, fetch)
+        speculate.settle(speculation)
+        await speculation.task
+        return result
+
+    assert asyncio.run(run())["source_url"] == "https://example.com/matchups_week"
+    assert sorted(c["kind"] for c in fetch.calls) == ["matchups_week", "team"]
+    after = speculate.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] == before["hits"]
+    assert 0 <= after["hit_rate"] <= 1
+
+def test_disabled_or_unpredictable_starts_nothing():
+    with patch.object(speculate, "SPECULATIVE_PREFETCH", False):
+        assert speculate.start("How do the Broncos look?", FakeFetch()) is None
+    with patch.object(speculate, "predict", lambda question, routed=None: {"kind": "team"}):
+        assert speculate.start("anything", FakeFetch()) is None
+    speculate.settle(None)
+
+def test_answer_question_overlaps_fetch_with_llm_decision():
+    fetch = FakeFetch()
+    async def slow_decision(messages, tools_schema=True):
+        await asyncio.sleep(0.05)
+        return {"tool_call": {"name": "fetch_nfl_data", "arguments": {"kind": "team", "abbr": "den"}}}
+    before = speculate.stats()
+    with patch("app.call_llm", slow_decision), patch("app.templates.answer", lambda *a: "Looks good."):
+        result = asyncio.run(answer_question("How do the Broncos look?", fetch=fetch))
+    assert result == {"answer": "Looks good.", "sources": ["https://example.com/team"]}
+    assert len(fetch.calls) == 1
+    assert speculate.stats()["hits"] - before["hits"] == 1
+
+def test_claim_tells_a_past_week_team_from_its_week_payload():
+    fetch = FakeFetch(delay=0)
+
+    async def run():
+        week = {"kind": "teams_week", "week": 3}
+        speculation = speculate.Speculation(week, fetch)
+        claims = [speculation.claim({"kind": "team", "abbr": "kc", "week": 3}),
+                  speculation.claim({"kind": "team", "abbr": "lv", "week": 3}),
+                  speculation.claim(week)]
+        await speculation.task
+        team = speculate.Speculation({"kind": "team", "abbr": "kc", "week": 3}, fetch)
+        claims += [team.claim({"kind": "team", "abbr": "lv", "week": 3}), team.claim({"kind": "team", "abbr": "KC", "week": 3})]
+        await team.task
+        return claims
+
+    assert asyncio.run(run()) == [False, False, True, False, True]
@@ -0,0 +1,57 @@
+import json
+import logging
+import pytest
+import telemetry
+from telemetry import Counter, Histogram, trace, span, annotate
+
+def test_counter_and_histogram_render():
+    c = Counter("t_total", "test")
+    c.inc(kind="a")
+    c.inc(2, kind="a")
+    assert 't_total{kind="a"} 3' in c.render()
+
+    h = Histogram("t_seconds", "test", buckets=(0.1, 1.0))
+    h.observe(0.05, stage="x")
+    h.observe(0.5, stage="x")
+    lines = h.render()
+    assert 't_seconds_bucket{le="0.1",stage="x"} 1' in lines
+    assert 't_seconds_bucket{le="1",stage="x"} 2' in lines
+    assert 't_seconds_bucket{le="+Inf",stage="x"} 2' in lines
+    assert 't_seconds_count{stage="x"} 2' in lines
+
+def test_spans_attach_to_trace():
+    with trace("unit") as record:
+        with span("fetch", kind="team"):
+            annotate(cache="hit")
+        with pytest.raises(KeyError):
+            with span("llm"):
+                raise KeyError("boom")
+    assert [s["stage"] for s in record["spans"]] == ["fetch", "llm"]
+    assert record["spans"][0]["cache"] == "hit"
+    assert record["spans"][1]["error"] == "KeyError"
+    assert record["duration_ms"] >= 0
+
+def test_annotate_outside_span_is_noop():
+    annotate(cache="hit")
+
+def test_sampled_trace_is_logged(monkeypatch):
+    monkeypatch.setattr(telemetry, "TRACE_SAMPLE_RATE", 1.0)
+    seen = []
+    handler = logging.Handler()
+    handler.emit = seen.append
+    telemetry._trace_log.addHandler(handler)
+    try:
+        with trace("unit"):
+            with span("route"):
+                pass
+    finally:
+        telemetry._trace_log.removeHandler(handler)
+    payload = json.loads(seen[0].getMessage())
+    assert payload["name"] == "unit"
+    assert payload["spans"][0]["stage"] == "route"
+
+def test_gauges_render_numeric_values():
+    telemetry.register_gauges("unit_gauge", lambda: {"size": 3, "name": "x"})
+    text = telemetry.render_metrics()
+    assert "nfl_agent_unit_gauge_size 3" in text
+    assert "nfl_agent_unit_gauge_name" not in text
@@ -0,0 +1,49 @@
+import os
+os.environ.setdefault("NFL_API_BASE","https://example.com")
+import templates
+
+TEAM = {"source_url": "https://example.com/api/teams/den",
+        "data": {"abbr": "DEN", "name": "Denver Broncos",
+                 "starters": [{"position": "QB", "name": "Bo Nix"}, {"position": "LT", "name": "Garett Bolles"},
+                              {"position": "WR", "name": "Courtland Sutton"}, {"position": "WR", "name": "Marvin Mims"}]}}
+WEEK = {"source_url": "https://example.com/api/matchups/2025/week/1",
+        "data": [{"away": {"abbr": "KC"}, "home": {"abbr": "LAC"}, "kickoff": "2025-09-05T20:00:00Z"},
+                 {"away": {"abbr": "TEN"}, "home": {"abbr": "DEN"}}]}
+
+def test_starter_at_position():
+    answer = templates.answer("Who is the Broncos starting LT?", {"kind": "team", "abbr": "den"}, TEAM)
+    assert answer == "The Denver Broncos starting LT is Garett Bolles.\n\nSource: https://example.com/api/teams/den"
+    two = templates.answer("Who starts at WR for DEN?", {"kind": "team", "abbr": "den"}, TEAM)
+    assert two.startswith("The Denver Broncos starting WR are Courtland Sutton and Marvin Mims.")
+    dict_starters = {"source_url": "u", "data": {"abbr": "KC", "starters": {"QB": "Patrick Mahomes"}}}
+    assert "Patrick Mahomes" in templates.answer("Chiefs starting quarterback", {"kind": "team", "abbr": "kc"},
+                                                 dict_starters)
+
+def test_opponent_home_teams_and_matchup_list():
+    opponent = templates.answer("Who do the Chiefs play in week 1?", {"kind": "matchups_week"}, WEEK)
+    assert opponent.startswith("The Kansas City Chiefs play at the Los Angeles Chargers (kickoff 2025-09-05T20:00:00Z).")
+    homes = templates.answer("List the home teams in Week 1", {"kind": "matchups_week"}, WEEK)
+    assert homes.splitlines()[:3] == ["Week 1 home teams:", "- Los Angeles Chargers", "- Denver Broncos"]
+    schedule = templates.answer("What are the Week 1 matchups?", {"kind": "matchups_week"}, WEEK)
+    assert "- Tennessee Titans at Denver Broncos" in schedule
+    assert schedule.endswith("Source: https://example.com/api/matchups/2025/week/1")
+
+def test_unrecognized_shapes_fall_through():
+    before = templates.stats()
+    assert templates.answer("Who are the starters for DEN?", {"kind": "team", "abbr": "den"}, TEAM) is None
+    assert templates.answer("Compare the Broncos QB and LT", {"kind": "team", "abbr": "den"}, TEAM) is None
+    assert templates.answer("Who is the Broncos kicker?", {"kind": "team", "abbr": "den"}, TEAM) is None
+    assert templates.answer("KC @ LAC preview", {"kind": "matchup", "away": "kc", "home": "lac"},
+                            {"source_url": "u", "data": WEEK["data"][0]}) is None
+    after = templates.stats()
+    assert after["fallthrough"] - before["fallthrough"] == 4
+    assert 0 <= after["hit_rate"] <= 1
+
+def test_qualified_questions_fall_through():
+    team = {"kind": "team", "abbr": "den"}
+    for question in ["Who is the Broncos backup QB?", "Who is the Broncos second-string QB?",
+                     "Who is next on the Broncos depth chart at QB?", "Who is not starting at QB for Denver?",
+                     "Who isn't starting at LT for Denver?", "Who was the Broncos starting QB last season?",
+                     "Who is the Broncos injured LT?", "Who is the Broncos QB if Bo Nix is out?"]:
+        assert templates.answer(question, team, TEAM) is None, question
+    assert templates.answer("Who did the Chiefs play last season in week 1?", {"kind": "matchups_week"}, WEEK) is None
@@ -0,0 +1,344 @@
+import os
+os.environ.setdefault("NFL_API_BASE","https://example.com")
+import asyncio
+import time
+import httpx
+import pytest
+import tools
+
+@pytest.fixture(autouse=True)
+def _reset():
+    tools._cache.clear()
+    tools.breaker.reset()
+    yield
+    tools._cache.clear()
+    tools.breaker.reset()
+    tools._client = None
+
+def _mock_client(calls):
+    def handler(request):
+        calls.append(str(request.url))
+        return httpx.Response(200, json={"path": request.url.path})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+def test_fetch_uses_shared_client():
+    calls = []
+    tools._client = _mock_client(calls)
+    client = tools._client
+
+    async def run():
+        a = await tools.fetch_nfl_data("team", abbr="DEN")
+        b = await tools.fetch_nfl_data("matchups_week")
+        return a, b
+
+    a, b = asyncio.run(run())
+    assert a["source_url"].endswith("/api/teams/den")
+    assert b["data"]["path"] == "/api/matchups/2025/week/1"
+    assert tools.open_client() is client
+    assert len(calls) == 2
+
+def test_fetch_cached():
+    calls = []
+    tools._client = _mock_client(calls)
+
+    async def run():
+        await tools.fetch_nfl_data("team", abbr="kc")
+        await tools.fetch_nfl_data("team", abbr="KC")
+
+    asyncio.run(run())
+    assert len(calls) == 1
+
+def test_fetch_requires_params():
+    with pytest.raises(ValueError):
+        asyncio.run(tools.fetch_nfl_data("matchup", away="kc"))
+
+TEAMS_WEEK = {"teams": [{"abbr": "DEN", "starters": {"LT": "Garett Bolles"}},
+                        {"abbr": "KC", "starters": {"QB": "Patrick Mahomes"}}]}
+MATCHUPS_WEEK = [{"away": {"abbr": "KC"}, "home": {"abbr": "LAC"}, "kickoff": "20:00"}]
+
+def test_snapshot_answers_team_and_matchup_without_network():
+    calls = []
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path == "/api/teams/2025/week/1":
+            return httpx.Response(200, json=TEAMS_WEEK)
+        if request.url.path == "/api/matchups/2025/week/1":
+            return httpx.Response(200, json=MATCHUPS_WEEK)
+        return httpx.Response(200, json={"path": request.url.path})
+    tools._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def run():
+        await tools.load_snapshot()
+        team = await tools.fetch_nfl_data("team", abbr="den")
+        matchup = await tools.fetch_nfl_data("matchup", away="kc", home="lac")
+        missing = await tools.fetch_nfl_data("team", abbr="phi")
+        return team, matchup, missing
+
+    try:
+        team, matchup, missing = asyncio.run(run())
+    finally:
+        tools._snapshot = tools.WeekSnapshot()
+    assert team["data"]["starters"]["LT"] == "Garett Bolles"
+    assert team["source_url"].endswith("/api/teams/2025/week/1")
+    assert matchup["data"]["kickoff"] == "20:00"
+    assert missing["source_url"].endswith("/api/teams/phi")
+    assert len(calls) == 3
+
+def test_concurrent_fetches_are_coalesced():
+    calls = []
+    async def handler(request):
+        calls.append(request.url.path)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"path": request.url.path})
+    tools._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    before = tools.flight_stats()
+
+    async def run():
+        return await asyncio.gather(*[tools.fetch_nfl_data("team", abbr="den") for _ in range(20)])
+
+    results = asyncio.run(run())
+    after = tools.flight_stats()
+    assert len(calls) == 1
+    assert all(r["data"] == {"path": "/api/teams/den"} for r in results)
+    assert after["issued"] - before["issued"] == 1
+    assert after["coalesced"] - before["coalesced"] == 19
+
+def test_coalesced_callers_share_errors():
+    calls = []
+    async def handler(request):
+        calls.append(request.url.path)
+        await asyncio.sleep(0.01)
+        return httpx.Response(503)
+    tools._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def run():
+        return await asyncio.gather(*[tools.fetch_nfl_data("teams_week") for _ in range(5)],
+                                    return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, Exception) for r in results)
+    assert len(calls) == 2  # one flight, retried once by _post
+    assert not tools._inflight
+
+def test_leader_deadline_or_disconnect_does_not_fail_followers():
+    from resilience import deadline, DeadlineExceeded
+    async def handler(request):
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json={"path": request.url.path})
+    tools._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def fetch(seconds):
+        with deadline(seconds):
+            return await tools.fetch_nfl_data("teams_week")
+
+    async def run():
+        leader = asyncio.create_task(fetch(0.1))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(fetch(20))
+        with pytest.raises(DeadlineExceeded):
+            await leader
+        cancelled = asyncio.create_task(fetch(20))
+        await asyncio.sleep(0)
+        cancelled.cancel()  # a client disconnecting mid-flight
+        return await follower
+
+    assert asyncio.run(run())["data"] == {"path": "/api/teams/2025/week/1"}
+    assert not tools._inflight
+
+def test_stale_entry_served_while_refreshing():
+    now = [1000.0]
+    tools._cache.clock = lambda: now[0]
+    responses = iter([{"v": 1}, {"v": 2}])
+    def handler(request):
+        return httpx.Response(200, json=next(responses))
+    tools._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def run():
+        first = await tools.fetch_nfl_data("teams_week")
+        now[0] += tools.ttl_for("teams_week") + 1
+        stale = await tools.fetch_nfl_data("teams_week")
+        await asyncio.gather(*tools._refresh_tasks)
+        fresh = await tools.fetch_nfl_data("teams_week")
+        return first, stale, fresh
+
+    try:
+        first, stale, fresh = asyncio.run(run())
+    finally:
+        tools._cache.clock = time.time
+    assert first["data"] == {"v": 1}
+    assert stale["data"] == {"v": 1}
+    assert fresh["data"] == {"v": 2}
+    assert tools.cache_stats()["stale_served"] >= 1
+
+def test_stale_entry_kept_when_refresh_fails():
+    now = [1000.0]
+    tools._cache.clock = lambda: now[0]
+    tools._cache.set("https://example.com/api/teams/den", {"v": "old"}, ttl=10)
+    def handler(request):
+        return httpx.Response(500)
+    tools._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def run():
+        now[0] += 20
+        a = await tools.fetch_nfl_data("team", abbr="den")
+        await asyncio.gather(*tools._refresh_tasks)
+        b = await tools.fetch_nfl_data("team", abbr="den")
+        return a, b
+
+    errors = tools._cache.stats()["refresh_errors"]
+    try:
+        a, b = asyncio.run(run())
+    finally:
+        tools._cache.clock = time.time
+    assert a["data"] == b["data"] == {"v": "old"}
+    assert tools._cache.stats()["refresh_errors"] > errors
+
+def test_per_kind_ttls():
+    assert tools._parse_ttls("team=900, matchups_week=30") == {"team": 900.0, "matchups_week": 30.0}
+
+def test_disk_cache_survives_restart(tmp_path, monkeypatch):
+    from cache import DiskCache
+    calls = []
+    def handler(request):
+        calls.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json={"v": 1}, headers={"ETag": '"v1"'})
+    tools._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(tools, "_disk", DiskCache(str(tmp_path / "nfl.sqlite3")))
+
+    async def run():
+        await tools.fetch_nfl_data("team", abbr="den")
+        tools._cache.clear()  # simulate a restart
+        warm = await tools.fetch_nfl_data("team", abbr="den")
+        url = "https://example.com/api/teams/den"
+        row = tools._disk.get(url)
+        tools._disk.put(url, row.value, row.fetched_at - 10_000, row.etag, row.version)
+        tools._cache.clear()
+        revalidated = await tools.fetch_nfl_data("team", abbr="den")
+        return warm, revalidated
+
+    warm, revalidated = asyncio.run(run())
+    assert warm["data"] == revalidated["data"] == {"v": 1}
+    assert calls == [None, '"v1"']
+
+def test_disk_cache_lease_is_exclusive(tmp_path):
+    from cache import DiskCache
+    now = [100.0]
+    disk = DiskCache(str(tmp_path / "nfl.sqlite3"), clock=lambda: now[0])
+    assert disk.acquire_lease("u", "worker-1", 5)
+    assert not disk.acquire_lease("u", "worker-2", 5)
+    now[0] += 6
+    assert disk.acquire_lease("u", "worker-2", 5)
+    disk.release_lease("u", "worker-2")
+    assert disk.acquire_lease("u", "worker-1", 5)
+
+def test_breaker_opens_and_serves_last_known_copy(monkeypatch):
+    calls = []
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(503)
+    tools._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(tools.breaker, "failure_threshold", 2)
+    # Long past its stale window, but still the best we have while the upstream is down
+    tools._cache.set("https://example.com/api/teams/den", {"v": "old"}, ttl=1, fetched_at=0)
+
+    async def run():
+        with pytest.raises(httpx.HTTPStatusError):
+            await tools.fetch_nfl_data("team", abbr="kc")
+        assert tools.breaker.state == "open"
+        served = await tools.fetch_nfl_data("team", abbr="den")
+        with pytest.raises(tools.CircuitOpenError):
+            await tools.fetch_nfl_data("team", abbr="sf")
+        return served
+
+    served = asyncio.run(run())
+    assert served["data"] == {"v": "old"}
+    assert calls == ["/api/teams/kc", "/api/teams/kc"]
+    assert tools.upstream_stats()["served_while_open"] >= 1
+
+def test_client_errors_do_not_trip_breaker(monkeypatch):
+    tools._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(404)))
+    monkeypatch.setattr(tools.breaker, "failure_threshold", 1)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(tools.fetch_nfl_data("team", abbr="kc"))
+    assert tools.breaker.state == "closed"
+
+def test_request_deadline_bounds_fetch():
+    from resilience import deadline, DeadlineExceeded
+    async def handler(request):
+        await asyncio.sleep(1)
+        return httpx.Response(200, json={})
+    tools._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def run():
+        with deadline(0.05):
+            await tools.fetch_nfl_data("teams_week")
+
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run())
+    assert time.perf_counter() - start < 0.5
+    assert tools.breaker.state == "closed"
+
+def test_season_and_week_select_urls(monkeypatch):
+    monkeypatch.setattr(tools, "CURRENT_WEEK", 3)
+    assert tools.url_for("matchups_week") == "https://example.com/api/matchups/2025/week/3"
+    assert tools.url_for("teams_week", season=2024, week="17") == "https://example.com/api/teams/2024/week/17"
+    assert tools.url_for("matchup", away="KC", home="LAC", week=1) == \
+        "https://example.com/api/matchups/2025/week/1/kc/lac"
+    assert tools.url_for("team", abbr="den") == "https://example.com/api/teams/den"
+    with pytest.raises(ValueError):
+        tools.url_for("teams_week", week=23)
+    assert tools.ttl_for("team", 2025, 2) == tools.FINAL_WEEK_TTL
+    assert tools.ttl_for("team", 2025, 3) == tools.ttl_for("team")
+
+def test_past_week_team_comes_from_week_payload(monkeypatch):
+    monkeypatch.setattr(tools, "CURRENT_WEEK", 3)
+    calls = []
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(200, json=TEAMS_WEEK)
+    tools._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def run():
+        den = await tools.fetch_nfl_data("team", abbr="DEN", week=2)
+        kc = await tools.fetch_nfl_data("team", abbr="kc", week=2)
+        return den, kc
+
+    den, kc = asyncio.run(run())
+    assert den["data"] == TEAMS_WEEK["teams"][0]
+    assert kc["data"]["starters"] == {"QB": "Patrick Mahomes"}
+    assert den["source_url"] == "https://example.com/api/teams/2025/week/2"
+    assert calls == ["/api/teams/2025/week/2"]
+    # A completed week is cached with the long TTL
+    assert tools._cache.entry(den["source_url"])[2] == tools.FINAL_WEEK_TTL
+
+def test_week_partitions_evict_completed_weeks_first():
+    from cache import WeekPartitionedCache
+    current = (2025, 5)
+    cache = WeekPartitionedCache(tools.week_of, lambda p: p < current, lambda: current,
+                                 partition_size=4, max_partitions=3)
+    url = lambda season, week, n: f"https://example.com/api/teams/{season}/week/{week}/{n}"
+    cache.set(url(2025, 6, 0), "next week", ttl=60)
+    cache.set(url(2025, 5, 0), "this week", ttl=60)
+    cache.set(url(2025, 2, 0), "week 2", ttl=60)
+    cache.set(url(2025, 1, 0), "week 1", ttl=60)   # over the limit: oldest completed week goes
+    assert url(2025, 1, 0) in cache and url(2025, 2, 0) not in cache
+    cache.set(url(2025, 3, 0), "week 3", ttl=60)
+    assert url(2025, 1, 0) not in cache
+    assert url(2025, 5, 0) in cache and url(2025, 6, 0) in cache
+    assert cache.stats()["partitions"] == 3
+    assert cache.stats()["evicted_partitions"] == 2
+
+    for n in range(6):
+        cache.set(url(2025, 5, n), n, ttl=60)
+    assert len([n for n in range(6) if url(2025, 5, n) in cache]) == 4  # per-partition LRU bound
+
+def test_unknown_team_fails_before_any_request():
+    calls = []
+    tools._client = _mock_client(calls)
+    with pytest.raises(ValueError):
+        asyncio.run(tools.fetch_nfl_data("team", abbr="xyz"))
+    assert tools.url_for("matchup", away="Chiefs", home="SD").endswith("/kc/lac")
+    assert calls == []
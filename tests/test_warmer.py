@@ -0,0 +1,61 @@
+import os
+os.environ.setdefault("NFL_API_BASE","https://example.com")
+import asyncio
+import httpx
+import pytest
+import tools, warmer
+
+MATCHUPS_WEEK = [{"away": {"abbr": "KC"}, "home": {"abbr": "LAC"}, "kickoff": "2025-09-05T20:00:00Z"},
+                 {"away": {"abbr": "DAL"}, "home": {"abbr": "PHI"}, "kickoff": "2025-09-04T20:20:00Z"}]
+
+TEAMS_WEEK_PATH = httpx.URL(tools.url_for("teams_week")).path
+MATCHUPS_WEEK_PATH = httpx.URL(tools.url_for("matchups_week")).path
+
+@pytest.fixture
+def calls():
+    tools._cache.clear()
+    tools.breaker.reset()
+    seen = []
+    def handler(request):
+        path = request.url.path
+        seen.append(path)
+        if path == "/api/teams/sf":
+            return httpx.Response(404)
+        if path == MATCHUPS_WEEK_PATH:
+            return httpx.Response(200, json=MATCHUPS_WEEK)
+        return httpx.Response(200, json={"path": path})
+    tools._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    yield seen
+    tools._client = None
+    tools._cache.clear()
+
+def test_warm_once_prefetches_week_teams_and_matchups(calls):
+    kickoffs = asyncio.run(warmer.warm_once())
+    assert MATCHUPS_WEEK_PATH in calls and TEAMS_WEEK_PATH in calls
+    assert f"{MATCHUPS_WEEK_PATH}/kc/lac" in calls
+    assert f"{MATCHUPS_WEEK_PATH}/dal/phi" in calls
+    assert len({p for p in calls if p.startswith("/api/teams/") and p.count("/") == 3}) == 32
+    status = warmer.status()
+    assert status["last_failures"] == 1  # sf 404s, and a 404 is not retried
+    assert status["last_fetched"] == 2 + 31 + 2
+    assert status["last_run_at"] is not None and status["last_duration_ms"] >= 0
+    assert len(kickoffs) == 2
+
+    # Everything is still fresh for longer than the next run is away: nothing to do
+    before = len(calls)
+    asyncio.run(warmer.warm_once(min_fresh=1))
+    assert len(calls) - before == 1  # only the failed sf payload is fetched again
+    assert warmer.status()["last_skipped"] == 2 + 31 + 2
+
+def test_warmed_entries_serve_user_requests(calls):
+    asyncio.run(warmer.warm_once())
+    before = len(calls)
+    asyncio.run(tools.fetch_nfl_data("team", abbr="den"))
+    assert len(calls) == before
+
+def test_next_delay_uses_game_cadence_near_kickoff():
+    kickoff = 1_000_000.0
+    assert warmer.next_delay([kickoff], kickoff - 2 * warmer.WARM_LEAD) == warmer.WARM_INTERVAL
+    assert warmer.next_delay([kickoff], kickoff - 60) == warmer.WARM_GAME_INTERVAL
+    assert warmer.next_delay([kickoff], kickoff + 3600) == warmer.WARM_GAME_INTERVAL
+    assert warmer.next_delay([kickoff], kickoff + warmer.GAME_LENGTH + 1) == warmer.WARM_INTERVAL
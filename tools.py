@@ -1,42 +1,602 @@
-import os, re, httpx
-from cachetools import TTLCache
-from tenacity import retry, stop_after_attempt, wait_exponential
+import os, re, json, time, asyncio, hashlib, threading, httpx
+from concurrent.futures import Future
+from typing import Optional, Tuple
+from cache import WeekPartitionedCache, DiskCache, FRESH, STALE
+from teams import normalize_abbr
+from telemetry import get_logger, span, annotate, FETCHES, RETRIES
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, LatencyWindow, OPEN, detached, hedged, remaining
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
 
+log = get_logger("tools")
+
+# Validated by api_base() on first use, so importing this module never fails on config
 NFL_API_BASE = os.getenv("NFL_API_BASE", "").rstrip("/")
-if not NFL_API_BASE.startswith("http"):
-    raise RuntimeError("NFL_API_BASE is missing or invalid. Set it in .env")
 
-_cache = TTLCache(maxsize=64, ttl=120)
+HTTP_TIMEOUT = float(os.getenv("NFL_HTTP_TIMEOUT", "10.0"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("NFL_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("NFL_HTTP_MAX_KEEPALIVE", "20"))
+
+SNAPSHOT_ENABLED = os.getenv("NFL_SNAPSHOT", "0").lower() in ("1", "true", "yes")
+SNAPSHOT_REFRESH = float(os.getenv("NFL_SNAPSHOT_REFRESH", "300"))
+
+def _parse_ttls(spec: str) -> dict:
+    """'team=900,matchups_week=30' -> {'team': 900.0, 'matchups_week': 30.0}"""
+    ttls = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        kind, _, seconds = part.partition("=")
+        ttls[kind.strip()] = float(seconds)
+    return ttls
+
+CACHE_TTL = float(os.getenv("NFL_CACHE_TTL", "120"))
+CACHE_TTLS = _parse_ttls(os.getenv("NFL_CACHE_TTLS", ""))  # per-kind overrides
+CACHE_MAX_STALE = float(os.getenv("NFL_CACHE_MAX_STALE", "600"))
+# Optional SQLite store shared by every worker / bot process on the host
+DISK_CACHE_DIR = os.getenv("NFL_DISK_CACHE_DIR", "")
+DISK_LEASE_POLL = 0.05
+
+BREAKER_FAILURES = int(os.getenv("NFL_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("NFL_BREAKER_RESET", "30"))
+# Hedging races a second request once the first is slower than the recent p95
+HEDGE_ENABLED = os.getenv("NFL_HEDGE", "0").lower() in ("1", "true", "yes")
+HEDGE_MIN_DELAY = float(os.getenv("NFL_HEDGE_MIN_DELAY", "0.05"))
+HEDGE_MIN_SAMPLES = 20
+
+# The week questions are about unless they name another one
+CURRENT_SEASON = int(os.getenv("NFL_SEASON", "2025"))
+CURRENT_WEEK = int(os.getenv("NFL_WEEK", "1"))
+MAX_WEEK = 22  # 18 regular-season weeks plus four playoff rounds
+# Completed weeks can't change, so they are cached (nearly) for good
+FINAL_WEEK_TTL = float(os.getenv("NFL_FINAL_WEEK_TTL", str(7 * 24 * 3600)))
+CACHE_WEEKS = int(os.getenv("NFL_CACHE_WEEKS", "8"))  # week partitions kept in memory
+
+TEAMS_WEEK_PATH = "/api/teams/{season}/week/{week}"
+MATCHUPS_WEEK_PATH = "/api/matchups/{season}/week/{week}"
+_WEEK_URL_RE = re.compile(r"/(\d{4})/week/(\d+)(?:/|$)")
+
+def current_week() -> Tuple[int, int]:
+    return CURRENT_SEASON, CURRENT_WEEK
+
+def season_week(season=None, week=None) -> Tuple[int, int]:
+    """Validated (season, week), each defaulting to the current one"""
+    try:
+        season = CURRENT_SEASON if season in (None, "") else int(season)
+        week = CURRENT_WEEK if week in (None, "") else int(week)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid season/week: {season!r}/{week!r}")
+    if not 1920 <= season <= 2100 or not 1 <= week <= MAX_WEEK:
+        raise ValueError(f"invalid season/week: {season}/{week}")
+    return season, week
+
+def is_final(season: int, week: int) -> bool:
+    """Whether a week is over (everything before the current week)"""
+    return (season, week) < current_week()
+
+def kind_of(url: str) -> str:
+    """The fetch kind a cached URL was requested as"""
+    if "/api/matchups/" in url:
+        return "matchups_week" if _WEEK_URL_RE.search(url).end() == len(url) else "matchup"
+    return "teams_week" if _WEEK_URL_RE.search(url) else "team"
+
+def week_of(url: str) -> Tuple[int, int]:
+    """The (season, week) a URL belongs to; per-team URLs are the current week"""
+    m = _WEEK_URL_RE.search(url)
+    return (int(m.group(1)), int(m.group(2))) if m else current_week()
+
+_cache = WeekPartitionedCache(week_of, lambda partition: is_final(*partition), current_week,
+                              partition_size=64, max_partitions=CACHE_WEEKS, max_stale=CACHE_MAX_STALE)
+_disk = None  # opened with the client, see open_disk_cache()
+_disk_stats = {"disk_hits": 0, "disk_waits": 0, "not_modified": 0}
+_owner = f"pid-{os.getpid()}"
+# Guards _inflight and the flight counters (_cache has its own lock)
+_lock = threading.Lock()
+# In-flight upstream fetches by URL, shared by concurrent callers (single-flight).
+# concurrent.futures.Future so waiters on any thread or event loop can join.
+_inflight = {}
+_flight_stats = {"issued": 0, "coalesced": 0}
+# Content hash of the last payload seen per URL, and callbacks fired when it changes
+_versions = {}
+_change_listeners = []
+# Strong refs to background refresh and shared flight tasks so they aren't garbage collected
+_refresh_tasks = set()
+_flight_tasks = set()
+_client: httpx.AsyncClient | None = None
+breaker = CircuitBreaker("nfl_api", BREAKER_FAILURES, BREAKER_RESET)
+_latency = LatencyWindow()
+_upstream_stats = {"hedged": 0, "served_while_open": 0}
+
+def api_base() -> str:
+    """NFL_API_BASE, or RuntimeError when it is missing or invalid"""
+    if not NFL_API_BASE.startswith("http"):
+        raise RuntimeError("NFL_API_BASE is missing or invalid. Set it in .env")
+    return NFL_API_BASE
+
+def open_disk_cache():
+    """Open the shared SQLite store when NFL_DISK_CACHE_DIR is set"""
+    global _disk
+    if _disk is None and DISK_CACHE_DIR:
+        os.makedirs(DISK_CACHE_DIR, exist_ok=True)
+        _disk = DiskCache(os.path.join(DISK_CACHE_DIR, "nfl_responses.sqlite3"))
+    return _disk
+
+def open_client() -> httpx.AsyncClient:
+    """Return the shared pooled client, creating it (and checking config) on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        api_base()
+        open_disk_cache()
+        _client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                                max_keepalive_connections=HTTP_MAX_KEEPALIVE),
+        )
+    return _client
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
 
 def _norm_url(path: str) -> str:
     path = re.sub(r"//+", "/", path)
-    return f"{NFL_API_BASE}{path}"
+    return f"{api_base()}{path}"
+
+def _count_retry(retry_state):
+    RETRIES.inc(upstream="nfl_api")
+    log.info("Retrying NFL API request (attempt %d): %s", retry_state.attempt_number, retry_state.outcome.exception())
+
+def _near_deadline(retry_state) -> bool:
+    try:
+        left = remaining()
+    except DeadlineExceeded:
+        return True
+    return left is not None and left < 0.5
+
+def _retryable(error: BaseException) -> bool:
+    """Server errors and network trouble are worth a retry; 4xx, deadlines, open breakers and cancellation aren't"""
+    if isinstance(error, (CircuitOpenError, DeadlineExceeded, asyncio.CancelledError)):
+        return False
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return True
+
+def _count_hedge():
+    _upstream_stats["hedged"] += 1
+    annotate(hedged=True)
+
+def _hedge_delay():
+    if not HEDGE_ENABLED or len(_latency) < HEDGE_MIN_SAMPLES:
+        return None
+    return max(HEDGE_MIN_DELAY, _latency.percentile(0.95))
+
+async def _attempt(url: str, headers, timeout: float) -> httpx.Response:
+    with span("upstream", upstream="nfl_api") as attempt:
+        r = await open_client().post(url, headers=headers, timeout=timeout)
+        attempt["status"] = r.status_code
+    return r
+
+@retry(stop=stop_after_attempt(2) | _near_deadline, wait=wait_exponential(multiplier=0.5, min=0.5, max=2),
+       retry=retry_if_exception(_retryable), before_sleep=_count_retry,
+       reraise=True)
+async def _request(url: str, etag=None) -> httpx.Response:
+    """POST url through the breaker, within the request deadline, hedging slow calls if enabled"""
+    breaker.check()
+    headers = {"If-None-Match": etag} if etag else None
+    left = remaining()
+    timeout = HTTP_TIMEOUT if left is None else min(left, HTTP_TIMEOUT)
+    delay = _hedge_delay()
+    started = time.perf_counter()
+    try:
+        if delay is None:
+            call = _attempt(url, headers, timeout)
+        else:
+            call = hedged(lambda: _attempt(url, headers, timeout), delay, _count_hedge)
+        r = await (call if left is None else asyncio.wait_for(call, left))
+        if r.status_code != 304:
+            r.raise_for_status()
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"request deadline exceeded fetching {url}")
+    except httpx.HTTPStatusError as e:
+        # Only server errors say anything about the upstream's health
+        if e.response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    except httpx.TransportError:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    _latency.observe(time.perf_counter() - started)
+    return r
+
+async def _post(url: str):
+    return (await _request(url)).json()
+
+def _abbr(obj):
+    """Best-effort team abbreviation for a team entry (or a nested team dict)"""
+    if isinstance(obj, str):
+        return obj.lower()
+    if isinstance(obj, dict):
+        for key in ("abbr", "abbreviation", "team_abbr", "code"):
+            if isinstance(obj.get(key), str):
+                return obj[key].lower()
+        if isinstance(obj.get("team"), (dict, str)):
+            return _abbr(obj["team"])
+    return None
+
+def _entries(payload, *keys):
+    """The list of records inside a week payload, whatever it is wrapped in"""
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        for key in keys + ("data", "results"):
+            if key in payload:
+                return _entries(payload[key], *keys)
+        if payload and all(isinstance(v, dict) for v in payload.values()):
+            return [{"abbr": k, **v} for k, v in payload.items()]
+    return []
+
+def matchup_index(payload):
+    """{(away, home): entry} for a matchups_week payload"""
+    matchups = {}
+    for entry in _entries(payload, "matchups", "games"):
+        if not isinstance(entry, dict):
+            continue
+        away = _abbr(entry.get("away") or entry.get("away_team"))
+        home = _abbr(entry.get("home") or entry.get("home_team"))
+        if away and home:
+            matchups[(away, home)] = entry
+    return matchups
+
+class WeekSnapshot:
+    """In-memory index over the week-level payloads for team / matchup lookups"""
+
+    def __init__(self):
+        self.teams = {}
+        self.matchups = {}
+        self.teams_url = None
+        self.matchups_url = None
+        self.loaded_at = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def load(self, teams_url, teams_payload, matchups_url, matchups_payload):
+        teams, matchups = {}, matchup_index(matchups_payload)
+        for entry in _entries(teams_payload, "teams"):
+            abbr = _abbr(entry)
+            if abbr:
+                teams[abbr] = entry
+        # Swap in whole dicts so readers never see a half-built index
+        self.teams, self.matchups = teams, matchups
+        self.teams_url, self.matchups_url = teams_url, matchups_url
+        self.loaded_at = time.time()
+
+    def lookup(self, kind: str, params: dict):
+        if not self.loaded or season_week(params.get("season"), params.get("week")) != current_week():
+            return None
+        if kind == "team":
+            data = self.teams.get(normalize_abbr(params["abbr"]))
+            return {"source_url": self.teams_url, "data": data} if data is not None else None
+        if kind == "matchup":
+            data = self.matchups.get((normalize_abbr(params["away"]), normalize_abbr(params["home"])))
+            return {"source_url": self.matchups_url, "data": data} if data is not None else None
+        return None
 
-@retry(stop=stop_after_attempt(2), wait=wait_exponential(multiplier=0.5, min=0.5, max=2))
-def _post(url: str):
-    with httpx.Client(timeout=10.0) as client:
-        r = client.post(url)
-        r.raise_for_status()
-        return r.json()
+_snapshot = WeekSnapshot()
 
-def fetch_nfl_data(kind: str, **params):
+async def load_snapshot():
+    """Fetch both week payloads once and rebuild the snapshot index"""
+    teams_url, matchups_url = url_for("teams_week"), url_for("matchups_week")
+    teams, matchups = await asyncio.gather(_fetch_upstream(teams_url, "teams_week"),
+                                           _fetch_upstream(matchups_url, "matchups_week"))
+    _snapshot.load(teams_url, teams, matchups_url, matchups)
+    return _snapshot
+
+async def refresh_snapshot_forever(interval: float = SNAPSHOT_REFRESH):
+    """Keep the snapshot fresh; meant to run as a background task"""
+    while True:
+        try:
+            await load_snapshot()
+        except Exception as e:
+            log.warning("Snapshot refresh failed: %s", e)
+        await asyncio.sleep(interval)
+
+def ttl_for(kind: str, season=None, week=None) -> float:
+    if season is not None and week is not None and is_final(season, week):
+        return FINAL_WEEK_TTL
+    return CACHE_TTLS.get(kind, CACHE_TTL)
+
+def _ttl(url: str, kind: str) -> float:
+    return ttl_for(kind, *week_of(url))
+
+def data_version(url: str):
+    """Content hash of the last payload fetched from url (None if never fetched)"""
+    with _lock:
+        return _versions.get(url)
+
+def on_data_change(callback):
+    """Register callback(url), called when a refetched URL returns different data"""
+    _change_listeners.append(callback)
+
+def _store(url: str, data, kind: str, fetched_at=None) -> str:
+    """Put data in the memory cache, returning its content version"""
+    _cache.set(url, data, _ttl(url, kind), fetched_at=fetched_at)
+    version = hashlib.blake2b(json.dumps(data, sort_keys=True).encode(), digest_size=8).hexdigest()
+    with _lock:
+        previous = _versions.get(url)
+        _versions[url] = version
+    if previous is not None and previous != version:
+        for callback in _change_listeners:
+            callback(url)
+    return version
+
+def flight_stats():
+    """Upstream requests issued vs. callers that joined one already in flight"""
+    with _lock:
+        return dict(_flight_stats)
+
+def cache_stats():
+    """Cache hit / miss / stale-served counts plus single-flight counters"""
+    return {**_cache.stats(), **flight_stats(), **_disk_stats}
+
+def upstream_stats():
+    """Breaker state and counters, hedged requests, and fetches served from cache while open"""
+    p95 = _latency.percentile(0.95)
+    return {**{f"breaker_{k}": v for k, v in breaker.stats().items()}, **_upstream_stats,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else 0}
+
+def _join_flight(url: str):
+    """Return (future, leader) for url, starting a new flight if none is running"""
+    with _lock:
+        flight = _inflight.get(url)
+        if flight is None:
+            flight = _inflight[url] = Future()
+            _flight_stats["issued"] += 1
+            return flight, True
+        _flight_stats["coalesced"] += 1
+        return flight, False
+
+async def _fetch_upstream(url: str, kind: str):
+    """Fetch url and cache it, going through the disk cache when one is configured.
+
+    With a disk cache, a row another process wrote within the TTL is used as-is.
+    Otherwise one process per host takes the URL's lease and fetches (revalidating
+    with the stored ETag), while the others wait for its row.
+    """
+    if _disk is None:
+        data = await _post(url)
+        _store(url, data, kind)
+        return data
+
+    started = time.time()
+    row = await asyncio.to_thread(_disk.get, url)
+    if row is not None and started - row.fetched_at <= _ttl(url, kind):
+        _disk_stats["disk_hits"] += 1
+        _store(url, row.value, kind, fetched_at=row.fetched_at)
+        return row.value
+
+    lease_seconds = HTTP_TIMEOUT * 2
+    leased = await asyncio.to_thread(_disk.acquire_lease, url, _owner, lease_seconds)
+    if not leased:
+        _disk_stats["disk_waits"] += 1
+        seen = row.fetched_at if row is not None else 0.0
+        while time.time() - started < lease_seconds:
+            remaining()
+            await asyncio.sleep(DISK_LEASE_POLL)
+            newer = await asyncio.to_thread(_disk.get, url)
+            if newer is not None and newer.fetched_at > seen:
+                _store(url, newer.value, kind, fetched_at=newer.fetched_at)
+                return newer.value
+    try:
+        r = await _request(url, etag=row.etag if row is not None else None)
+        if r.status_code == 304 and row is not None:
+            _disk_stats["not_modified"] += 1
+            data, etag = row.value, row.etag
+        else:
+            data, etag = r.json(), r.headers.get("ETag")
+        fetched_at = time.time()
+        version = _store(url, data, kind, fetched_at=fetched_at)
+        await asyncio.to_thread(_disk.put, url, data, fetched_at, etag, version)
+        return data
+    finally:
+        if leased:
+            await asyncio.to_thread(_disk.release_lease, url, _owner)
+
+async def _shared_fetch(url: str, kind: str, flight: Future):
+    """Run the upstream request for a flight and publish its outcome.
+
+    Runs outside any caller's deadline: the request is shared, so one caller
+    running out of time (or disconnecting) must not fail the others.
+    """
+    try:
+        with detached():
+            data = await _fetch_upstream(url, kind)
+    except BaseException as e:
+        with _lock:
+            _inflight.pop(url, None)
+        if isinstance(e, asyncio.CancelledError):
+            e = RuntimeError(f"fetch of {url} was cancelled")
+        flight.set_exception(e)
+        raise
+    with _lock:
+        _inflight.pop(url, None)
+    flight.set_result(data)
+    return data
+
+def _flight_done(future: asyncio.Future):
+    _flight_tasks.discard(future)
+    if not future.cancelled():
+        future.exception()  # delivered to the callers through the flight
+
+async def _wait_flight(url: str, flight: Future):
+    """The flight's result, waited for within this caller's own deadline"""
+    # Shielded: a caller giving up must not cancel the flight the others wait on
+    outcome = asyncio.wrap_future(flight)
+    outcome.add_done_callback(_flight_done)  # retrieved even when this caller gave up on it
+    waiter = asyncio.shield(outcome)
+    left = remaining()
+    if left is None:
+        return await waiter
+    try:
+        return await asyncio.wait_for(waiter, left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"request deadline exceeded fetching {url}")
+
+async def _fly(url: str, kind: str, flight: Future):
+    """Start a flight's shared upstream request and wait for it like any other caller"""
+    task = asyncio.create_task(_shared_fetch(url, kind, flight))
+    _flight_tasks.add(task)
+    task.add_done_callback(_flight_done)
+    return await _wait_flight(url, flight)
+
+async def _revalidate(url: str, kind: str, flight: Future):
+    try:
+        await _shared_fetch(url, kind, flight)
+    except Exception as e:
+        # Keep serving the stale copy until it ages out of the max-stale window
+        _cache.record_refresh_error()
+        log.warning("Background refresh failed for %s: %s", url, e)
+
+def revalidate(url: str, kind: str = None):
+    """Refetch url in the background unless a request for it is already in flight"""
+    with _lock:
+        if url in _inflight:
+            return
+        flight = _inflight[url] = Future()
+        _flight_stats["issued"] += 1
+    task = asyncio.create_task(_revalidate(url, kind or kind_of(url), flight))
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+def freshness(url: str):
+    """FRESH / STALE state of url in the memory cache, None once it is gone"""
+    return _cache.lookup(url, count=False)[1]
+
+async def _last_known(url: str):
+    """Any cached copy of url, however old"""
+    entry = _cache.entry(url)
+    if entry is not None:
+        return entry[0]
+    if _disk is not None:
+        row = await asyncio.to_thread(_disk.get, url)
+        if row is not None:
+            return row.value
+    return None
+
+async def _fetch_url(url: str, kind: str):
+    """Cached fetch with stale-while-revalidate and single-flight upstream requests"""
+    if breaker.state == OPEN:
+        # Fail fast: the last copy we have beats waiting on a known-bad upstream
+        data = await _last_known(url)
+        if data is not None:
+            _upstream_stats["served_while_open"] += 1
+            annotate(cache="breaker_open")
+            return data
+
+    data, state = _cache.lookup(url)
+    if state is None and _disk is not None:
+        # Cold memory cache: seed it from the host's disk cache, keeping the row's age
+        row = await asyncio.to_thread(_disk.get, url)
+        if row is not None:
+            _store(url, row.value, kind, fetched_at=row.fetched_at)
+            data, state = _cache.lookup(url, count=False)
+            if state is not None:
+                _disk_stats["disk_hits"] += 1
+                annotate(disk=True)
+    if state == FRESH:
+        annotate(cache="hit")
+        return data
+    if state == STALE:
+        annotate(cache="stale")
+        revalidate(url, kind)
+        return data
+
+    flight, leader = _join_flight(url)
+    if not leader:
+        annotate(cache="coalesced")
+        return await _wait_flight(url, flight)
+    annotate(cache="miss")
+    return await _fly(url, kind, flight)
+
+async def warm(kind: str, min_fresh: float = 0.0, **params):
+    """Refetch a payload into the cache unless it stays fresh for min_fresh more seconds.
+
+    Returns (data, fetched). Joins an in-flight request for the same URL rather
+    than issuing another.
+    """
+    url = url_for(kind, **params)
+    entry = _cache.entry(url)
+    if entry is not None:
+        value, fetched_at, ttl = entry
+        if fetched_at + ttl - _cache.clock() > min_fresh:
+            return value, False
+    flight, leader = _join_flight(url)
+    if not leader:
+        return await _wait_flight(url, flight), True
+    return await _fly(url, kind, flight), True
+
+def url_for(kind: str, season=None, week=None, **params) -> str:
+    """The upstream URL a fetch_nfl_data call resolves to"""
+    season, week = season_week(season, week)
     if kind == "teams_week":
-        url = _norm_url("/api/teams/2025/week/1")
+        url = _norm_url(TEAMS_WEEK_PATH.format(season=season, week=week))
     elif kind == "matchups_week":
-        url = _norm_url("/api/matchups/2025/week/1")
+        url = _norm_url(MATCHUPS_WEEK_PATH.format(season=season, week=week))
     elif kind == "team":
         abbr = params.get("abbr")
         if not abbr: raise ValueError("team requires abbr")
-        url = _norm_url(f"/api/teams/{abbr.lower()}")
+        abbr = normalize_abbr(abbr)
+        if (season, week) == current_week():
+            url = _norm_url(f"/api/teams/{abbr}")
+        else:
+            # The per-team endpoint only serves the current week; other weeks come from the week payload
+            url = _norm_url(TEAMS_WEEK_PATH.format(season=season, week=week))
     elif kind == "matchup":
         away, home = params.get("away"), params.get("home")
         if not (away and home): raise ValueError("matchup requires away & home")
-        url = _norm_url(f"/api/matchups/2025/week/1/{away.lower()}/{home.lower()}")
+        away, home = normalize_abbr(away), normalize_abbr(home)
+        url = _norm_url(f"{MATCHUPS_WEEK_PATH.format(season=season, week=week)}/{away}/{home}")
     else:
         raise ValueError(f"unknown kind: {kind}")
+    return url
+
+def source_url(kind: str, **params) -> str:
+    """The source_url fetch_nfl_data(kind, **params) will cite: the snapshot's week URL when it holds the entry"""
+    url = url_for(kind, **params)
+    hit = _snapshot.lookup(kind, params)
+    return hit["source_url"] if hit is not None else url
+
+def request_key(kind: str, season=None, week=None, **params) -> Tuple[str, str, Optional[str]]:
+    """(url, kind, abbr): what a fetch_nfl_data call returns, for reusing its result.
+
+    A past-week team lookup shares its week's URL with teams_week and every
+    other team that week but returns one team's entry, so layers that reuse
+    results per call key on this; the URL alone only keys the fetch cache.
+    """
+    url = url_for(kind, season, week, **params)
+    return url, kind, normalize_abbr(params["abbr"]) if kind == "team" else None
+
+def canonical_arguments(arguments: dict) -> dict:
+    """fetch_nfl_data arguments with season / week filled in, for use as a cache key"""
+    season, week = season_week(arguments.get("season"), arguments.get("week"))
+    return {**arguments, "season": season, "week": week}
 
-    if url in _cache:
-        return {"source_url": url, "data": _cache[url]}
-    data = _post(url)
-    _cache[url] = data
-    return {"source_url": url, "data": data}
+async def fetch_nfl_data(kind: str, **params):
+    url = url_for(kind, **params)
+    season, week = season_week(params.get("season"), params.get("week"))
+    with span("fetch", kind=kind, season=season, week=week) as record:
+        hit = _snapshot.lookup(kind, params)
+        if hit is not None:
+            record["cache"] = "snapshot"
+        else:
+            past_team = kind == "team" and (season, week) != current_week()
+            data = await _fetch_url(url, "teams_week" if past_team else kind)
+            if past_team:
+                abbr = normalize_abbr(params["abbr"])
+                data = next((e for e in _entries(data, "teams") if _abbr(e) == abbr), None)
+            hit = {"source_url": url, "data": data}
+    FETCHES.inc(kind=kind, cache=record.get("cache", "error"))
+    return hit
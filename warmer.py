@@ -0,0 +1,90 @@
+"""Background cache warming, so requests around kickoff and halftime rarely touch the NFL API.
+
+Every run refetches the week payloads, all 32 team payloads and each scheduled
+matchup whose cached copy would expire before the next run. Runs come every
+NFL_WARM_INTERVAL seconds, or every NFL_WARM_GAME_INTERVAL seconds from
+NFL_WARM_LEAD seconds before a kickoff until the game is over.
+"""
+import os, time, asyncio
+from datetime import datetime
+from typing import Dict, List, Optional
+import tools
+from teams import TEAMS
+from telemetry import get_logger, trace, span
+
+WARM_ENABLED = os.getenv("NFL_WARM", "0").lower() in ("1", "true", "yes")
+WARM_INTERVAL = float(os.getenv("NFL_WARM_INTERVAL", "90"))
+WARM_GAME_INTERVAL = float(os.getenv("NFL_WARM_GAME_INTERVAL", "30"))
+WARM_LEAD = float(os.getenv("NFL_WARM_LEAD", "3600"))
+WARM_CONCURRENCY = int(os.getenv("NFL_WARM_CONCURRENCY", "8"))
+GAME_LENGTH = 4 * 3600
+
+log = get_logger("warmer")
+
+_status = {"runs": 0, "last_run_at": None, "last_duration_ms": None, "last_fetched": 0,
+           "last_skipped": 0, "last_failures": 0, "failures_total": 0, "next_run_in": None, "last_error": None}
+
+def status() -> Dict:
+    """Last run time (epoch seconds), duration, fetched / skipped / failed counts"""
+    return dict(_status)
+
+def _kickoff(entry) -> Optional[float]:
+    value = entry.get("kickoff") or entry.get("kickoff_time") or entry.get("start_time")
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+def next_delay(kickoffs: List[float], now: float) -> float:
+    """The faster game-window cadence while any game is about to start or in progress"""
+    if any(k - WARM_LEAD <= now <= k + GAME_LENGTH for k in kickoffs):
+        return min(WARM_GAME_INTERVAL, WARM_INTERVAL)
+    return WARM_INTERVAL
+
+async def warm_once(min_fresh: float = WARM_INTERVAL) -> List[float]:
+    """One warming pass; returns the schedule's kickoff times"""
+    started = time.time()
+    counts = {"fetched": 0, "skipped": 0, "failures": 0}
+    errors = []
+    slots = asyncio.Semaphore(WARM_CONCURRENCY)
+
+    async def one(kind, **params):
+        async with slots:
+            try:
+                data, fetched = await tools.warm(kind, min_fresh, **params)
+            except Exception as e:
+                counts["failures"] += 1
+                errors.append(f"{kind} {params}: {e}")
+                return None
+        counts["fetched" if fetched else "skipped"] += 1
+        return data
+
+    with trace("warm"), span("warm"):
+        _, matchups = await asyncio.gather(one("teams_week"), one("matchups_week"))
+        pairs = tools.matchup_index(matchups) if matchups is not None else {}
+        await asyncio.gather(*(one("team", abbr=abbr) for abbr in TEAMS),
+                             *(one("matchup", away=away, home=home) for away, home in pairs))
+
+    _status.update(runs=_status["runs"] + 1, last_run_at=started,
+                   last_duration_ms=round((time.time() - started) * 1000, 1),
+                   last_fetched=counts["fetched"], last_skipped=counts["skipped"],
+                   last_failures=counts["failures"], failures_total=_status["failures_total"] + counts["failures"],
+                   last_error=errors[0] if errors else None)
+    if errors:
+        log.warning("Cache warming: %d of %d fetches failed, e.g. %s",
+                    len(errors), sum(counts.values()), errors[0])
+    return [k for k in map(_kickoff, pairs.values()) if k is not None]
+
+async def warm_forever():
+    delay = WARM_INTERVAL
+    while True:
+        try:
+            kickoffs = await warm_once(min_fresh=delay)
+            delay = next_delay(kickoffs, time.time())
+        except Exception as e:
+            log.warning("Cache warming failed: %s", e)
+            delay = WARM_INTERVAL
+        _status["next_run_in"] = delay
+        await asyncio.sleep(delay)